@@ -0,0 +1,36 @@
+"""add vehicle vin and dedup fingerprint
+
+Revision ID: c2d3e4f5a6b7
+Revises: b1c2d3e4f5g6
+Create Date: 2025-02-03 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d3e4f5a6b7'
+down_revision: Union[str, Sequence[str], None] = 'b1c2d3e4f5g6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('vehicles', sa.Column('vin', sa.String(), nullable=True))
+    op.add_column('vehicles', sa.Column('fingerprint', sa.String(), nullable=True))
+
+    # Recherches de doublons par égalité : index B-tree simples
+    op.create_index('ix_vehicles_vin', 'vehicles', ['vin'])
+    op.create_index('ix_vehicles_fingerprint', 'vehicles', ['fingerprint'])
+
+    # Les véhicules existants sont complétés par :
+    #   python app/worker.py --backfill-fingerprints
+
+
+def downgrade() -> None:
+    op.drop_index('ix_vehicles_fingerprint', 'vehicles')
+    op.drop_index('ix_vehicles_vin', 'vehicles')
+    op.drop_column('vehicles', 'fingerprint')
+    op.drop_column('vehicles', 'vin')
@@ -0,0 +1,26 @@
+"""add vehicle content hash
+
+Revision ID: d3e4f5a6b7c8
+Revises: c2d3e4f5a6b7
+Create Date: 2025-02-10 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3e4f5a6b7c8'
+down_revision: Union[str, Sequence[str], None] = 'c2d3e4f5a6b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Lu par clé primaire uniquement (repli du cache Redis du worker) : pas d'index
+    op.add_column('vehicles', sa.Column('content_hash', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('vehicles', 'content_hash')
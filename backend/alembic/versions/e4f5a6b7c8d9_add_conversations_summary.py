@@ -0,0 +1,64 @@
+"""add conversations summary
+
+Revision ID: e4f5a6b7c8d9
+Revises: d3e4f5a6b7c8
+Create Date: 2025-02-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4f5a6b7c8d9'
+down_revision: Union[str, Sequence[str], None] = 'd3e4f5a6b7c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'conversations',
+        sa.Column('conversation_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('other_user_id', sa.String(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('last_message_id', sa.String(), nullable=False),
+        sa.Column('last_message_content', sa.Text(), nullable=False),
+        sa.Column('last_sender_id', sa.String(), nullable=False),
+        sa.Column('last_message_at', sa.TIMESTAMP(), nullable=False),
+        sa.Column('last_message_is_read', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('unread_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('conversation_id', 'user_id'),
+    )
+    op.create_index(
+        'ix_conversations_user_last_message', 'conversations',
+        ['user_id', 'last_message_at', 'conversation_id'],
+    )
+
+    # Reprise de l'existant : dernier message et non lus de chaque participant
+    op.execute("""
+        INSERT INTO conversations (
+            conversation_id, user_id, other_user_id, last_message_id, last_message_content,
+            last_sender_id, last_message_at, last_message_is_read, unread_count
+        )
+        SELECT DISTINCT ON (p.conversation_id, p.user_id)
+            p.conversation_id, p.user_id, p.other_user_id, m.id, m.content,
+            m.sender_id, COALESCE(m.created_at, now()), COALESCE(m.is_read, false),
+            (SELECT count(*) FROM messages u
+             WHERE u.conversation_id = p.conversation_id
+               AND u.recipient_id = p.user_id
+               AND u.is_read IS NOT TRUE)
+        FROM (
+            SELECT id, conversation_id, sender_id AS user_id, recipient_id AS other_user_id FROM messages
+            UNION ALL
+            SELECT id, conversation_id, recipient_id AS user_id, sender_id AS other_user_id FROM messages
+        ) p
+        JOIN messages m ON m.id = p.id
+        ORDER BY p.conversation_id, p.user_id, m.created_at DESC NULLS LAST, m.id DESC
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_conversations_user_last_message', 'conversations')
+    op.drop_table('conversations')
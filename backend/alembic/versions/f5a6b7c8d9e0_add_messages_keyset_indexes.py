@@ -0,0 +1,36 @@
+"""add messages keyset indexes
+
+Revision ID: f5a6b7c8d9e0
+Revises: e4f5a6b7c8d9
+Create Date: 2025-02-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a6b7c8d9e0'
+down_revision: Union[str, Sequence[str], None] = 'e4f5a6b7c8d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Historique paginé par curseur (created_at, id) : une page = un parcours d'index borné
+    op.create_index(
+        'ix_messages_conversation_created', 'messages',
+        ['conversation_id', 'created_at', 'id'],
+    )
+    # Index partiel : seuls les messages non lus (lecture groupée, comptage des non lus)
+    op.create_index(
+        'ix_messages_unread_recipient', 'messages',
+        ['recipient_id', 'conversation_id'],
+        postgresql_where=sa.text('is_read = false'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_unread_recipient', 'messages')
+    op.drop_index('ix_messages_conversation_created', 'messages')
@@ -158,6 +158,22 @@ if CELERY_AVAILABLE:
                 'options': {
                     'priority': 10  # Priorité max
                 }
+            },
+            'check-proxies': {
+                'task': 'app.tasks.check_proxies',
+                'schedule': crontab(minute='*/5'),
+                'options': {
+                    'expires': 300,
+                    'priority': 8
+                }
+            },
+            'reconcile-unread-counters': {
+                'task': 'app.tasks.reconcile_unread_counters',
+                'schedule': crontab(minute='*/10'),
+                'options': {
+                    'expires': 600,
+                    'priority': 5
+                }
             }
         }
     )
@@ -77,14 +77,29 @@ class Settings:
     # Database - Utilise la fonction centralisée
     DATABASE_URL: str = get_database_url()
 
+    # Pool de connexions du moteur async (routes FastAPI)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
     # Elasticsearch
     ELASTIC_HOST: str = os.getenv("ELASTIC_HOST", "http://localhost:9200")
     ES_INDEX: str = os.getenv("ES_INDEX", "vehicles")
+    # Requêtes des alertes (percolation à l'ingestion)
+    ES_ALERTS_INDEX: str = os.getenv("ES_ALERTS_INDEX", "vehicle-alerts")
 
     # Redis
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
     REDIS_QUEUE_KEY: str = os.getenv("REDIS_QUEUE_KEY", "scraper_queue")
 
+    # Worker d'ingestion
+    WORKER_BATCH_SIZE: int = int(os.getenv("WORKER_BATCH_SIZE", "500"))
+
+    # Cache des résultats de recherche (Redis + LRU local, 0 = désactivé)
+    SEARCH_CACHE_TTL: int = int(os.getenv("SEARCH_CACHE_TTL", "300"))
+    SEARCH_CACHE_LOCAL_SIZE: int = int(os.getenv("SEARCH_CACHE_LOCAL_SIZE", "1024"))
+
     # JWT Authentication
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
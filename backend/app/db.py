@@ -25,6 +25,35 @@ engine = create_engine(
 # Session factory
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# Async engine (asyncpg) pour les routes FastAPI : les requêtes ne bloquent
+# plus la boucle d'événements. Le moteur sync reste utilisé par Celery,
+# le worker et les scripts.
+ASYNC_DATABASE_URL = re.sub(
+    r'postgresql(\+[a-z0-9]+)?://',
+    'postgresql+asyncpg://',
+    settings.DATABASE_URL
+)
+
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=False,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True
+    )
+    # expire_on_commit=False : les objets restent lisibles après commit sans nouvelle requête
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession,
+                                           expire_on_commit=False, autoflush=False)
+except Exception as e:  # asyncpg / greenlet non installés
+    print(f"⚠️ Moteur async indisponible: {e}")
+    async_engine = None
+    AsyncSessionLocal = None
+
 # Try to import Base from app.models to keep Alembic compatibility
 try:
     from app.models import Base  # noqa: F401
@@ -43,3 +72,14 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Dependency function to get an async database session.
+    Usage: db: AsyncSession = Depends(get_async_db)
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Moteur async indisponible (pip install asyncpg 'sqlalchemy[asyncio]')")
+    async with AsyncSessionLocal() as db:
+        yield db
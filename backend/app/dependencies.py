@@ -1,9 +1,11 @@
 # backend/app/dependencies.py
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.db import SessionLocal
+from app.db import SessionLocal, get_async_db
 from app.auth import decode_token
 from app.models import User, UserRole
 from app.schemas import TokenData
@@ -19,13 +21,8 @@ def get_db():
     finally:
         db.close()
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    Récupère l'utilisateur courant depuis le token JWT
-    """
+def _email_from_token(credentials: HTTPAuthorizationCredentials) -> str:
+    """Décode le token JWT et retourne l'email (sub)"""
     token = credentials.credentials
     
     # Décoder le token
@@ -45,9 +42,9 @@ async def get_current_user(
             detail="Token invalide",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    # Récupérer l'utilisateur depuis la DB
-    user = db.query(User).filter(User.email == email).first()
+    return email
+
+def _check_user(user: User) -> User:
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,6 +60,32 @@ async def get_current_user(
     
     return user
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Récupère l'utilisateur courant depuis le token JWT
+    """
+    email = _email_from_token(credentials)
+    
+    # Récupérer l'utilisateur depuis la DB
+    user = db.query(User).filter(User.email == email).first()
+    return _check_user(user)
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Variante async de get_current_user (routes sur get_async_db).
+    L'utilisateur est attaché à la même AsyncSession que la route.
+    """
+    email = _email_from_token(credentials)
+    
+    result = await db.execute(select(User).where(User.email == email))
+    return _check_user(result.scalars().first())
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -114,4 +137,13 @@ async def require_expert(current_user: User = Depends(get_current_user)) -> User
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Compte expert requis"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def require_expert_async(current_user: User = Depends(get_current_user_async)) -> User:
+    """Nécessite le rôle EXPERT ou ADMIN (routes async)"""
+    if current_user.role not in [UserRole.EXPERT, UserRole.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Compte expert requis"
+        )
+    return current_user
@@ -1,8 +1,12 @@
 # backend/app/es_setup.py
 import os
 import sys
+from datetime import datetime
 from elasticsearch import Elasticsearch, exceptions
 
+from app.services import alert_matching
+from app.services.indexing import VEHICLES_MAPPING
+
 # charge la variable d'env ELASTIC_HOST si présente, sinon fallback
 ELASTIC_HOST = os.getenv("ELASTIC_HOST", "http://127.0.0.1:9200")
 INDEX_NAME = "vehicles"
@@ -29,34 +33,33 @@ def main():
         print("Erreur connexion Elasticsearch:", e)
         return 1
 
-    mapping = {
-      "mappings": {
-        "properties": {
-          "title": {"type": "text"},
-          "make": {"type": "keyword"},
-          "model": {"type": "keyword"},
-          "price": {"type": "integer"},
-          "mileage": {"type": "integer"},
-          "year": {"type": "integer"},
-          "location": {"type": "geo_point"},
-          "posted_date": {"type": "date"},
-          "source_ids": {"type": "object"},
-          "score": {"type": "float"}
-        }
-      }
-    }
-
     try:
         exists = es.indices.exists(index=INDEX_NAME)
         if exists:
             print(f"Index '{INDEX_NAME}' existe déjà.")
         else:
-            es.indices.create(index=INDEX_NAME, body=mapping)
-            print(f"Index '{INDEX_NAME}' créé avec mapping.")
+            # INDEX_NAME est un alias vers un index versionné (cf. reindex_all)
+            physical = f"{INDEX_NAME}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+            es.indices.create(index=physical, body=VEHICLES_MAPPING)
+            es.indices.put_alias(index=physical, name=INDEX_NAME)
+            print(f"Index '{physical}' créé avec mapping (alias '{INDEX_NAME}').")
     except Exception as e:
         print("Erreur lors de la création de l'index:", e)
         return 1
 
+    # Index de percolation des alertes, rempli avec les alertes actives
+    try:
+        from app.db import SessionLocal
+        db = SessionLocal()
+        try:
+            count = alert_matching.rebuild_index(es, db)
+        finally:
+            db.close()
+        print(f"Index '{alert_matching.ALERTS_INDEX}' : {count} alertes indexées.")
+    except Exception as e:
+        print("Erreur lors de l'indexation des alertes:", e)
+        return 1
+
     return 0
 
 if __name__ == "__main__":
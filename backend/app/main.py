@@ -21,7 +21,7 @@ logging.basicConfig(
 logger = logging.getLogger("voiture-search")
 
 # import routers
-from app.routes import vehicles, search, auth, alerts, search_history, chatbot, similar, admin, scrape, search_advanced, assisted, messages, pro, encyclopedia  # noqa: E402
+from app.routes import vehicles, search, auth, alerts, search_history, chatbot, similar, admin, scrape, search_advanced, assisted, messages, pro, encyclopedia, notifications  # noqa: E402
 from app.routes.favorites import router as favorites_router  # noqa: E402
 
 app = FastAPI(title="Voiture Search API", version="0.2.0")
@@ -79,6 +79,7 @@ app.include_router(assisted.router)
 app.include_router(messages.router)
 app.include_router(pro.router)
 app.include_router(encyclopedia.router)
+app.include_router(notifications.router)
 
 # Exception handlers for nicer JSON errors
 @app.exception_handler(RequestValidationError)
@@ -99,6 +100,22 @@ async def generic_exception_handler(request: Request, exc: Exception):
     logger.exception("Unhandled exception: %s %s", request.method, request.url.path)
     return JSONResponse(status_code=500, content={"error": "internal_server_error", "detail": "An internal error occurred."})
 
+@app.on_event("startup")
+async def start_event_fanout():
+    from app.services.realtime import event_fanout
+    from app.websocket_manager import ws_manager
+    await ws_manager.start()
+    await event_fanout.start()
+
+@app.on_event("shutdown")
+async def close_search_clients():
+    from app.services.search import close_async_client
+    from app.services.realtime import event_fanout
+    from app.websocket_manager import ws_manager
+    await close_async_client()
+    await event_fanout.stop()
+    await ws_manager.stop()
+
 @app.get("/")
 async def root():
     return {"message": "API ok", "version": "0.2.0"}
\ No newline at end of file
@@ -1,6 +1,6 @@
 # backend/app/models.py
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, String, Integer, JSON, TIMESTAMP, Boolean, ForeignKey, Text, Enum as SQLEnum, Table
+from sqlalchemy import Column, String, Integer, JSON, TIMESTAMP, Boolean, ForeignKey, Text, Enum as SQLEnum, Table, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -41,6 +41,8 @@ class Vehicle(Base):
     - create_vehicles.py: id, title, make, model, price, mileage, year, source_ids, created_at
     - add_users_roles.py: professional_user_id
     - add_vehicle_is_active.py: is_active
+    - add_vehicle_fingerprint.py: vin, fingerprint
+    - add_vehicle_content_hash.py: content_hash
     """
     __tablename__ = "vehicles"
 
@@ -56,10 +58,12 @@ class Vehicle(Base):
     created_at = Column(TIMESTAMP, default=datetime.utcnow, index=True)
     professional_user_id = Column(String, ForeignKey('users.id', ondelete='SET NULL'), nullable=True, index=True)
     is_active = Column(Boolean, default=True, nullable=False)
+    vin = Column(String, nullable=True, index=True)
+    fingerprint = Column(String, nullable=True, index=True)  # Empreinte de déduplication (app.services.dedup)
+    content_hash = Column(String, nullable=True)  # Empreinte du contenu (app.services.content_hash)
 
     # ===== COLONNES COMMENTÉES CAR N'EXISTENT PAS EN DB =====
     # Stocker ces données dans le JSON source_ids
-    # vin = Column(String)
     # fuel_type = Column(String)
     # transmission = Column(String)
     # description = Column(Text)
@@ -193,11 +197,47 @@ class Message(Base):
     read_at = Column(TIMESTAMP, nullable=True)
     created_at = Column(TIMESTAMP, default=datetime.utcnow, index=True)
     
+    __table_args__ = (
+        # Historique d'une conversation paginé par curseur (created_at, id)
+        Index('ix_messages_conversation_created', 'conversation_id', 'created_at', 'id'),
+        # Messages non lus d'un destinataire (lecture groupée, compteurs)
+        Index('ix_messages_unread_recipient', 'recipient_id', 'conversation_id',
+              postgresql_where=is_read == False),  # noqa: E712
+    )
+    
     # Relations
     sender = relationship("User", foreign_keys=[sender_id], backref="sent_messages")
     recipient = relationship("User", foreign_keys=[recipient_id], backref="received_messages")
 
 
+class Conversation(Base):
+    """
+    Résumé d'une conversation, une ligne par participant (dénormalisé depuis
+    messages) : dernier message et nombre de messages non lus par ce participant.
+    Tenu à jour par app.services.conversations à l'envoi et à la lecture.
+    """
+    __tablename__ = "conversations"
+
+    conversation_id = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    other_user_id = Column(String, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+
+    last_message_id = Column(String, nullable=False)
+    last_message_content = Column(Text, nullable=False)
+    last_sender_id = Column(String, nullable=False)
+    last_message_at = Column(TIMESTAMP, nullable=False)
+    last_message_is_read = Column(Boolean, nullable=False, default=False)
+
+    unread_count = Column(Integer, nullable=False, default=0)
+
+    # Liste paginée par curseur (last_message_at, conversation_id) d'un utilisateur
+    __table_args__ = (
+        Index('ix_conversations_user_last_message', 'user_id', 'last_message_at', 'conversation_id'),
+    )
+
+    other_user = relationship("User", foreign_keys=[other_user_id])
+
+
 # ==================== ENCYCLOPÉDIE AUTOMOBILE ====================
 
 class CarBrand(Base):
@@ -2,15 +2,16 @@
 import logging
 import redis
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import select, delete, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import Dict, Any
 
-from app.db import SessionLocal
+from app.db import get_async_db
 from app.models import User, Vehicle, UserRole
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user_async
 from app.config import settings
+from app.services.indexing import REINDEX_PROGRESS_KEY, REINDEX_LOCK_KEY
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/admin", tags=["admin"])
@@ -22,14 +23,13 @@ except Exception as e:
     logger.error(f"Erreur connexion Redis: {e}")
     redis_client = None
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def _count(db: AsyncSession, query) -> int:
+    return await db.scalar(select(func.count()).select_from(query.subquery()))
+
+def _from_source(source: str):
+    return func.json_extract_path_text(Vehicle.source_ids, source).isnot(None)
 
-async def require_admin(current_user: User = Depends(get_current_user)) -> User:
+async def require_admin(current_user: User = Depends(get_current_user_async)) -> User:
     """Vérifier que l'utilisateur est ADMIN"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -43,38 +43,33 @@ async def require_admin(current_user: User = Depends(get_current_user)) -> User:
 @router.get("/stats")
 async def get_admin_stats(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Statistiques globales pour le dashboard admin"""
     
     # Total véhicules
-    total_vehicles = db.query(Vehicle).count()
+    total_vehicles = await _count(db, select(Vehicle.id))
     
     # Par source
     sources_stats = {}
     for source in ['leboncoin', 'lacentrale', 'autoscout24']:
-        count = db.query(Vehicle).filter(
-            func.json_extract_path_text(Vehicle.source_ids, source).isnot(None)
-        ).count()
-        sources_stats[source] = count
+        sources_stats[source] = await _count(db, select(Vehicle.id).where(_from_source(source)))
     
     # Statistiques 24h
     yesterday = datetime.utcnow() - timedelta(days=1)
     
-    new_vehicles_24h = db.query(Vehicle).filter(
+    new_vehicles_24h = await _count(db, select(Vehicle.id).where(
         Vehicle.created_at >= yesterday
-    ).count()
+    ))
     
-    updated_vehicles_24h = db.query(Vehicle).filter(
-        Vehicle.updated_at >= yesterday,
-        Vehicle.created_at < yesterday
-    ).count()
+    # La table vehicles n'a pas de colonne updated_at
+    updated_vehicles_24h = 0
     
     # Déduplication (simulé - à adapter selon votre logique)
     # Compter les véhicules avec même VIN ou similaires
-    duplicates_count = db.query(Vehicle).filter(
+    duplicates_count = await _count(db, select(Vehicle.vin).where(
         Vehicle.vin.isnot(None)
-    ).group_by(Vehicle.vin).having(func.count(Vehicle.id) > 1).count()
+    ).group_by(Vehicle.vin).having(func.count(Vehicle.id) > 1))
     
     deduplication_rate = (duplicates_count / total_vehicles * 100) if total_vehicles > 0 else 0
     
@@ -85,10 +80,10 @@ async def get_admin_stats(
         start_date = date.replace(hour=0, minute=0, second=0, microsecond=0)
         end_date = start_date + timedelta(days=1)
         
-        count = db.query(Vehicle).filter(
+        count = await _count(db, select(Vehicle.id).where(
             Vehicle.created_at >= start_date,
             Vehicle.created_at < end_date
-        ).count()
+        ))
         
         by_day.append({
             "date": start_date.strftime("%Y-%m-%d"),
@@ -137,9 +132,9 @@ async def get_worker_health(
     
     # Tester PostgreSQL
     try:
-        from app.db import engine
-        conn = engine.connect()
-        conn.close()
+        from app.db import async_engine
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
         db_ok = True
     except Exception:
         db_ok = False
@@ -340,27 +335,28 @@ async def get_queue_status(
 @router.get("/users")
 async def get_all_users(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     page: int = 1,
     size: int = 50,
     role: str = None
 ):
     """Liste tous les utilisateurs (admin)"""
     
-    query = db.query(User)
+    query = select(User)
     
     if role:
         try:
             user_role = UserRole[role.upper()]
-            query = query.filter(User.role == user_role)
+            query = query.where(User.role == user_role)
         except KeyError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Rôle invalide: {role}"
             )
     
-    total = query.count()
-    users = query.order_by(User.created_at.desc()).offset((page - 1) * size).limit(size).all()
+    total = await _count(db, query)
+    result = await db.execute(query.order_by(User.created_at.desc()).offset((page - 1) * size).limit(size))
+    users = result.scalars().all()
     
     return {
         "total": total,
@@ -374,11 +370,11 @@ async def update_user_role(
     user_id: str,
     new_role: str,
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Changer le rôle d'un utilisateur"""
     
-    user = db.get(User, user_id)
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -397,8 +393,8 @@ async def update_user_role(
     user.role = user_role
     user.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     logger.info(f"Rôle de {user.email} changé de {old_role} à {user_role} par {current_user.email}")
     
@@ -413,11 +409,11 @@ async def update_user_role(
 async def toggle_user_active(
     user_id: str,
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Activer/désactiver un compte utilisateur"""
     
-    user = db.get(User, user_id)
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -433,8 +429,8 @@ async def toggle_user_active(
     user.is_active = not user.is_active
     user.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     action = "activé" if user.is_active else "désactivé"
     logger.info(f"Compte {user.email} {action} par {current_user.email}")
@@ -450,7 +446,7 @@ async def toggle_user_active(
 @router.get("/stats/sources-detail")
 async def get_sources_detail(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Statistiques détaillées par source"""
     
@@ -458,22 +454,20 @@ async def get_sources_detail(
     
     for source in ['leboncoin', 'lacentrale', 'autoscout24']:
         # Véhicules de cette source
-        total = db.query(Vehicle).filter(
-            func.json_extract_path_text(Vehicle.source_ids, source).isnot(None)
-        ).count()
+        total = await _count(db, select(Vehicle.id).where(_from_source(source)))
         
         # Ajoutés dans les 7 derniers jours
         week_ago = datetime.utcnow() - timedelta(days=7)
-        recent = db.query(Vehicle).filter(
-            func.json_extract_path_text(Vehicle.source_ids, source).isnot(None),
+        recent = await _count(db, select(Vehicle.id).where(
+            _from_source(source),
             Vehicle.created_at >= week_ago
-        ).count()
+        ))
         
         # Prix moyen
-        avg_price = db.query(func.avg(Vehicle.price)).filter(
-            func.json_extract_path_text(Vehicle.source_ids, source).isnot(None),
+        avg_price = await db.scalar(select(func.avg(Vehicle.price)).where(
+            _from_source(source),
             Vehicle.price.isnot(None)
-        ).scalar()
+        ))
         
         sources_detail[source] = {
             "total": total,
@@ -486,22 +480,21 @@ async def get_sources_detail(
 @router.get("/stats/users")
 async def get_users_stats(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Statistiques utilisateurs"""
     
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
+    total_users = await _count(db, select(User.id))
+    active_users = await _count(db, select(User.id).where(User.is_active == True))
     
-    # Par rôle
-    by_role = {}
-    for role in UserRole:
-        count = db.query(User).filter(User.role == role).count()
-        by_role[role.value] = count
+    # Par rôle (un seul GROUP BY)
+    result = await db.execute(select(User.role, func.count(User.id)).group_by(User.role))
+    counts = dict(result.all())
+    by_role = {role.value: counts.get(role, 0) for role in UserRole}
     
     # Nouveaux utilisateurs (7 derniers jours)
     week_ago = datetime.utcnow() - timedelta(days=7)
-    new_users_7d = db.query(User).filter(User.created_at >= week_ago).count()
+    new_users_7d = await _count(db, select(User.id).where(User.created_at >= week_ago))
     
     return {
         "total": total_users,
@@ -516,28 +509,33 @@ async def get_users_stats(
 @router.post("/maintenance/reindex-elasticsearch")
 async def reindex_elasticsearch(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    batch_size: int = 1000
 ):
-    """Réindexer tous les véhicules dans Elasticsearch"""
+    """Réindexer tous les véhicules dans Elasticsearch (tâche Celery, index versionné + alias)"""
+    
+    if redis_client and redis_client.exists(REINDEX_LOCK_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Une réindexation est déjà en cours"
+        )
     
     try:
-        from app.elasticsearch_client import es
-        from app.config import settings
+        from app.tasks import reindex_elasticsearch as reindex_task
+        task = reindex_task.apply_async(kwargs={'batch_size': batch_size})
         
-        # Compter les véhicules
-        total_vehicles = db.query(Vehicle).count()
-        
-        # TODO: Implémenter la logique de réindexation en batch
-        # Pour éviter de surcharger, traiter par lots de 100
-        
-        logger.info(f"Réindexation ES lancée par {current_user.email} ({total_vehicles} véhicules)")
+        logger.info(f"Réindexation ES lancée par {current_user.email} (task {task.id})")
         
         return {
             "message": "Réindexation lancée",
-            "total_vehicles": total_vehicles,
-            "status": "in_progress"
+            "task_id": task.id,
+            "status": "queued"
         }
         
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Celery n'est pas disponible. La réindexation est désactivée."
+        )
     except Exception as e:
         logger.error(f"Erreur réindexation: {e}")
         raise HTTPException(
@@ -545,11 +543,35 @@ async def reindex_elasticsearch(
             detail=f"Erreur: {str(e)}"
         )
 
+@router.get("/maintenance/reindex-elasticsearch")
+async def get_reindex_progress(
+    current_user: User = Depends(require_admin)
+):
+    """Avancement de la dernière réindexation (publié par la tâche Celery)"""
+    
+    if not redis_client:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Redis non disponible"
+        )
+    
+    progress = redis_client.hgetall(REINDEX_PROGRESS_KEY)
+    if not progress:
+        return {"status": "idle"}
+    
+    for field in ('total', 'indexed', 'errors'):
+        if field in progress:
+            progress[field] = int(progress[field])
+    total = progress.get('total') or 0
+    progress['percent'] = round(100 * progress.get('indexed', 0) / total, 1) if total else 100.0
+    return progress
+
 @router.post("/maintenance/cleanup-old-vehicles")
 async def cleanup_old_vehicles(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db),
-    days: int = 90
+    db: AsyncSession = Depends(get_async_db),
+    days: int = 90,
+    confirm: bool = False
 ):
     """Supprimer les véhicules de plus de X jours"""
     
@@ -562,7 +584,7 @@ async def cleanup_old_vehicles(
     cutoff_date = datetime.utcnow() - timedelta(days=days)
     
     # Compter d'abord
-    count = db.query(Vehicle).filter(Vehicle.created_at < cutoff_date).count()
+    count = await _count(db, select(Vehicle.id).where(Vehicle.created_at < cutoff_date))
     
     if not confirm:
         return {
@@ -572,8 +594,9 @@ async def cleanup_old_vehicles(
         }
     
     # Supprimer
-    deleted = db.query(Vehicle).filter(Vehicle.created_at < cutoff_date).delete()
-    db.commit()
+    result = await db.execute(delete(Vehicle).where(Vehicle.created_at < cutoff_date))
+    await db.commit()
+    deleted = result.rowcount
     
     logger.warning(f"{deleted} véhicules supprimés par {current_user.email} (> {days} jours)")
     
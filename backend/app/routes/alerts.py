@@ -9,6 +9,8 @@ from app.db import SessionLocal
 from app.models import Alert, User
 from app.schemas import AlertCreate, AlertUpdate, AlertOut
 from app.dependencies import get_current_user
+from app.elasticsearch_client import es
+from app.services import alert_matching
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/alerts", tags=["alerts"])
@@ -60,6 +62,7 @@ async def create_alert(
     db.add(alert)
     db.commit()
     db.refresh(alert)
+    alert_matching.index_alert(es, alert)
     
     logger.info(f"Alerte créée: {alert.name} pour user {current_user.email}")
     return alert
@@ -120,6 +123,7 @@ async def update_alert(
     
     db.commit()
     db.refresh(alert)
+    alert_matching.index_alert(es, alert)
     
     logger.info(f"Alerte modifiée: {alert.id}")
     return alert
@@ -144,6 +148,7 @@ async def delete_alert(
     
     db.delete(alert)
     db.commit()
+    alert_matching.remove_alert(es, alert_id)
     
     logger.info(f"Alerte supprimée: {alert_id}")
     return None
@@ -169,6 +174,7 @@ async def toggle_alert(
     alert.is_active = not alert.is_active
     db.commit()
     db.refresh(alert)
+    alert_matching.index_alert(es, alert)
     
     logger.info(f"Alerte {'activée' if alert.is_active else 'désactivée'}: {alert_id}")
     return alert
\ No newline at end of file
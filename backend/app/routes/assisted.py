@@ -2,11 +2,13 @@
 import uuid
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import datetime
 
-from app.db import SessionLocal
+from app.db import get_async_db
 from app.models import (
     User, AssistedRequest, ProposedVehicle, Vehicle,
     RequestStatus, ProposalStatus, UserRole
@@ -99,25 +101,53 @@ class ProposedVehicleWithDetails(BaseModel):
     vehicle: Optional[Dict[str, Any]] = None  # Détails du véhicule
 
     model_config = {"from_attributes": True}
-from app.dependencies import get_current_user, require_expert
+from app.dependencies import get_current_user_async, require_expert_async
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/assisted", tags=["assisted"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# AssistedRequestOut sérialise client/expert : chargés d'avance (pas de lazy load en async)
+REQUEST_USERS = (selectinload(AssistedRequest.client), selectinload(AssistedRequest.expert))
+
+async def _get_request(db: AsyncSession, *criteria):
+    """Demande (avec client et expert) correspondant aux critères, ou None"""
+    result = await db.execute(
+        select(AssistedRequest).options(*REQUEST_USERS).where(*criteria).limit(1)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def _list_requests(db: AsyncSession, query) -> list:
+    result = await db.execute(
+        query.options(*REQUEST_USERS).order_by(AssistedRequest.created_at.desc())
+    )
+    return result.scalars().all()
+
+async def _get_client_proposal(db: AsyncSession, proposal_id: str, client_id: str):
+    result = await db.execute(
+        select(ProposedVehicle).join(AssistedRequest).where(
+            ProposedVehicle.id == proposal_id,
+            AssistedRequest.client_id == client_id
+        ).limit(1)
+    )
+    return result.scalars().first()
+
+async def _vehicles_by_id(db: AsyncSession, vehicle_ids) -> dict:
+    if not vehicle_ids:
+        return {}
+    result = await db.execute(select(Vehicle).where(Vehicle.id.in_(set(vehicle_ids))))
+    return {v.id: v for v in result.scalars()}
+
+async def _count(db: AsyncSession, query) -> int:
+    return await db.scalar(select(func.count()).select_from(query.subquery()))
 
 # ============ ROUTES CLIENT ============
 
 @router.post("/requests", response_model=AssistedRequestOut, status_code=status.HTTP_201_CREATED)
 async def create_assisted_request(
     request_data: AssistedRequestCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Créer une demande d'assistance (client - PARTICULIERS UNIQUEMENT)"""
 
@@ -142,39 +172,35 @@ async def create_assisted_request(
     )
 
     db.add(request)
-    db.commit()
-    db.refresh(request)
+    await db.commit()
 
     logger.info(f"Demande assistée créée: {request.id} par {current_user.email}")
-    return request
+    return await _get_request(db, AssistedRequest.id == request.id)
 
 @router.get("/requests/me", response_model=List[AssistedRequestOut])
 async def get_my_requests(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
     status_filter: Optional[RequestStatus] = None
 ):
     """Récupérer mes demandes (client)"""
-    query = db.query(AssistedRequest).filter(
+    query = select(AssistedRequest).where(
         AssistedRequest.client_id == current_user.id
     )
     
     if status_filter:
-        query = query.filter(AssistedRequest.status == status_filter)
+        query = query.where(AssistedRequest.status == status_filter)
     
-    requests = query.order_by(AssistedRequest.created_at.desc()).all()
-    return requests
+    return await _list_requests(db, query)
 
 @router.get("/requests/{request_id}", response_model=AssistedRequestOut)
 async def get_request_detail(
     request_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Détail d'une demande (client OU expert assigné)"""
-    request = db.query(AssistedRequest).filter(
-        AssistedRequest.id == request_id
-    ).first()
+    request = await _get_request(db, AssistedRequest.id == request_id)
 
     if not request:
         raise HTTPException(
@@ -195,14 +221,15 @@ async def get_request_detail(
 async def update_my_request(
     request_id: str,
     update_data: AssistedRequestUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Modifier ma demande (client, uniquement si EN_ATTENTE)"""
-    request = db.query(AssistedRequest).filter(
+    request = await _get_request(
+        db,
         AssistedRequest.id == request_id,
         AssistedRequest.client_id == current_user.id
-    ).first()
+    )
     
     if not request:
         raise HTTPException(
@@ -219,21 +246,23 @@ async def update_my_request(
     for key, value in update_data.dict(exclude_unset=True).items():
         setattr(request, key, value)
     
-    db.commit()
-    db.refresh(request)
-    return request
+    await db.commit()
+    return await _get_request(db, AssistedRequest.id == request_id)
 
 @router.delete("/requests/{request_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_request(
     request_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Annuler ma demande (client)"""
-    request = db.query(AssistedRequest).filter(
-        AssistedRequest.id == request_id,
-        AssistedRequest.client_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(AssistedRequest).where(
+            AssistedRequest.id == request_id,
+            AssistedRequest.client_id == current_user.id
+        ).limit(1)
+    )
+    request = result.scalars().first()
     
     if not request:
         raise HTTPException(
@@ -248,7 +277,7 @@ async def cancel_request(
         )
     
     request.status = RequestStatus.CANCELLED
-    db.commit()
+    await db.commit()
     
     logger.info(f"Demande annulée: {request_id}")
     return None
@@ -258,13 +287,11 @@ async def cancel_request(
 @router.get("/requests/{request_id}/proposals", response_model=List[ProposedVehicleWithDetails])
 async def get_my_proposals(
     request_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Voir les véhicules proposés avec détails complets (client OU expert assigné)"""
-    request = db.query(AssistedRequest).filter(
-        AssistedRequest.id == request_id
-    ).first()
+    request = await db.get(AssistedRequest, request_id)
 
     if not request:
         raise HTTPException(
@@ -279,14 +306,18 @@ async def get_my_proposals(
             detail="Accès non autorisé à cette demande"
         )
 
-    proposals = db.query(ProposedVehicle).filter(
-        ProposedVehicle.request_id == request_id
-    ).order_by(ProposedVehicle.created_at.desc()).all()
+    proposals_result = await db.execute(
+        select(ProposedVehicle).where(
+            ProposedVehicle.request_id == request_id
+        ).order_by(ProposedVehicle.created_at.desc())
+    )
+    proposals = proposals_result.scalars().all()
 
-    # Enrichir chaque proposition avec les détails du véhicule
+    # Enrichir chaque proposition avec les détails du véhicule (une seule requête)
+    vehicles = await _vehicles_by_id(db, [p.vehicle_id for p in proposals])
     result = []
     for proposal in proposals:
-        vehicle = db.query(Vehicle).filter(Vehicle.id == proposal.vehicle_id).first()
+        vehicle = vehicles.get(proposal.vehicle_id)
 
         vehicle_data = None
         if vehicle:
@@ -327,14 +358,11 @@ async def get_my_proposals(
 async def update_proposal_status(
     proposal_id: str,
     update_data: ProposalUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Marquer un véhicule proposé (client : coup de cœur ou refusé)"""
-    proposal = db.query(ProposedVehicle).join(AssistedRequest).filter(
-        ProposedVehicle.id == proposal_id,
-        AssistedRequest.client_id == current_user.id
-    ).first()
+    proposal = await _get_client_proposal(db, proposal_id, current_user.id)
 
     if not proposal:
         raise HTTPException(
@@ -346,8 +374,8 @@ async def update_proposal_status(
     proposal.rejection_reason = update_data.rejection_reason
     proposal.updated_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(proposal)
+    await db.commit()
+    await db.refresh(proposal)
 
     logger.info(f"Proposition {proposal_id} mise à jour: {update_data.status}")
     return proposal
@@ -357,16 +385,19 @@ async def update_proposal_status(
 @router.get("/requests/{request_id}/tinder/next", response_model=Optional[ProposedVehicleWithDetails])
 async def get_next_proposal_tinder(
     request_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtenir la prochaine proposition non évaluée (interface Tinder)"""
 
     # Vérifier que la demande appartient au client
-    request = db.query(AssistedRequest).filter(
-        AssistedRequest.id == request_id,
-        AssistedRequest.client_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(AssistedRequest.id).where(
+            AssistedRequest.id == request_id,
+            AssistedRequest.client_id == current_user.id
+        ).limit(1)
+    )
+    request = result.scalar()
 
     if not request:
         raise HTTPException(
@@ -375,20 +406,26 @@ async def get_next_proposal_tinder(
         )
 
     # Récupérer la prochaine proposition PENDING
-    proposal = db.query(ProposedVehicle).filter(
-        ProposedVehicle.request_id == request_id,
-        ProposedVehicle.status == ProposalStatus.PENDING
-    ).order_by(ProposedVehicle.created_at.asc()).first()
+    result = await db.execute(
+        select(ProposedVehicle).where(
+            ProposedVehicle.request_id == request_id,
+            ProposedVehicle.status == ProposalStatus.PENDING
+        ).order_by(ProposedVehicle.created_at.asc()).limit(1)
+    )
+    proposal = result.scalars().first()
 
     if not proposal:
         return None  # Plus de propositions à évaluer
 
     # Charger les détails du véhicule
-    vehicle = db.query(Vehicle).filter(Vehicle.id == proposal.vehicle_id).first()
+    vehicle = await db.get(Vehicle, proposal.vehicle_id)
 
-    # Construire la réponse avec les détails du véhicule
-    result = ProposedVehicleWithDetails.model_validate(proposal)
+    # Construire la réponse avec les détails du véhicule (la relation ORM
+    # proposal.vehicle n'est pas sérialisable telle quelle)
+    result = ProposedVehicleWithDetails(**ProposedVehicleOut.model_validate(proposal).model_dump())
     if vehicle:
+        # Les métadonnées sans colonne dédiée sont dans source_ids
+        source_data = vehicle.source_ids or {}
         result.vehicle = {
             "id": vehicle.id,
             "title": vehicle.title,
@@ -397,11 +434,11 @@ async def get_next_proposal_tinder(
             "price": vehicle.price,
             "mileage": vehicle.mileage,
             "year": vehicle.year,
-            "fuel_type": vehicle.fuel_type,
-            "transmission": vehicle.transmission,
-            "description": vehicle.description,
-            "images": vehicle.images,
-            "location_city": vehicle.location_city
+            "fuel_type": source_data.get("fuel_type"),
+            "transmission": source_data.get("transmission"),
+            "description": source_data.get("description"),
+            "images": source_data.get("images", []),
+            "location_city": source_data.get("location_city")
         }
 
     return result
@@ -410,15 +447,12 @@ async def get_next_proposal_tinder(
 async def like_proposal_tinder(
     proposal_id: str,
     action_data: TinderActionRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Liker une proposition (interface Tinder)"""
 
-    proposal = db.query(ProposedVehicle).join(AssistedRequest).filter(
-        ProposedVehicle.id == proposal_id,
-        AssistedRequest.client_id == current_user.id
-    ).first()
+    proposal = await _get_client_proposal(db, proposal_id, current_user.id)
 
     if not proposal:
         raise HTTPException(
@@ -430,8 +464,8 @@ async def like_proposal_tinder(
     proposal.client_feedback = action_data.feedback
     proposal.updated_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(proposal)
+    await db.commit()
+    await db.refresh(proposal)
 
     logger.info(f"Proposition {proposal_id} likée par client")
     return proposal
@@ -440,15 +474,12 @@ async def like_proposal_tinder(
 async def super_like_proposal_tinder(
     proposal_id: str,
     action_data: TinderActionRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Coup de foudre sur une proposition (interface Tinder)"""
 
-    proposal = db.query(ProposedVehicle).join(AssistedRequest).filter(
-        ProposedVehicle.id == proposal_id,
-        AssistedRequest.client_id == current_user.id
-    ).first()
+    proposal = await _get_client_proposal(db, proposal_id, current_user.id)
 
     if not proposal:
         raise HTTPException(
@@ -460,8 +491,8 @@ async def super_like_proposal_tinder(
     proposal.client_feedback = action_data.feedback
     proposal.updated_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(proposal)
+    await db.commit()
+    await db.refresh(proposal)
 
     logger.info(f"Proposition {proposal_id} SUPER LIKÉE (coup de foudre) par client")
     return proposal
@@ -470,15 +501,12 @@ async def super_like_proposal_tinder(
 async def reject_proposal_tinder(
     proposal_id: str,
     action_data: TinderActionRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Refuser une proposition (interface Tinder)"""
 
-    proposal = db.query(ProposedVehicle).join(AssistedRequest).filter(
-        ProposedVehicle.id == proposal_id,
-        AssistedRequest.client_id == current_user.id
-    ).first()
+    proposal = await _get_client_proposal(db, proposal_id, current_user.id)
 
     if not proposal:
         raise HTTPException(
@@ -491,8 +519,8 @@ async def reject_proposal_tinder(
     proposal.client_feedback = action_data.feedback
     proposal.updated_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(proposal)
+    await db.commit()
+    await db.refresh(proposal)
 
     logger.info(f"Proposition {proposal_id} refusée par client")
     return proposal
@@ -501,44 +529,46 @@ async def reject_proposal_tinder(
 
 @router.get("/requests", response_model=List[AssistedRequestOut])
 async def get_available_requests(
-    current_user: User = Depends(require_expert),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(require_expert_async),
+    db: AsyncSession = Depends(get_async_db),
     status_filter: Optional[RequestStatus] = Query(RequestStatus.PENDING)
 ):
     """Liste des demandes disponibles (expert)"""
-    query = db.query(AssistedRequest)
+    query = select(AssistedRequest)
     
     if status_filter == RequestStatus.PENDING:
         # Demandes en attente (non assignées)
-        query = query.filter(
+        query = query.where(
             AssistedRequest.status == RequestStatus.PENDING,
             AssistedRequest.expert_id.is_(None)
         )
     elif status_filter == RequestStatus.IN_PROGRESS:
         # Mes demandes en cours
-        query = query.filter(
+        query = query.where(
             AssistedRequest.status == RequestStatus.IN_PROGRESS,
             AssistedRequest.expert_id == current_user.id
         )
     else:
         # Toutes mes demandes (en cours + terminées)
-        query = query.filter(AssistedRequest.expert_id == current_user.id)
+        query = query.where(AssistedRequest.expert_id == current_user.id)
     
-    requests = query.order_by(AssistedRequest.created_at.desc()).all()
-    return requests
+    return await _list_requests(db, query)
 
 @router.post("/requests/{request_id}/accept", response_model=AssistedRequestOut)
 async def accept_request(
     request_id: str,
-    current_user: User = Depends(require_expert),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(require_expert_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Accepter une demande (expert) et créer automatiquement une conversation"""
-    request = db.query(AssistedRequest).filter(
-        AssistedRequest.id == request_id,
-        AssistedRequest.status == RequestStatus.PENDING,
-        AssistedRequest.expert_id.is_(None)
-    ).first()
+    result = await db.execute(
+        select(AssistedRequest).where(
+            AssistedRequest.id == request_id,
+            AssistedRequest.status == RequestStatus.PENDING,
+            AssistedRequest.expert_id.is_(None)
+        ).limit(1)
+    )
+    request = result.scalars().first()
 
     if not request:
         raise HTTPException(
@@ -555,9 +585,10 @@ async def accept_request(
     conversation_id = f"{min(current_user.id, request.client_id)}_{max(current_user.id, request.client_id)}"
 
     # Vérifier si une conversation existe déjà
-    existing_message = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).first()
+    result = await db.execute(
+        select(Message.id).where(Message.conversation_id == conversation_id).limit(1)
+    )
+    existing_message = result.scalar()
 
     # Si aucune conversation n'existe, créer un premier message de bienvenue
     if not existing_message:
@@ -573,25 +604,27 @@ async def accept_request(
         db.add(welcome_message)
         logger.info(f"Conversation créée entre expert {current_user.id} et client {request.client_id}")
 
-    db.commit()
-    db.refresh(request)
+    await db.commit()
 
     logger.info(f"Demande {request_id} acceptée par expert {current_user.email}")
-    return request
+    return await _get_request(db, AssistedRequest.id == request_id)
 
 @router.post("/requests/{request_id}/propose", response_model=ProposedVehicleOut)
 async def propose_vehicle(
     request_id: str,
     proposal_data: ProposedVehicleCreate,
-    current_user: User = Depends(require_expert),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(require_expert_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Proposer un véhicule à un client (expert)"""
-    request = db.query(AssistedRequest).filter(
-        AssistedRequest.id == request_id,
-        AssistedRequest.expert_id == current_user.id,
-        AssistedRequest.status == RequestStatus.IN_PROGRESS
-    ).first()
+    result = await db.execute(
+        select(AssistedRequest.id).where(
+            AssistedRequest.id == request_id,
+            AssistedRequest.expert_id == current_user.id,
+            AssistedRequest.status == RequestStatus.IN_PROGRESS
+        ).limit(1)
+    )
+    request = result.scalar()
 
     if not request:
         raise HTTPException(
@@ -600,7 +633,7 @@ async def propose_vehicle(
         )
 
     # Vérifier que le véhicule existe, sinon le créer si vehicle_data est fourni
-    vehicle = db.query(Vehicle).filter(Vehicle.id == proposal_data.vehicle_id).first()
+    vehicle = await db.get(Vehicle, proposal_data.vehicle_id)
     if not vehicle and proposal_data.vehicle_data:
         # Créer le véhicule à partir des données fournies
         vdata = proposal_data.vehicle_data
@@ -639,7 +672,7 @@ async def propose_vehicle(
             source_ids=source_data
         )
         db.add(vehicle)
-        db.flush()  # Pour obtenir l'ID sans commit
+        await db.flush()  # Pour obtenir l'ID sans commit
         logger.info(f"Véhicule créé depuis scraping: {vehicle.id}")
     elif not vehicle:
         raise HTTPException(
@@ -648,10 +681,13 @@ async def propose_vehicle(
         )
 
     # Vérifier si déjà proposé
-    existing = db.query(ProposedVehicle).filter(
-        ProposedVehicle.request_id == request_id,
-        ProposedVehicle.vehicle_id == proposal_data.vehicle_id
-    ).first()
+    result = await db.execute(
+        select(ProposedVehicle.id).where(
+            ProposedVehicle.request_id == request_id,
+            ProposedVehicle.vehicle_id == proposal_data.vehicle_id
+        ).limit(1)
+    )
+    existing = result.scalar()
 
     if existing:
         raise HTTPException(
@@ -668,8 +704,8 @@ async def propose_vehicle(
     )
 
     db.add(proposal)
-    db.commit()
-    db.refresh(proposal)
+    await db.commit()
+    await db.refresh(proposal)
 
     logger.info(f"Véhicule {proposal_data.vehicle_id} proposé pour demande {request_id}")
     return proposal
@@ -677,15 +713,18 @@ async def propose_vehicle(
 @router.post("/requests/{request_id}/complete", response_model=AssistedRequestOut)
 async def complete_request(
     request_id: str,
-    current_user: User = Depends(require_expert),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(require_expert_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Marquer une demande comme terminée (expert)"""
-    request = db.query(AssistedRequest).filter(
-        AssistedRequest.id == request_id,
-        AssistedRequest.expert_id == current_user.id,
-        AssistedRequest.status == RequestStatus.IN_PROGRESS
-    ).first()
+    result = await db.execute(
+        select(AssistedRequest).where(
+            AssistedRequest.id == request_id,
+            AssistedRequest.expert_id == current_user.id,
+            AssistedRequest.status == RequestStatus.IN_PROGRESS
+        ).limit(1)
+    )
+    request = result.scalars().first()
     
     if not request:
         raise HTTPException(
@@ -696,24 +735,26 @@ async def complete_request(
     request.status = RequestStatus.COMPLETED
     request.completed_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(request)
+    await db.commit()
     
     logger.info(f"Demande {request_id} terminée")
-    return request
+    return await _get_request(db, AssistedRequest.id == request_id)
 
 @router.get("/requests/{request_id}/feedback")
 async def get_request_feedback(
     request_id: str,
-    current_user: User = Depends(require_expert),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(require_expert_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtenir tous les feedbacks des clients pour une demande (expert)"""
 
-    request = db.query(AssistedRequest).filter(
-        AssistedRequest.id == request_id,
-        AssistedRequest.expert_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(AssistedRequest.id).where(
+            AssistedRequest.id == request_id,
+            AssistedRequest.expert_id == current_user.id
+        ).limit(1)
+    )
+    request = result.scalar()
 
     if not request:
         raise HTTPException(
@@ -722,14 +763,18 @@ async def get_request_feedback(
         )
 
     # Récupérer toutes les propositions avec leur feedback
-    proposals = db.query(ProposedVehicle).filter(
-        ProposedVehicle.request_id == request_id,
-        ProposedVehicle.status != ProposalStatus.PENDING
-    ).all()
+    result = await db.execute(
+        select(ProposedVehicle).where(
+            ProposedVehicle.request_id == request_id,
+            ProposedVehicle.status != ProposalStatus.PENDING
+        )
+    )
+    proposals = result.scalars().all()
 
+    vehicles = await _vehicles_by_id(db, [p.vehicle_id for p in proposals])
     feedbacks = []
     for proposal in proposals:
-        vehicle = db.query(Vehicle).filter(Vehicle.id == proposal.vehicle_id).first()
+        vehicle = vehicles.get(proposal.vehicle_id)
 
         feedbacks.append({
             "proposal_id": proposal.id,
@@ -766,41 +811,41 @@ async def get_request_feedback(
 
 @router.get("/expert/stats")
 async def get_expert_stats(
-    current_user: User = Depends(require_expert),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(require_expert_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Statistiques de l'expert"""
     
     # Compteurs
-    total_requests = db.query(AssistedRequest).filter(
+    total_requests = await _count(db, select(AssistedRequest.id).where(
         AssistedRequest.expert_id == current_user.id
-    ).count()
+    ))
     
-    pending_requests = db.query(AssistedRequest).filter(
+    pending_requests = await _count(db, select(AssistedRequest.id).where(
         AssistedRequest.expert_id == current_user.id,
         AssistedRequest.status == RequestStatus.IN_PROGRESS
-    ).count()
+    ))
     
-    completed_requests = db.query(AssistedRequest).filter(
+    completed_requests = await _count(db, select(AssistedRequest.id).where(
         AssistedRequest.expert_id == current_user.id,
         AssistedRequest.status == RequestStatus.COMPLETED
-    ).count()
+    ))
     
     # Propositions
-    total_proposals = db.query(ProposedVehicle).join(AssistedRequest).filter(
+    total_proposals = await _count(db, select(ProposedVehicle.id).join(AssistedRequest).where(
         AssistedRequest.expert_id == current_user.id
-    ).count()
+    ))
     
     # Comptabiliser LIKED + SUPER_LIKED comme acceptées
-    accepted_proposals = db.query(ProposedVehicle).join(AssistedRequest).filter(
+    accepted_proposals = await _count(db, select(ProposedVehicle.id).join(AssistedRequest).where(
         AssistedRequest.expert_id == current_user.id,
         ProposedVehicle.status.in_([ProposalStatus.LIKED, ProposalStatus.SUPER_LIKED])
-    ).count()
+    ))
 
-    super_liked_proposals = db.query(ProposedVehicle).join(AssistedRequest).filter(
+    super_liked_proposals = await _count(db, select(ProposedVehicle.id).join(AssistedRequest).where(
         AssistedRequest.expert_id == current_user.id,
         ProposedVehicle.status == ProposalStatus.SUPER_LIKED
-    ).count()
+    ))
     
     # Taux d'acceptation
     acceptance_rate = (accepted_proposals / total_proposals * 100) if total_proposals > 0 else 0
@@ -57,7 +57,7 @@ async def chat_search(
         interpretation = generate_interpretation(message, filters)
         
         # 3. Recherche Elasticsearch
-        search_results = SearchService.search(
+        search_results = await SearchService.asearch(
             q=None,  # Pas de query texte, on utilise les filtres
             filters=filters,
             page=1,
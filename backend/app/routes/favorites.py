@@ -1,46 +1,48 @@
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.db import SessionLocal
+from app.db import get_async_db
 from app.models import Favorite, Vehicle, User
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user_async
 from app.schemas import VehicleOut
 
 router = APIRouter(prefix="/api/favorites", tags=["favorites"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def _get_favorite(db: AsyncSession, user_id: str, vehicle_id: str):
+    result = await db.execute(
+        select(Favorite).where(
+            Favorite.user_id == user_id,
+            Favorite.vehicle_id == vehicle_id
+        ).limit(1)
+    )
+    return result.scalars().first()
 
 @router.get("/me", response_model=List[VehicleOut])
 async def get_my_favorites(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Récupérer mes favoris"""
-    favorites = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id
-    ).all()
-    
-    vehicle_ids = [f.vehicle_id for f in favorites]
-    vehicles = db.query(Vehicle).filter(Vehicle.id.in_(vehicle_ids)).all()
+    result = await db.execute(
+        select(Vehicle).join(Favorite, Favorite.vehicle_id == Vehicle.id).where(
+            Favorite.user_id == current_user.id
+        )
+    )
     
-    return vehicles
+    return result.scalars().all()
 
 @router.post("/{vehicle_id}", status_code=status.HTTP_201_CREATED)
 async def add_favorite(
     vehicle_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Ajouter un véhicule aux favoris"""
     # Vérifier que le véhicule existe
-    vehicle = db.get(Vehicle, vehicle_id)
+    vehicle = await db.get(Vehicle, vehicle_id)
     if not vehicle:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -48,10 +50,7 @@ async def add_favorite(
         )
     
     # Vérifier si déjà en favoris
-    existing = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id,
-        Favorite.vehicle_id == vehicle_id
-    ).first()
+    existing = await _get_favorite(db, current_user.id, vehicle_id)
     
     if existing:
         raise HTTPException(
@@ -67,21 +66,18 @@ async def add_favorite(
     )
     
     db.add(favorite)
-    db.commit()
+    await db.commit()
     
     return {"message": "Ajouté aux favoris", "vehicle_id": vehicle_id}
 
 @router.delete("/{vehicle_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_favorite(
     vehicle_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Retirer un véhicule des favoris"""
-    favorite = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id,
-        Favorite.vehicle_id == vehicle_id
-    ).first()
+    favorite = await _get_favorite(db, current_user.id, vehicle_id)
     
     if not favorite:
         raise HTTPException(
@@ -89,21 +85,18 @@ async def remove_favorite(
             detail="Favori non trouvé"
         )
     
-    db.delete(favorite)
-    db.commit()
+    await db.delete(favorite)
+    await db.commit()
     
     return None
 
 @router.get("/check/{vehicle_id}")
 async def check_favorite(
     vehicle_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Vérifier si un véhicule est en favoris"""
-    favorite = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id,
-        Favorite.vehicle_id == vehicle_id
-    ).first()
+    favorite = await _get_favorite(db, current_user.id, vehicle_id)
     
     return {"is_favorite": favorite is not None}
\ No newline at end of file
@@ -3,15 +3,19 @@ import uuid
 import logging
 import os
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query, status, WebSocket, WebSocketDisconnect, UploadFile, File
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import datetime
 
-from app.db import SessionLocal
+from app.db import get_async_db
 from app.models import User, Message
 from app.schemas import MessageCreate, MessageOut, ConversationOut
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user_async
+from app.services import conversations
+from app.services.unread_counters import unread_counters
+from app.websocket_manager import ws_manager
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/messages", tags=["messages"])
@@ -58,62 +62,21 @@ MESSAGE_TEMPLATES = {
     }
 }
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-        self.typing_status: Dict[str, Dict[str, bool]] = {}  # {conversation_id: {user_id: is_typing}}
-    
-    async def connect(self, websocket: WebSocket, user_id: str):
-        await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
-        logger.info(f"User {user_id} connected via WebSocket")
-    
-    def disconnect(self, websocket: WebSocket, user_id: str):
-        if user_id in self.active_connections:
-            try:
-                self.active_connections[user_id].remove(websocket)
-                if not self.active_connections[user_id]:
-                    del self.active_connections[user_id]
-            except ValueError:
-                pass
-        logger.info(f"User {user_id} disconnected from WebSocket")
-    
-    async def send_personal_message(self, message: dict, user_id: str):
-        if user_id in self.active_connections:
-            disconnected = []
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending message to {user_id}: {e}")
-                    disconnected.append(connection)
-            
-            for conn in disconnected:
-                self.disconnect(conn, user_id)
-    
-    async def broadcast_typing_status(self, conversation_id: str, user_id: str, is_typing: bool, recipient_id: str):
-        """Diffuser le statut 'en train d'écrire'"""
-        await self.send_personal_message(
-            {
-                "type": "typing_status",
-                "conversation_id": conversation_id,
-                "user_id": user_id,
-                "is_typing": is_typing
-            },
-            recipient_id
-        )
+# Connexions WebSocket : hub partagé (présence et diffusion entre nœuds via Redis)
+manager = ws_manager
 
-manager = ConnectionManager()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def broadcast_typing_status(conversation_id: str, user_id: str, is_typing: bool, recipient_id: str):
+    """Diffuser le statut 'en train d'écrire'"""
+    await manager.send_personal_message(
+        {
+            "type": "typing_status",
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "is_typing": is_typing
+        },
+        recipient_id
+    )
 
 # ============ TEMPLATES ============
 
@@ -127,7 +90,7 @@ async def get_message_templates():
 @router.post("/attachments")
 async def upload_attachment(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_async)
 ):
     """Upload un fichier joint (image uniquement)"""
     
@@ -175,48 +138,45 @@ async def upload_attachment(
 
 @router.get("/conversations", response_model=List[ConversationOut])
 async def get_conversations(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(50, ge=1, le=200),
+    before_at: Optional[datetime] = None,
+    before_id: Optional[str] = None
 ):
-    """Récupérer toutes mes conversations"""
-    messages = db.query(Message).filter(
-        (Message.sender_id == current_user.id) | (Message.recipient_id == current_user.id)
-    ).order_by(Message.created_at.desc()).all()
-    
-    conversations = {}
-    for msg in messages:
-        conv_id = msg.conversation_id
-        if conv_id not in conversations:
-            other_user_id = msg.recipient_id if msg.sender_id == current_user.id else msg.sender_id
-            other_user = db.get(User, other_user_id)
-            
-            conversations[conv_id] = {
-                "conversation_id": conv_id,
-                "other_user": {
-                    "id": other_user.id,
-                    "email": other_user.email,
-                    "full_name": other_user.full_name,
-                    "role": other_user.role
-                },
-                "last_message": {
-                    "content": msg.content,
-                    "created_at": msg.created_at,
-                    "is_read": msg.is_read,
-                    "sender_id": msg.sender_id
-                },
-                "unread_count": 0
-            }
-        
-        if msg.recipient_id == current_user.id and not msg.is_read:
-            conversations[conv_id]["unread_count"] += 1
-    
-    return list(conversations.values())
+    """
+    Récupérer mes conversations, plus récentes d'abord.
+    Page suivante : before_at / before_id = last_message.created_at / conversation_id
+    de la dernière conversation reçue.
+    """
+    before = (before_at, before_id) if before_at and before_id else None
+    rows = await conversations.list_conversations(db, current_user.id, limit, before)
+    
+    return [
+        {
+            "conversation_id": conv.conversation_id,
+            "other_user": {
+                "id": other_user.id,
+                "email": other_user.email,
+                "full_name": other_user.full_name,
+                "role": other_user.role
+            },
+            "last_message": {
+                "content": conv.last_message_content,
+                "created_at": conv.last_message_at,
+                "is_read": conv.last_message_is_read,
+                "sender_id": conv.last_sender_id
+            },
+            "unread_count": conv.unread_count
+        }
+        for conv, other_user in rows
+    ]
 
 @router.post("/conversations/{other_user_id}")
 async def get_or_create_conversation(
     other_user_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Créer ou récupérer une conversation avec un utilisateur"""
     if other_user_id == current_user.id:
@@ -225,22 +185,25 @@ async def get_or_create_conversation(
             detail="Vous ne pouvez pas créer une conversation avec vous-même"
         )
     
-    other_user = db.get(User, other_user_id)
+    other_user = await db.get(User, other_user_id)
     if not other_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Utilisateur non trouvé"
         )
     
-    existing = db.query(Message).filter(
-        ((Message.sender_id == current_user.id) & (Message.recipient_id == other_user_id)) |
-        ((Message.sender_id == other_user_id) & (Message.recipient_id == current_user.id))
-    ).first()
+    result = await db.execute(
+        select(Message.conversation_id).where(
+            ((Message.sender_id == current_user.id) & (Message.recipient_id == other_user_id)) |
+            ((Message.sender_id == other_user_id) & (Message.recipient_id == current_user.id))
+        ).limit(1)
+    )
+    existing_conversation_id = result.scalar()
     
-    if existing:
-        conversation_id = existing.conversation_id
+    if existing_conversation_id:
+        conversation_id = existing_conversation_id
     else:
-        conversation_id = f"{min(current_user.id, other_user_id)}_{max(current_user.id, other_user_id)}"
+        conversation_id = conversations.conversation_id_for(current_user.id, other_user_id)
     
     return {
         "conversation_id": conversation_id,
@@ -255,34 +218,42 @@ async def get_or_create_conversation(
 @router.get("/{conversation_id}", response_model=List[MessageOut])
 async def get_conversation_messages(
     conversation_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    limit: int = 100
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(100, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None
 ):
-    """Récupérer l'historique d'une conversation"""
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id,
-        ((Message.sender_id == current_user.id) | (Message.recipient_id == current_user.id))
-    ).order_by(Message.created_at.desc()).limit(limit).all()
-    
-    # Marquer comme lus
-    for msg in messages:
-        if msg.recipient_id == current_user.id and not msg.is_read:
-            msg.is_read = True
-            msg.read_at = datetime.utcnow()
-    
-    db.commit()
-    
-    return list(reversed(messages))
+    """
+    Récupérer l'historique d'une conversation (ordre chronologique).
+    before / after : id d'un message de la conversation, pour la page précédente / suivante.
+    """
+    cursors = {}
+    for name, message_id in (("before", before), ("after", after)):
+        if message_id:
+            cursor = await db.get(Message, message_id)
+            if not cursor or cursor.conversation_id != conversation_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Curseur '{name}' invalide"
+                )
+            cursors[name] = cursor
+    
+    # Marquer comme lus avant la lecture : la page renvoyée reflète l'état lu
+    read_ids = await conversations.mark_conversation_read(db, conversation_id, current_user.id)
+    await db.commit()
+    await unread_counters.decr(current_user.id, conversation_id, len(read_ids))
+    
+    return await conversations.list_messages(db, conversation_id, current_user.id, limit, **cursors)
 
 @router.post("", response_model=MessageOut, status_code=status.HTTP_201_CREATED)
 async def send_message(
     message_data: MessageCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Envoyer un message"""
-    recipient = db.get(User, message_data.recipient_id)
+    recipient = await db.get(User, message_data.recipient_id)
     if not recipient:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -295,7 +266,7 @@ async def send_message(
             detail="Vous ne pouvez pas vous envoyer un message"
         )
     
-    conversation_id = f"{min(current_user.id, message_data.recipient_id)}_{max(current_user.id, message_data.recipient_id)}"
+    conversation_id = conversations.conversation_id_for(current_user.id, message_data.recipient_id)
     
     message = Message(
         id=str(uuid.uuid4()),
@@ -308,8 +279,11 @@ async def send_message(
     )
     
     db.add(message)
-    db.commit()
-    db.refresh(message)
+    await db.flush()
+    await conversations.record_message(db, message)
+    await db.commit()
+    await db.refresh(message)
+    await unread_counters.incr(message.recipient_id, message.conversation_id)
     
     logger.info(f"Message envoyé: {current_user.id} -> {message_data.recipient_id}")
     
@@ -339,11 +313,11 @@ async def send_message(
 @router.patch("/{message_id}/read", response_model=MessageOut)
 async def mark_as_read(
     message_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Marquer un message comme lu"""
-    message = db.get(Message, message_id)
+    message = await db.get(Message, message_id)
     
     if not message:
         raise HTTPException(
@@ -357,24 +331,26 @@ async def mark_as_read(
             detail="Vous n'êtes pas le destinataire"
         )
     
-    message.is_read = True
-    message.read_at = datetime.utcnow()
+    newly_read = not message.is_read
+    if newly_read:
+        message.is_read = True
+        message.read_at = datetime.utcnow()
+        await conversations.mark_read(db, message.conversation_id, current_user.id, [message.id])
     
-    db.commit()
-    db.refresh(message)
+    await db.commit()
+    if newly_read:
+        await unread_counters.decr(current_user.id, message.conversation_id, 1)
+    await db.refresh(message)
     
     return message
 
 @router.get("/unread/count")
 async def get_unread_count(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Compter les messages non lus"""
-    count = db.query(Message).filter(
-        Message.recipient_id == current_user.id,
-        Message.is_read == False
-    ).count()
+    """Compter les messages non lus (compteur Redis, chargé depuis les conversations si absent)"""
+    count = await unread_counters.total(db, current_user.id)
     
     return {"unread_count": count}
 
@@ -390,7 +366,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             data = await websocket.receive_json()
             
             if data.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
+                manager.reply(websocket, user_id, {"type": "pong"})
             
             elif data.get("type") == "typing_start":
                 # Diffuser que l'utilisateur est en train d'écrire
@@ -398,7 +374,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                 recipient_id = data.get("recipient_id")
                 
                 if conversation_id and recipient_id:
-                    await manager.broadcast_typing_status(
+                    await broadcast_typing_status(
                         conversation_id, user_id, True, recipient_id
                     )
             
@@ -408,7 +384,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                 recipient_id = data.get("recipient_id")
                 
                 if conversation_id and recipient_id:
-                    await manager.broadcast_typing_status(
+                    await broadcast_typing_status(
                         conversation_id, user_id, False, recipient_id
                     )
     
@@ -0,0 +1,47 @@
+# backend/app/routes/notifications.py
+import logging
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from sqlalchemy import select
+
+from app.auth import decode_token
+from app.db import AsyncSessionLocal
+from app.models import User
+from app.websocket_manager import NOTIFICATIONS, ws_manager
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/notifications", tags=["notifications"])
+
+
+async def _user_from_token(token: str):
+    """Utilisateur actif du token JWT (None si invalide)"""
+    payload = decode_token(token)
+    email = payload.get("sub") if payload else None
+    if not email or AsyncSessionLocal is None:
+        return None
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+    return user if user and user.is_active else None
+
+
+@router.websocket("/ws")
+async def notifications_websocket(websocket: WebSocket, token: str = Query(...)):
+    """
+    Événements véhicules en temps réel (alertes, baisses de prix des favoris),
+    regroupés en au plus une trame par seconde : {"type": "events", "events": [...]}
+    """
+    user = await _user_from_token(token)
+    if user is None:
+        await websocket.close(code=4401)
+        return
+
+    await ws_manager.connect(websocket, user.id, NOTIFICATIONS)
+    try:
+        while True:
+            data = await websocket.receive_json()
+            if data.get("type") == "ping":
+                ws_manager.reply(websocket, user.id, {"type": "pong"})
+    except WebSocketDisconnect:
+        ws_manager.disconnect(websocket, user.id)
+    except Exception as e:
+        logger.error(f"WebSocket notifications error for user {user.id}: {e}")
+        ws_manager.disconnect(websocket, user.id)
@@ -1,26 +1,35 @@
 # backend/app/routes/pro.py
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import select, func, extract
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import uuid
 from datetime import datetime, timedelta
 
-from app.db import SessionLocal
+from app.db import get_async_db
 from app.models import User, Vehicle, UserRole, Message, Favorite
 from app.schemas import VehicleCreate, VehicleOut, VehicleUpdate
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user_async
 
 router = APIRouter(prefix="/api/pro", tags=["professional"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def _count(db: AsyncSession, query) -> int:
+    return await db.scalar(select(func.count()).select_from(query.subquery()))
 
-def require_pro_or_admin(current_user: User = Depends(get_current_user)):
+async def _get_my_vehicle(db: AsyncSession, vehicle_id: str, user_id: str):
+    result = await db.execute(
+        select(Vehicle).where(
+            Vehicle.id == vehicle_id,
+            Vehicle.professional_user_id == user_id
+        ).limit(1)
+    )
+    return result.scalars().first()
+
+async def _vin_exists(db: AsyncSession, vin: str) -> bool:
+    result = await db.execute(select(Vehicle.id).where(Vehicle.vin == vin).limit(1))
+    return result.scalar() is not None
+
+def require_pro_or_admin(current_user: User = Depends(get_current_user_async)):
     """Vérifier que l'utilisateur est PRO ou ADMIN"""
     if current_user.role not in [UserRole.PRO, UserRole.ADMIN]:
         raise HTTPException(
@@ -34,52 +43,50 @@ def require_pro_or_admin(current_user: User = Depends(get_current_user)):
 @router.get("/stock", response_model=List[VehicleOut])
 async def get_my_stock(
     current_user: User = Depends(require_pro_or_admin),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
     status_filter: Optional[str] = Query(None, alias="status"),
     search: Optional[str] = None
 ):
     """Récupérer mon stock de véhicules"""
-    query = db.query(Vehicle).filter(
+    query = select(Vehicle).where(
         Vehicle.professional_user_id == current_user.id
     )
     
     # Filtrer par statut
     if status_filter == "active":
-        query = query.filter(Vehicle.is_active == True)
+        query = query.where(Vehicle.is_active == True)
     elif status_filter == "inactive":
-        query = query.filter(Vehicle.is_active == False)
+        query = query.where(Vehicle.is_active == False)
     
     # Recherche
     if search:
         search_term = f"%{search}%"
-        query = query.filter(
+        query = query.where(
             (Vehicle.title.ilike(search_term)) |
             (Vehicle.make.ilike(search_term)) |
             (Vehicle.model.ilike(search_term))
         )
     
     # Pagination
-    total = query.count()
-    vehicles = query.order_by(
-        Vehicle.created_at.desc()
-    ).offset((page - 1) * size).limit(size).all()
+    result = await db.execute(
+        query.order_by(Vehicle.created_at.desc()).offset((page - 1) * size).limit(size)
+    )
     
-    return vehicles
+    return result.scalars().all()
 
 @router.post("/stock", response_model=VehicleOut, status_code=status.HTTP_201_CREATED)
 async def add_vehicle_to_stock(
     vehicle_data: VehicleCreate,
     current_user: User = Depends(require_pro_or_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Ajouter un véhicule à mon stock"""
     
     # Vérifier VIN unique si fourni
     if vehicle_data.vin:
-        existing = db.query(Vehicle).filter(Vehicle.vin == vehicle_data.vin).first()
-        if existing:
+        if await _vin_exists(db, vehicle_data.vin):
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Un véhicule avec ce VIN existe déjà"
@@ -93,8 +100,8 @@ async def add_vehicle_to_stock(
     )
     
     db.add(vehicle)
-    db.commit()
-    db.refresh(vehicle)
+    await db.commit()
+    await db.refresh(vehicle)
     
     # TODO: Indexer dans Elasticsearch
     
@@ -104,13 +111,10 @@ async def add_vehicle_to_stock(
 async def get_my_vehicle(
     vehicle_id: str,
     current_user: User = Depends(require_pro_or_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Récupérer un véhicule de mon stock"""
-    vehicle = db.query(Vehicle).filter(
-        Vehicle.id == vehicle_id,
-        Vehicle.professional_user_id == current_user.id
-    ).first()
+    vehicle = await _get_my_vehicle(db, vehicle_id, current_user.id)
     
     if not vehicle:
         raise HTTPException(
@@ -125,14 +129,11 @@ async def update_my_vehicle(
     vehicle_id: str,
     vehicle_update: VehicleUpdate,
     current_user: User = Depends(require_pro_or_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Modifier un de mes véhicules"""
     
-    vehicle = db.query(Vehicle).filter(
-        Vehicle.id == vehicle_id,
-        Vehicle.professional_user_id == current_user.id
-    ).first()
+    vehicle = await _get_my_vehicle(db, vehicle_id, current_user.id)
     
     if not vehicle:
         raise HTTPException(
@@ -142,8 +143,7 @@ async def update_my_vehicle(
     
     # Vérifier VIN unique si modifié
     if vehicle_update.vin and vehicle_update.vin != vehicle.vin:
-        existing = db.query(Vehicle).filter(Vehicle.vin == vehicle_update.vin).first()
-        if existing:
+        if await _vin_exists(db, vehicle_update.vin):
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Un véhicule avec ce VIN existe déjà"
@@ -155,8 +155,8 @@ async def update_my_vehicle(
     
     vehicle.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(vehicle)
+    await db.commit()
+    await db.refresh(vehicle)
     
     # TODO: Réindexer dans Elasticsearch
     
@@ -166,14 +166,11 @@ async def update_my_vehicle(
 async def delete_my_vehicle(
     vehicle_id: str,
     current_user: User = Depends(require_pro_or_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Supprimer un de mes véhicules"""
     
-    vehicle = db.query(Vehicle).filter(
-        Vehicle.id == vehicle_id,
-        Vehicle.professional_user_id == current_user.id
-    ).first()
+    vehicle = await _get_my_vehicle(db, vehicle_id, current_user.id)
     
     if not vehicle:
         raise HTTPException(
@@ -181,8 +178,8 @@ async def delete_my_vehicle(
             detail="Véhicule non trouvé"
         )
     
-    db.delete(vehicle)
-    db.commit()
+    await db.delete(vehicle)
+    await db.commit()
     
     # TODO: Supprimer de Elasticsearch
     
@@ -192,14 +189,11 @@ async def delete_my_vehicle(
 async def toggle_vehicle_visibility(
     vehicle_id: str,
     current_user: User = Depends(require_pro_or_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Activer/désactiver la visibilité d'un véhicule"""
     
-    vehicle = db.query(Vehicle).filter(
-        Vehicle.id == vehicle_id,
-        Vehicle.professional_user_id == current_user.id
-    ).first()
+    vehicle = await _get_my_vehicle(db, vehicle_id, current_user.id)
     
     if not vehicle:
         raise HTTPException(
@@ -210,7 +204,7 @@ async def toggle_vehicle_visibility(
     vehicle.is_active = not vehicle.is_active
     vehicle.updated_at = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
     
     return {
         "vehicle_id": vehicle_id,
@@ -223,51 +217,52 @@ async def toggle_vehicle_visibility(
 @router.get("/stats")
 async def get_my_stats(
     current_user: User = Depends(require_pro_or_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Récupérer mes statistiques globales"""
     
     # Compteurs véhicules
-    total_vehicles = db.query(Vehicle).filter(
+    total_vehicles = await _count(db, select(Vehicle.id).where(
         Vehicle.professional_user_id == current_user.id
-    ).count()
+    ))
     
-    active_vehicles = db.query(Vehicle).filter(
+    active_vehicles = await _count(db, select(Vehicle.id).where(
         Vehicle.professional_user_id == current_user.id,
         Vehicle.is_active == True
-    ).count()
+    ))
     
     # Statistiques 30 derniers jours
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
     
-    recent_additions = db.query(Vehicle).filter(
+    recent_additions = await _count(db, select(Vehicle.id).where(
         Vehicle.professional_user_id == current_user.id,
         Vehicle.created_at >= thirty_days_ago
-    ).count()
+    ))
     
     # Favoris total sur mes véhicules
-    total_favorites = db.query(Favorite).join(Vehicle).filter(
+    total_favorites = await _count(db, select(Favorite.id).join(Vehicle).where(
         Vehicle.professional_user_id == current_user.id
-    ).count()
+    ))
     
     # Messages reçus (approximation via conversations)
-    messages_received = db.query(Message).filter(
+    messages_received = await _count(db, select(Message.id).where(
         Message.recipient_id == current_user.id,
         Message.created_at >= thirty_days_ago
-    ).count()
+    ))
     
     # Véhicule le plus populaire (le plus de favoris)
-    most_popular = db.query(
+    result = await db.execute(select(
         Vehicle.id,
         Vehicle.title,
         Vehicle.make,
         Vehicle.model,
         func.count(Favorite.id).label('favorites_count')
-    ).outerjoin(Favorite).filter(
+    ).outerjoin(Favorite).where(
         Vehicle.professional_user_id == current_user.id
     ).group_by(Vehicle.id).order_by(
         func.count(Favorite.id).desc()
-    ).first()
+    ).limit(1))
+    most_popular = result.first()
     
     return {
         "total_vehicles": total_vehicles,
@@ -286,17 +281,17 @@ async def get_my_stats(
 @router.get("/stats/vehicles-by-month")
 async def get_vehicles_by_month(
     current_user: User = Depends(require_pro_or_admin),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     months: int = Query(6, ge=3, le=12)
 ):
     """Statistiques véhicules ajoutés par mois"""
     
     # Requête SQL avec GROUP BY mois
-    results = db.query(
+    results = (await db.execute(select(
         extract('year', Vehicle.created_at).label('year'),
         extract('month', Vehicle.created_at).label('month'),
         func.count(Vehicle.id).label('count')
-    ).filter(
+    ).where(
         Vehicle.professional_user_id == current_user.id,
         Vehicle.created_at >= datetime.utcnow() - timedelta(days=months * 30)
     ).group_by(
@@ -305,7 +300,7 @@ async def get_vehicles_by_month(
     ).order_by(
         extract('year', Vehicle.created_at),
         extract('month', Vehicle.created_at)
-    ).all()
+    ))).all()
     
     # Formater les données
     month_names = ['Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Juin', 
@@ -327,16 +322,16 @@ async def get_vehicles_by_month(
 @router.get("/stats/price-distribution")
 async def get_price_distribution(
     current_user: User = Depends(require_pro_or_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Distribution des prix de mon stock"""
     
-    vehicles = db.query(Vehicle.price).filter(
+    result = await db.execute(select(Vehicle.price).where(
         Vehicle.professional_user_id == current_user.id,
         Vehicle.price.isnot(None)
-    ).all()
+    ))
     
-    prices = [v.price for v in vehicles]
+    prices = list(result.scalars())
     
     if not prices:
         return {
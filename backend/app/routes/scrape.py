@@ -1,12 +1,16 @@
 # backend/app/routes/scrape.py
 """Routes pour le scraping direct des différentes sources"""
 
+import asyncio
 import logging
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from scrapers.browser_pool import executor as scraper_executor, pool_stats
+from scrapers.rate_limit import rate_limiter
+
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api", tags=["scrape"])
 
@@ -112,9 +116,9 @@ async def scrape_vehicles(
                 'fuel_type': request.fuel_type
             }
 
-        # Exécuter le scraping
+        # Exécuter le scraping sur un thread scraper (Playwright synchrone, navigateurs du pool)
         logger.info(f"🚀 Lancement scraping {request.source} avec params: {search_params}")
-        results = scraper.scrape(search_params)
+        results = await asyncio.wrap_future(scraper_executor.submit(scraper.scrape, search_params))
 
         # Calculer la durée
         duration = (datetime.utcnow() - start_time).total_seconds()
@@ -242,6 +246,9 @@ async def get_scrape_status():
         return {
             "status": "operational",
             "scrapers": scrapers_status,
+            "browser_pool": pool_stats(),
+            # Débit adaptatif et disjoncteur par domaine (lecture Redis hors boucle)
+            "rate_limits": await asyncio.to_thread(rate_limiter.snapshot),
             "timestamp": datetime.utcnow().isoformat()
         }
 
@@ -55,7 +55,7 @@ async def search_post(
         raise HTTPException(status_code=422, detail="Malformed search payload")
 
     try:
-        res = SearchService.search(q=q, filters=filters, page=page, size=size)
+        res = await SearchService.asearch(q=q, filters=filters, page=page, size=size)
         
         # Enregistrer dans l'historique si l'utilisateur est connecté
         if current_user:
@@ -92,7 +92,7 @@ async def search_get(
         filters.update(rng)
     
     try:
-        res = SearchService.search(q=q, filters=filters, page=page, size=size)
+        res = await SearchService.asearch(q=q, filters=filters, page=page, size=size)
         
         # Enregistrer dans l'historique si l'utilisateur est connecté
         if current_user:
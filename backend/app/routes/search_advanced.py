@@ -3,14 +3,19 @@
 
 import logging
 import asyncio
-import unicodedata
+import threading
 import os
 import json
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+from app.services.listing_filters import filter_listings
+from app.services.text import fold
+from scrapers.browser_pool import RequestJobs
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/search-advanced", tags=["search-advanced"])
@@ -18,20 +23,21 @@ router = APIRouter(prefix="/api/search-advanced", tags=["search-advanced"])
 # Configuration pour l'API Anthropic
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 
+# Recherche en streaming : pages en attente d'envoi au client (borne la mémoire,
+# les scrapers attendent si le client lit moins vite qu'ils ne produisent)
+STREAM_QUEUE_SIZE = 8
+# Ligne vide (NDJSON) / commentaire (SSE) envoyé si aucune page n'arrive entre-temps
+STREAM_HEARTBEAT = 15.0
+
 
 def normalize_text(text: str) -> str:
     """
     Normalise un texte en supprimant les accents et en le mettant en minuscules.
 
     Exemple: "Série 1" -> "serie 1"
+    (voir app.services.text.fold, mis en cache)
     """
-    if not text:
-        return ""
-    # Décomposer les caractères Unicode (sépare les lettres des accents)
-    nfd = unicodedata.normalize('NFD', text)
-    # Filtrer les marques diacritiques (accents)
-    without_accents = ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
-    return without_accents.lower()
+    return fold(text)
 
 
 class AdvancedSearchRequest(BaseModel):
@@ -173,71 +179,99 @@ class ParsedFiltersResponse(BaseModel):
     explanation: str
 
 
-def scrape_source(source: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+def build_scraper(source: str, filters: Dict[str, Any]):
     """
-    Scrape une source avec les filtres donnés
-    Cette fonction s'exécute dans un thread séparé
+    Instancie le scraper d'une source et construit ses paramètres de recherche.
+    Retourne (None, None) pour une source inconnue.
     """
-    try:
-        logger.info(f"🔍 Scraping {source} avec filtres: {filters}")
+    if source == "leboncoin":
+        from scrapers.leboncoin_scraper import LeBonCoinScraper
+        scraper = LeBonCoinScraper()
+
+        # Construire les paramètres pour LeBonCoin
+        search_params = {
+            'max_pages': filters.get('max_pages', 3),
+            'deep_scrape': False
+        }
 
-        if source == "leboncoin":
-            from scrapers.leboncoin_scraper import LeBonCoinScraper
-            scraper = LeBonCoinScraper()
+        # LeBonCoin utilise une recherche textuelle, on construit la query
+        query_parts = []
+        if filters.get('make'):
+            query_parts.append(filters['make'])
+        if filters.get('model'):
+            query_parts.append(filters['model'])
+
+        search_params['query'] = ' '.join(query_parts) if query_parts else 'voiture'
+
+        # Filtres additionnels
+        if filters.get('price_max'):
+            search_params['max_price'] = filters['price_max']
+        if filters.get('location'):
+            search_params['location'] = filters['location']
+
+        return scraper, search_params
+
+    elif source == "autoscout24":
+        from scrapers.autoscoot_scraper import AutoScout24Scraper
+        scraper = AutoScout24Scraper()
+
+        # Construire les paramètres pour AutoScout24
+        search_params = {
+            'max_pages': filters.get('max_pages', 3),
+            'make': filters.get('make'),
+            'model': filters.get('model'),
+            'min_year': filters.get('year_min'),
+            'max_year': filters.get('year_max'),
+            'max_price': filters.get('price_max'),
+        }
 
-            # Construire les paramètres pour LeBonCoin
-            search_params = {
-                'max_pages': filters.get('max_pages', 3),
-                'deep_scrape': False
-            }
+        # Mapper le type de carburant pour AutoScout24
+        fuel_mapping = {
+            'essence': 'B',
+            'diesel': 'D',
+            'electrique': 'E',
+            'hybride': 'H'
+        }
+        if filters.get('fuel_type'):
+            search_params['fuel_type'] = fuel_mapping.get(filters['fuel_type'].lower())
 
-            # LeBonCoin utilise une recherche textuelle, on construit la query
-            query_parts = []
-            if filters.get('make'):
-                query_parts.append(filters['make'])
-            if filters.get('model'):
-                query_parts.append(filters['model'])
-
-            search_params['query'] = ' '.join(query_parts) if query_parts else 'voiture'
-
-            # Filtres additionnels
-            if filters.get('price_max'):
-                search_params['max_price'] = filters['price_max']
-            if filters.get('location'):
-                search_params['location'] = filters['location']
-
-            results = scraper.scrape(search_params)
-
-        elif source == "autoscout24":
-            from scrapers.autoscoot_scraper import AutoScout24Scraper
-            scraper = AutoScout24Scraper()
-
-            # Construire les paramètres pour AutoScout24
-            search_params = {
-                'max_pages': filters.get('max_pages', 3),
-                'make': filters.get('make'),
-                'model': filters.get('model'),
-                'min_year': filters.get('year_min'),
-                'max_year': filters.get('year_max'),
-                'max_price': filters.get('price_max'),
-            }
+        return scraper, search_params
 
-            # Mapper le type de carburant pour AutoScout24
-            fuel_mapping = {
-                'essence': 'B',
-                'diesel': 'D',
-                'electrique': 'E',
-                'hybride': 'H'
-            }
-            if filters.get('fuel_type'):
-                search_params['fuel_type'] = fuel_mapping.get(filters['fuel_type'].lower())
+    return None, None
+
+
+def sort_price(item: Dict[str, Any]) -> float:
+    """Clé de tri par prix croissant (prix absent ou illisible en dernier)"""
+    price = item.get('price')
+    if price is None:
+        return float('inf')
+    if isinstance(price, str):
+        # Enlever espaces et convertir
+        try:
+            return float(price.replace(' ', '').replace(',', ''))
+        except (ValueError, AttributeError):
+            return float('inf')
+    try:
+        return float(price)
+    except (ValueError, TypeError):
+        return float('inf')
 
-            results = scraper.scrape(search_params)
 
-        else:
+def scrape_source(source: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Scrape une source avec les filtres donnés
+    Cette fonction s'exécute dans un thread séparé
+    """
+    try:
+        logger.info(f"🔍 Scraping {source} avec filtres: {filters}")
+
+        scraper, search_params = build_scraper(source, filters)
+        if scraper is None:
             logger.warning(f"Source inconnue: {source}")
             return {'source': source, 'results': [], 'error': 'Source inconnue'}
 
+        results = scraper.scrape(search_params)
+
         # Appliquer les filtres post-scraping
         filtered_results = apply_post_filters(results, filters)
 
@@ -259,229 +293,85 @@ def scrape_source(source: str, filters: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 
+def stream_source(source: str, filters: Dict[str, Any],
+                  emit: Callable[[Dict[str, Any]], bool], stop: threading.Event) -> Dict[str, Any]:
+    """
+    Variante de scrape_source pour la recherche en streaming : chaque page est
+    filtrée puis transmise à `emit` dès sa lecture, rien n'est accumulé.
+    S'arrête à la page suivante si `stop` est levé (client déconnecté).
+    Cette fonction s'exécute dans un thread séparé.
+    """
+    stats = {'count': 0, 'scraped': 0, 'pages': 0, 'success': True, 'error': None}
+    try:
+        scraper, search_params = build_scraper(source, filters)
+        if scraper is None:
+            logger.warning(f"Source inconnue: {source}")
+            stats.update(success=False, error='Source inconnue')
+            return stats
+
+        pages = scraper.iter_pages(search_params)
+        try:
+            for page in pages:
+                stats['pages'] += 1
+                stats['scraped'] += len(page)
+                matched = apply_post_filters(page, filters)
+                matched.sort(key=sort_price)
+                stats['count'] += len(matched)
+
+                if matched and not emit({
+                    'type': 'results',
+                    'source': source,
+                    'page': stats['pages'],
+                    'results': matched,
+                }):
+                    break
+                if not emit({'type': 'progress', 'source': source, 'status': 'running', **stats}):
+                    break
+                if stop.is_set():
+                    break
+        finally:
+            # Ferme le navigateur dans le thread qui l'a ouvert
+            pages.close()
+
+        logger.info(f"✅ {source}: {stats['count']} résultats ({stats['pages']} pages)")
+
+    except Exception as e:
+        logger.exception(f"❌ Erreur scraping {source}: {e}")
+        stats.update(success=False, error=str(e))
+
+    return stats
+
+
 def apply_post_filters(results: List[Dict[str, Any]], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Applique des filtres supplémentaires sur les résultats
     (pour les filtres non supportés nativement par les scrapers)
+
+    Les filtres sont compilés en un prédicat unique (app.services.listing_filters)
+    évalué en un seul parcours des annonces.
     """
-    filtered = results
-
-    # Filtre sur la marque (STRICT)
-    if filters.get('make'):
-        make_lower = filters['make'].lower()
-        before_count = len(filtered)
-
-        # DEBUG: Log quelques exemples avant filtre
-        if filtered[:3]:
-            logger.debug(f"📋 Avant filtre make='{make_lower}', {before_count} résultats:")
-            for r in filtered[:3]:
-                logger.debug(f"  - make={r.get('make')}, model={r.get('model')}, title={r.get('title', '')[:40]}")
-
-        filtered = [r for r in filtered if r.get('make') and make_lower in r['make'].lower()]
-
-        logger.info(f"🔍 Filtre make='{make_lower}': {before_count} -> {len(filtered)} résultats")
-
-    # Filtre sur le modèle (FLEXIBLE - cherche dans model ET title, insensible aux accents)
-    if filters.get('model'):
-        model_normalized = normalize_text(filters['model'])
-        before_count = len(filtered)
-
-        # DEBUG: Log quelques exemples avant filtre
-        if filtered[:3]:
-            logger.debug(f"📋 Avant filtre model='{filters['model']}' (normalisé: '{model_normalized}'), {before_count} résultats:")
-            for r in filtered[:3]:
-                logger.debug(f"  - make={r.get('make')}, model={r.get('model')}, title={r.get('title', '')[:60]}")
-
-        # Chercher dans le champ model OU dans le titre (insensible aux accents)
-        def matches_model(result):
-            # Chercher dans le champ model
-            if result.get('model'):
-                if model_normalized in normalize_text(result['model']):
-                    return True
-            # Chercher dans le titre comme fallback
-            if result.get('title'):
-                if model_normalized in normalize_text(result['title']):
-                    return True
-            return False
-
-        filtered = [r for r in filtered if matches_model(r)]
-
-        logger.info(f"🔍 Filtre model='{filters['model']}': {before_count} -> {len(filtered)} résultats")
-
-    # Filtre sur l'année
-    if filters.get('year_min'):
-        filtered = [r for r in filtered if r.get('year') and r['year'] >= filters['year_min']]
-    if filters.get('year_max'):
-        filtered = [r for r in filtered if r.get('year') and r['year'] <= filters['year_max']]
-
-    # Filtre sur le prix
-    if filters.get('price_min'):
-        filtered = [r for r in filtered if r.get('price') and r['price'] >= filters['price_min']]
-    if filters.get('price_max'):
-        filtered = [r for r in filtered if r.get('price') and r['price'] <= filters['price_max']]
-
-    # Filtre sur le kilométrage
-    if filters.get('mileage_min'):
-        filtered = [r for r in filtered if r.get('mileage') and r['mileage'] >= filters['mileage_min']]
-    if filters.get('mileage_max'):
-        filtered = [r for r in filtered if r.get('mileage') and r['mileage'] <= filters['mileage_max']]
-
-    # Filtre sur le type de carburant
-    if filters.get('fuel_type'):
-        fuel_lower = filters['fuel_type'].lower()
-        filtered = [r for r in filtered if r.get('fuel_type') and fuel_lower in r['fuel_type'].lower()]
-
-    # Filtre sur la transmission
-    if filters.get('transmission'):
-        trans_lower = filters['transmission'].lower()
-        filtered = [r for r in filtered if r.get('transmission') and trans_lower in r['transmission'].lower()]
-
-    # Filtre sur le type de carrosserie
-    if filters.get('body_type'):
-        body_normalized = normalize_text(filters['body_type'])
-        filtered = [r for r in filtered if r.get('body_type') and body_normalized in normalize_text(r['body_type'])]
-
-    # Filtre sur la puissance (chevaux)
-    if filters.get('horsepower_min'):
-        filtered = [r for r in filtered if r.get('horsepower') and r['horsepower'] >= filters['horsepower_min']]
-    if filters.get('horsepower_max'):
-        filtered = [r for r in filtered if r.get('horsepower') and r['horsepower'] <= filters['horsepower_max']]
-
-    # Filtre sur la puissance fiscale (CV)
-    if filters.get('horsepower_fiscal_min'):
-        filtered = [r for r in filtered if r.get('horsepower_fiscal') and r['horsepower_fiscal'] >= filters['horsepower_fiscal_min']]
-    if filters.get('horsepower_fiscal_max'):
-        filtered = [r for r in filtered if r.get('horsepower_fiscal') and r['horsepower_fiscal'] <= filters['horsepower_fiscal_max']]
-
-    # Filtre sur le type de vendeur
-    if filters.get('seller_type'):
-        seller_normalized = normalize_text(filters['seller_type'])
-        filtered = [r for r in filtered if r.get('seller_type') and seller_normalized in normalize_text(r['seller_type'])]
-
-    # Filtre première main
-    if filters.get('first_registration') is True:
-        filtered = [r for r in filtered if r.get('first_registration') is True or r.get('owners') == 1]
-
-    # Filtre nombre de portes
-    if filters.get('nb_doors'):
-        filtered = [r for r in filtered if r.get('doors') == filters['nb_doors'] or r.get('nb_doors') == filters['nb_doors']]
-
-    # Filtre nombre de places
-    if filters.get('nb_seats'):
-        filtered = [r for r in filtered if r.get('seats') == filters['nb_seats'] or r.get('nb_seats') == filters['nb_seats']]
-
-    # Filtre couleur extérieure
-    if filters.get('color'):
-        color_normalized = normalize_text(filters['color'])
-        filtered = [r for r in filtered if r.get('color') and color_normalized in normalize_text(r['color'])]
-
-    # Filtre couleur intérieure
-    if filters.get('color_interior'):
-        color_int_normalized = normalize_text(filters['color_interior'])
-        filtered = [r for r in filtered if r.get('color_interior') and color_int_normalized in normalize_text(r['color_interior'])]
-
-    # Filtre couleur métallisée
-    if filters.get('metallic_color') is True:
-        filtered = [r for r in filtered if r.get('metallic_color') is True]
-
-    # Filtre classe d'émission
-    if filters.get('emission_class'):
-        emission_normalized = normalize_text(filters['emission_class'])
-        filtered = [r for r in filtered if r.get('emission_class') and emission_normalized in normalize_text(r['emission_class'])]
-
-    # Filtre Crit'Air
-    if filters.get('critair'):
-        filtered = [r for r in filtered if r.get('critair') and str(r['critair']) == str(filters['critair'])]
-
-    # Filtre CO2 maximum
-    if filters.get('co2_max'):
-        filtered = [r for r in filtered if r.get('co2') and r['co2'] <= filters['co2_max']]
-
-    # Filtre contrôle technique OK
-    if filters.get('technical_control_ok') is True:
-        filtered = [r for r in filtered if r.get('technical_control_ok') is True]
-
-    # Filtre non fumeur
-    if filters.get('non_smoker') is True:
-        filtered = [r for r in filtered if r.get('non_smoker') is True]
-
-    # Filtre jamais accidenté
-    if filters.get('no_accident') is True:
-        filtered = [r for r in filtered if r.get('no_accident') is True or r.get('accident_free') is True]
-
-    # Filtre carnet d'entretien
-    if filters.get('service_history') is True:
-        filtered = [r for r in filtered if r.get('service_history') is True or r.get('full_service_history') is True]
-
-    # Filtre garantie
-    if filters.get('warranty') is True:
-        filtered = [r for r in filtered if r.get('warranty') is True]
-
-    # Filtre garantie constructeur
-    if filters.get('manufacturer_warranty') is True:
-        filtered = [r for r in filtered if r.get('manufacturer_warranty') is True]
-
-    # Filtres équipements (recherche dans features ou equipment lists)
-    equipment_filters = {
-        'climate_control': filters.get('climate_control'),
-        'leather_interior': filters.get('leather_interior'),
-        'sunroof': filters.get('sunroof'),
-        'panoramic_roof': filters.get('panoramic_roof'),
-        'heated_seats': filters.get('heated_seats'),
-        'electric_seats': filters.get('electric_seats'),
-        'parking_sensors': filters.get('parking_sensors'),
-        'parking_camera': filters.get('parking_camera'),
-        'reversing_camera': filters.get('reversing_camera'),
-        'gps': filters.get('gps'),
-        'bluetooth': filters.get('bluetooth'),
-        'apple_carplay': filters.get('apple_carplay'),
-        'android_auto': filters.get('android_auto'),
-        'cruise_control': filters.get('cruise_control'),
-        'adaptive_cruise_control': filters.get('adaptive_cruise_control'),
-        'keyless_entry': filters.get('keyless_entry'),
-        'head_up_display': filters.get('head_up_display'),
-        'abs': filters.get('abs'),
-        'esp': filters.get('esp'),
-        'lane_assist': filters.get('lane_assist'),
-        'blind_spot': filters.get('blind_spot'),
-        'automatic_emergency_braking': filters.get('automatic_emergency_braking'),
-        'alloy_wheels': filters.get('alloy_wheels'),
-        'led_headlights': filters.get('led_headlights'),
-        'xenon_headlights': filters.get('xenon_headlights'),
-        'tow_bar': filters.get('tow_bar'),
-        'ski_rack': filters.get('ski_rack'),
-        'roof_rack': filters.get('roof_rack'),
-    }
+    before_count = len(results)
+    filtered = filter_listings(results, filters)
+    logger.info(f"🔍 Post-filtrage: {before_count} -> {len(filtered)} résultats")
+    return filtered
 
-    for equipment_key, equipment_value in equipment_filters.items():
-        if equipment_value is True:
-            # Chercher dans les différents champs possibles
-            filtered = [r for r in filtered if (
-                r.get(equipment_key) is True or
-                (r.get('equipment') and isinstance(r['equipment'], list) and equipment_key in [normalize_text(e) for e in r['equipment']]) or
-                (r.get('features') and isinstance(r['features'], list) and any(normalize_text(equipment_key) in normalize_text(str(f)) for f in r['features']))
-            )]
-
-    # Filtre nombre d'airbags
-    if filters.get('airbags'):
-        filtered = [r for r in filtered if r.get('airbags') and r['airbags'] >= filters['airbags']]
-
-    # Filtre nombre de cylindres
-    if filters.get('cylinders'):
-        filtered = [r for r in filtered if r.get('cylinders') == filters['cylinders']]
-
-    # Filtre cylindrée
-    if filters.get('engine_size'):
-        # Tolérance de +/- 100 cm³ pour la cylindrée
-        tolerance = 100
-        filtered = [r for r in filtered if r.get('engine_size') and abs(r['engine_size'] - filters['engine_size']) <= tolerance]
-
-    # Filtre type de traction
-    if filters.get('drive_type'):
-        drive_normalized = normalize_text(filters['drive_type'])
-        filtered = [r for r in filtered if r.get('drive_type') and drive_normalized in normalize_text(r['drive_type'])]
 
-    return filtered
+def build_filters(request: AdvancedSearchRequest) -> Dict[str, Any]:
+    """Filtres transmis aux scrapers et au post-filtrage"""
+    return {
+        'make': request.make,
+        'model': request.model,
+        'year_min': request.year_min,
+        'year_max': request.year_max,
+        'price_min': request.price_min,
+        'price_max': request.price_max,
+        'mileage_min': request.mileage_min,
+        'mileage_max': request.mileage_max,
+        'fuel_type': request.fuel_type,
+        'transmission': request.transmission,
+        'location': request.location,
+        'max_pages': request.max_pages
+    }
 
 
 @router.post("/search", response_model=AdvancedSearchResponse)
@@ -500,74 +390,47 @@ async def advanced_search(request: AdvancedSearchRequest):
     logger.info(f"   Année: {request.year_min}-{request.year_max}")
 
     # Préparer les filtres
-    filters = {
-        'make': request.make,
-        'model': request.model,
-        'year_min': request.year_min,
-        'year_max': request.year_max,
-        'price_min': request.price_min,
-        'price_max': request.price_max,
-        'mileage_min': request.mileage_min,
-        'mileage_max': request.mileage_max,
-        'fuel_type': request.fuel_type,
-        'transmission': request.transmission,
-        'location': request.location,
-        'max_pages': request.max_pages
-    }
+    filters = build_filters(request)
 
     # Scraper toutes les sources en parallèle
     all_results = []
     sources_stats = {}
 
-    # Utiliser ThreadPoolExecutor pour paralléliser les scrapers
-    with ThreadPoolExecutor(max_workers=len(request.sources)) as executor:
-        futures = {
-            executor.submit(scrape_source, source, filters): source
-            for source in request.sources
-        }
-
-        for future in futures:
-            source = futures[future]
-            try:
-                result = future.result(timeout=3600)  # Timeout de 1 heure par source
-
-                sources_stats[source] = {
-                    'count': result.get('count', 0),
-                    'success': result.get('success', False),
-                    'error': result.get('error')
-                }
-
-                if result.get('success'):
-                    all_results.extend(result.get('results', []))
-                    logger.info(f"✅ {source}: {result.get('count', 0)} résultats")
-                else:
-                    logger.warning(f"⚠️ {source}: {result.get('error', 'Erreur inconnue')}")
-
-            except Exception as e:
-                logger.exception(f"❌ Erreur future {source}: {e}")
-                sources_stats[source] = {
-                    'count': 0,
-                    'success': False,
-                    'error': str(e)
-                }
+    # Threads scrapers partagés : leurs navigateurs restent chauds d'une recherche à l'autre
+    jobs = RequestJobs()
+    futures = {
+        asyncio.ensure_future(jobs.run(scrape_source, source, filters)): source
+        for source in request.sources
+    }
 
-    # Trier les résultats par prix (croissant)
-    def get_sort_price(item):
-        price = item.get('price')
-        if price is None:
-            return float('inf')
-        if isinstance(price, str):
-            # Enlever espaces et convertir
-            try:
-                return float(price.replace(' ', '').replace(',', ''))
-            except (ValueError, AttributeError):
-                return float('inf')
+    for future in futures:
+        source = futures[future]
         try:
-            return float(price)
-        except (ValueError, TypeError):
-            return float('inf')
+            # Timeout de 1 heure par source, sans bloquer la boucle asyncio
+            result = await asyncio.wait_for(future, timeout=3600)
+
+            sources_stats[source] = {
+                'count': result.get('count', 0),
+                'success': result.get('success', False),
+                'error': result.get('error')
+            }
+
+            if result.get('success'):
+                all_results.extend(result.get('results', []))
+                logger.info(f"✅ {source}: {result.get('count', 0)} résultats")
+            else:
+                logger.warning(f"⚠️ {source}: {result.get('error', 'Erreur inconnue')}")
+
+        except Exception as e:
+            logger.exception(f"❌ Erreur future {source}: {e}")
+            sources_stats[source] = {
+                'count': 0,
+                'success': False,
+                'error': str(e)
+            }
 
-    all_results.sort(key=get_sort_price)
+    # Trier les résultats par prix (croissant)
+    all_results.sort(key=sort_price)
 
     # Calculer la durée
     duration = (datetime.utcnow() - start_time).total_seconds()
@@ -585,6 +448,114 @@ async def advanced_search(request: AdvancedSearchRequest):
     )
 
 
+@router.post("/search/stream")
+async def advanced_search_stream(
+    request: AdvancedSearchRequest,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$", description="ndjson ou sse (Server-Sent Events)")
+):
+    """
+    Recherche avancée multi-sources en streaming.
+
+    Mêmes filtres que /search, mais chaque page est envoyée dès que le scraper
+    la produit au lieu d'attendre la fin de toutes les sources. Trames émises :
+    - `start`    : sources interrogées et filtres appliqués
+    - `results`  : annonces filtrées d'une page (triées par prix dans la page)
+    - `progress` : avancement d'une source (status running / done / error)
+    - `stats`    : trame finale, équivalente à AdvancedSearchResponse sans les résultats
+
+    En NDJSON chaque trame est un objet JSON par ligne (champ `type`) ;
+    en SSE le type est porté par `event:`.
+    """
+    start_time = datetime.utcnow()
+    filters = build_filters(request)
+    sources = list(request.sources)
+
+    logger.info(f"🔍 Recherche avancée (streaming {format}): {sources}")
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def emit(event: Dict[str, Any]) -> bool:
+        """Depuis un thread scraper : attend une place dans la file, False si le client est parti"""
+        while not stop.is_set():
+            future = asyncio.run_coroutine_threadsafe(asyncio.wait_for(queue.put(event), 1.0), loop)
+            try:
+                future.result(timeout=5)
+                return True
+            except (asyncio.TimeoutError, FuturesTimeout):
+                continue
+            except RuntimeError:
+                # Boucle fermée (arrêt du serveur)
+                return False
+        return False
+
+    def run_source(source: str):
+        stats = stream_source(source, filters, emit, stop)
+        emit({'type': 'progress', 'source': source,
+              'status': 'done' if stats['success'] else 'error', **stats})
+
+    def encode(event: Dict[str, Any]) -> str:
+        payload = json.dumps(event, default=str, ensure_ascii=False)
+        if format == "sse":
+            return f"event: {event['type']}\ndata: {payload}\n\n"
+        return payload + "\n"
+
+    async def frames():
+        jobs = RequestJobs()
+        for source in sources:
+            asyncio.ensure_future(jobs.run(run_source, source))
+
+        total_results = 0
+        sources_stats: Dict[str, Dict[str, Any]] = {}
+        pending = len(sources)
+        try:
+            yield encode({'type': 'start', 'sources': sources, 'filters_applied': filters})
+
+            while pending:
+                try:
+                    event = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Garde la connexion ouverte pendant les pages lentes
+                    yield ": ping\n\n" if format == "sse" else "\n"
+                    continue
+
+                if event['type'] == 'results':
+                    total_results += len(event['results'])
+                elif event['type'] == 'progress' and event['status'] != 'running':
+                    pending -= 1
+                    sources_stats[event['source']] = {
+                        'count': event['count'],
+                        'pages': event['pages'],
+                        'success': event['success'],
+                        'error': event['error'],
+                    }
+                yield encode(event)
+
+            duration = (datetime.utcnow() - start_time).total_seconds()
+            logger.info(f"🎉 Recherche streaming terminée: {total_results} résultats en {duration:.2f}s")
+
+            yield encode({
+                'type': 'stats',
+                'success': True,
+                'total_results': total_results,
+                'sources_stats': sources_stats,
+                'filters_applied': filters,
+                'duration': duration,
+                'timestamp': datetime.utcnow().isoformat(),
+            })
+        finally:
+            # Client déconnecté ou recherche finie : les scrapers s'arrêtent à la page suivante
+            stop.set()
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        frames(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/filters/makes")
 async def get_available_makes():
     """Liste des marques disponibles"""
@@ -58,7 +58,7 @@ async def get_similar_vehicles(vehicle_id: str, db: Session = Depends(get_db)):
         logger.info(f"Recherche similaire pour {vehicle_id}: {filters}")
         
         # Recherche Elasticsearch
-        results = SearchService.search(
+        results = await SearchService.asearch(
             q=vehicle.model if vehicle.model else None,  # Boost sur le modèle
             filters=filters,
             page=1,
@@ -0,0 +1,289 @@
+# backend/app/services/alert_matching.py
+"""
+Correspondance annonces / alertes par percolation Elasticsearch.
+
+Chaque alerte active est indexée comme requête (champ `percolator`) dans
+ALERTS_INDEX. À l'ingestion, le worker envoie les véhicules du lot en UNE
+requête percolate (paramètre `documents`) : Elasticsearch renvoie les alertes
+qui correspondent à au moins un véhicule, avec les positions des véhicules
+concernés (_percolator_document_slot). Le coût suit le nombre de nouvelles
+annonces, pas annonces × alertes.
+
+Les correspondances sont ensuite :
+- "instant"         : publiées aussitôt dans le stream ALERT_EVENTS_STREAM
+- "daily"/"weekly"  : accumulées dans Redis (alerts:pending:<alert_id>) puis
+  regroupées par utilisateur en un digest par send_alert_notifications, qui
+  ne lit que les alertes ayant des correspondances en attente
+
+Critères reconnus dans Alert.criteria (noms de la recherche avancée) :
+make, model, fuel_type, transmission, location_city (ou city), price_min/max,
+year_min/max, mileage_min/max et q (ou query) sur le titre.
+"""
+import json
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+ALERTS_INDEX = settings.ES_ALERTS_INDEX
+
+ALERT_EVENTS_STREAM = "events:alert_notifications"
+ALERT_EVENTS_MAXLEN = 100_000
+PENDING_SET = "alerts:pending"
+PENDING_PREFIX = "alerts:pending"
+# Correspondances gardées au plus ce délai (une alerte hebdomadaire + marge)
+PENDING_TTL = 8 * 24 * 3600
+# Véhicules retenus par alerte dans un digest
+DIGEST_MAX_VEHICLES = 50
+
+FREQUENCY_HOURS = {"daily": 24, "weekly": 168}
+
+TERM_CRITERIA = (
+    ("make", ("make", "brand")),
+    ("model", ("model",)),
+    ("fuel_type", ("fuel_type",)),
+    ("transmission", ("transmission",)),
+    ("location_city", ("location_city", "city")),
+)
+RANGE_CRITERIA = (
+    ("price", "price_min", "price_max"),
+    ("year", "year_min", "year_max"),
+    ("mileage", "mileage_min", "mileage_max"),
+)
+
+# Les documents percolés n'ont besoin que des champs interrogés ;
+# dynamic=false ignore les autres (images, url, source_ids...)
+ALERTS_MAPPING = {
+    "settings": {
+        "analysis": {
+            "normalizer": {
+                "folded": {"type": "custom", "filter": ["lowercase", "asciifolding"]}
+            }
+        }
+    },
+    "mappings": {
+        "dynamic": False,
+        "properties": {
+            "query": {"type": "percolator"},
+            "user_id": {"type": "keyword"},
+            "frequency": {"type": "keyword"},
+            "title": {"type": "text"},
+            "make": {"type": "keyword", "normalizer": "folded"},
+            "model": {"type": "keyword", "normalizer": "folded"},
+            "fuel_type": {"type": "keyword", "normalizer": "folded"},
+            "transmission": {"type": "keyword", "normalizer": "folded"},
+            "location_city": {"type": "keyword", "normalizer": "folded"},
+            "price": {"type": "integer"},
+            "year": {"type": "integer"},
+            "mileage": {"type": "integer"},
+        }
+    }
+}
+
+PERCOLATED_FIELDS = ("title", "make", "model", "fuel_type", "transmission", "location_city", "price", "year", "mileage")
+
+
+def alert_query(criteria: Dict[str, Any]) -> Dict[str, Any]:
+    """Requête ES équivalente aux critères d'une alerte (sans critère : toutes les annonces)."""
+    criteria = criteria or {}
+    filters: List[Dict[str, Any]] = []
+
+    for field, keys in TERM_CRITERIA:
+        value = next((criteria[k] for k in keys if criteria.get(k)), None)
+        if value:
+            # match sur un keyword normalisé : insensible à la casse et aux accents
+            filters.append({"match": {field: value}})
+
+    for field, low, high in RANGE_CRITERIA:
+        bounds = {}
+        if criteria.get(low) not in (None, ""):
+            bounds["gte"] = criteria[low]
+        if criteria.get(high) not in (None, ""):
+            bounds["lte"] = criteria[high]
+        if bounds:
+            filters.append({"range": {field: bounds}})
+
+    text = criteria.get("q") or criteria.get("query")
+    if text:
+        filters.append({"match": {"title": {"query": text, "operator": "and"}}})
+
+    return {"bool": {"filter": filters}} if filters else {"match_all": {}}
+
+
+def ensure_index(es):
+    if not es.indices.exists(index=ALERTS_INDEX):
+        es.indices.create(index=ALERTS_INDEX, **ALERTS_MAPPING)
+        logger.info(f"Index de percolation '{ALERTS_INDEX}' créé")
+
+
+def index_alert(es, alert):
+    """Indexe (ou retire si inactive) la requête d'une alerte. Les erreurs ES sont journalisées."""
+    try:
+        if not alert.is_active:
+            remove_alert(es, alert.id)
+            return
+        es.index(index=ALERTS_INDEX, id=alert.id, document={
+            "query": alert_query(alert.criteria),
+            "user_id": alert.user_id,
+            "frequency": alert.frequency or "daily",
+        })
+    except Exception as e:
+        logger.warning(f"Percolation de l'alerte {alert.id} non mise à jour: {e}")
+
+
+def remove_alert(es, alert_id: str):
+    try:
+        es.options(ignore_status=404).delete(index=ALERTS_INDEX, id=alert_id)
+    except Exception as e:
+        logger.warning(f"Percolation de l'alerte {alert_id} non supprimée: {e}")
+
+
+def rebuild_index(es, db) -> int:
+    """Réindexe toutes les alertes actives (mise en place ou reprise après incident)."""
+    from elasticsearch import helpers
+    from app.models import Alert
+
+    ensure_index(es)
+    alerts = db.query(Alert).filter(Alert.is_active == True).yield_per(1000)  # noqa: E712
+    actions = (
+        {"_index": ALERTS_INDEX, "_id": a.id, "_source": {
+            "query": alert_query(a.criteria), "user_id": a.user_id, "frequency": a.frequency or "daily",
+        }}
+        for a in alerts
+    )
+    indexed, _ = helpers.bulk(es, actions, raise_on_error=False)
+    return indexed
+
+
+def percolate(es, vehicles: List[Dict[str, Any]]) -> List[Tuple[str, str, str, List[str]]]:
+    """
+    Alertes correspondant à au moins un des véhicules (documents ES avec "id"),
+    en une requête : [(alert_id, user_id, frequency, [vehicle_id, ...])].
+    """
+    from elasticsearch import helpers
+
+    if not vehicles:
+        return []
+    documents = [{k: v.get(k) for k in PERCOLATED_FIELDS if v.get(k) is not None} for v in vehicles]
+    matches = []
+    for hit in helpers.scan(
+        es, index=ALERTS_INDEX, size=1000,
+        query={"query": {"percolate": {"field": "query", "documents": documents}},
+               "_source": ["user_id", "frequency"]},
+    ):
+        slots = hit.get("fields", {}).get("_percolator_document_slot", [0])
+        source = hit["_source"]
+        matches.append((hit["_id"], source["user_id"], source.get("frequency") or "daily",
+                        [vehicles[slot]["id"] for slot in slots]))
+    return matches
+
+
+def dispatch(redis, matches: List[Tuple[str, str, str, List[str]]]) -> Dict[str, int]:
+    """Alertes "instant" publiées tout de suite, les autres mises en attente du digest."""
+    stats = {"instant": 0, "pending": 0}
+    if not matches or redis is None:
+        return stats
+    now = str(int(time.time()))
+    pipe = redis.pipeline(transaction=False)
+    for alert_id, user_id, frequency, vehicle_ids in matches:
+        if frequency == "instant":
+            pipe.xadd(
+                ALERT_EVENTS_STREAM,
+                {"kind": "instant", "user_id": user_id, "alerts": json.dumps([
+                    {"alert_id": alert_id, "vehicle_ids": vehicle_ids}
+                ]), "ts": now},
+                maxlen=ALERT_EVENTS_MAXLEN, approximate=True,
+            )
+            stats["instant"] += 1
+        else:
+            key = f"{PENDING_PREFIX}:{alert_id}"
+            pipe.sadd(key, *vehicle_ids)
+            pipe.expire(key, PENDING_TTL)
+            pipe.sadd(PENDING_SET, alert_id)
+            stats["pending"] += 1
+    pipe.execute()
+    return stats
+
+
+def match_new_vehicles(es, redis, vehicles: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Percolation d'un lot de véhicules ingérés puis répartition des correspondances."""
+    try:
+        matches = percolate(es, vehicles)
+    except Exception as e:
+        logger.warning(f"Percolation des alertes impossible: {e}")
+        return {"instant": 0, "pending": 0}
+    return dispatch(redis, matches)
+
+
+def _is_due(alert, now: datetime) -> bool:
+    if not alert.last_sent_at:
+        return True
+    hours = FREQUENCY_HOURS.get(alert.frequency, 0)
+    return (now - alert.last_sent_at).total_seconds() >= hours * 3600
+
+
+def send_digests(db, redis, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Regroupe par utilisateur les correspondances en attente des alertes dont
+    la fréquence est échue, publie un digest par utilisateur et met à jour
+    last_sent_at. Seules les alertes ayant des correspondances sont lues.
+    """
+    from app.models import Alert
+
+    now = now or datetime.utcnow()
+    stats = {"digests": 0, "alerts": 0}
+    pending_ids = list(redis.smembers(PENDING_SET))
+    if not pending_ids:
+        return stats
+
+    alerts = {a.id: a for a in db.query(Alert).filter(Alert.id.in_(pending_ids)).all()}
+    # Alertes supprimées ou désactivées : correspondances abandonnées
+    dropped = [id_ for id_ in pending_ids if id_ not in alerts or not alerts[id_].is_active]
+    if dropped:
+        redis.delete(*(f"{PENDING_PREFIX}:{id_}" for id_ in dropped))
+        redis.srem(PENDING_SET, *dropped)
+
+    digests: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    sent: List[str] = []
+    for alert in alerts.values():
+        if not alert.is_active or not _is_due(alert, now):
+            continue
+        # Lecture et suppression atomiques : une correspondance arrivée
+        # entre-temps reste pour le prochain digest
+        key = f"{PENDING_PREFIX}:{alert.id}"
+        pipe = redis.pipeline(transaction=True)
+        pipe.smembers(key)
+        pipe.delete(key)
+        pipe.srem(PENDING_SET, alert.id)
+        vehicle_ids = sorted(pipe.execute()[0])
+        if not vehicle_ids:
+            continue
+        digests[alert.user_id].append({
+            "alert_id": alert.id,
+            "name": alert.name,
+            "count": len(vehicle_ids),
+            "vehicle_ids": vehicle_ids[:DIGEST_MAX_VEHICLES],
+        })
+        alert.last_sent_at = now
+        sent.append(alert.id)
+
+    if digests:
+        ts = str(int(now.timestamp()))
+        pipe = redis.pipeline(transaction=False)
+        for user_id, entries in digests.items():
+            pipe.xadd(
+                ALERT_EVENTS_STREAM,
+                {"kind": "digest", "user_id": user_id, "alerts": json.dumps(entries), "ts": ts},
+                maxlen=ALERT_EVENTS_MAXLEN, approximate=True,
+            )
+        pipe.execute()
+    db.commit()
+
+    stats["digests"] = len(digests)
+    stats["alerts"] = len(sent)
+    return stats
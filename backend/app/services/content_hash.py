@@ -0,0 +1,135 @@
+# backend/app/services/content_hash.py
+"""
+Empreinte de contenu des annonces : détecter qu'une annonce re-scrapée n'a
+pas changé sans toucher à Postgres ni à Elasticsearch.
+
+- content_hash() : SHA-1 stable du prix, du kilométrage, du titre, des images
+  et de la description. Calculé par BaseScraper.normalize_data (qui voit
+  encore la description), sinon par le worker.
+- ContentCache   : dernière empreinte et dernier prix de chaque annonce
+  (clé "source::id" du worker), dans Redis avec TTL ; la colonne
+  vehicles.content_hash sert de repli quand Redis a oublié l'annonce.
+- Les changements de prix sont publiés dans le stream Redis PRICE_EVENTS_STREAM
+  (XADD), et seulement quand le prix a réellement changé.
+"""
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HASH_FIELDS = ("price", "mileage", "title", "images", "description")
+
+KEY_PREFIX = "listing:content"
+# Une annonce non revue pendant ce délai repasse par la base (colonne content_hash)
+CACHE_TTL = 30 * 24 * 3600
+PRICE_EVENTS_STREAM = "events:price_changes"
+PRICE_EVENTS_MAXLEN = 100_000
+
+
+def _number(value: Any) -> Optional[int]:
+    """Prix / kilométrage sous une forme stable (9000, "9 000", 9000.0 -> 9000)."""
+    if value is None or value == "":
+        return None
+    try:
+        return int(float(str(value).replace(" ", "").replace(" ", "").replace(",", ".")))
+    except (TypeError, ValueError):
+        return None
+
+
+def content_hash(data: Dict[str, Any]) -> str:
+    """Empreinte des champs qui font qu'une annonce a "changé"."""
+    title = data.get("title")
+    description = data.get("description")
+    payload = [
+        _number(data.get("price")),
+        _number(data.get("mileage")),
+        " ".join(str(title).split()) if title else None,
+        [str(url) for url in data.get("images") or []],
+        " ".join(str(description).split()) if description else None,
+    ]
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _encode(digest: str, price: Optional[int]) -> str:
+    return f"{digest}|{'' if price is None else price}"
+
+
+def _decode(value: Optional[str]) -> Optional[Tuple[str, Optional[int]]]:
+    if not value:
+        return None
+    digest, _, price = value.partition("|")
+    return digest, int(price) if price else None
+
+
+class ContentCache:
+    """Dernier état connu (empreinte, prix) des annonces, dans Redis."""
+
+    def __init__(self, redis_client, ttl: int = CACHE_TTL):
+        self.redis = redis_client
+        self.ttl = ttl
+
+    def lookup(self, ids: Iterable[str]) -> Dict[str, Tuple[str, Optional[int]]]:
+        """État connu des annonces (les annonces absentes du cache ne sont pas renvoyées)."""
+        ids = list(ids)
+        if not ids or self.redis is None:
+            return {}
+        try:
+            values = self.redis.mget([f"{KEY_PREFIX}:{id_}" for id_ in ids])
+        except Exception as e:
+            logger.debug("Cache des empreintes indisponible: %s", e)
+            return {}
+        return {id_: state for id_, state in zip(ids, map(_decode, values)) if state}
+
+    def store(self, states: Dict[str, Tuple[str, Optional[int]]]):
+        if not states or self.redis is None:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for id_, (digest, price) in states.items():
+                pipe.set(f"{KEY_PREFIX}:{id_}", _encode(digest, price), ex=self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.debug("Écriture du cache des empreintes impossible: %s", e)
+
+    def emit_price_changes(self, changes: List[Tuple[str, Optional[int], Optional[int]]]) -> int:
+        """Publie (id, ancien prix, nouveau prix) dans le stream des changements de prix."""
+        if not changes or self.redis is None:
+            return 0
+        now = str(int(time.time()))
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for vehicle_id, old_price, new_price in changes:
+                pipe.xadd(
+                    PRICE_EVENTS_STREAM,
+                    {"vehicle_id": vehicle_id, "old_price": str(old_price), "new_price": str(new_price), "ts": now},
+                    maxlen=PRICE_EVENTS_MAXLEN,
+                    approximate=True,
+                )
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Publication des changements de prix impossible: %s", e)
+            return 0
+        return len(changes)
+
+
+def split_unchanged(rows: List[Dict[str, Any]], known: Dict[str, Tuple[str, Optional[int]]]):
+    """
+    Sépare un lot en annonces identiques au dernier état connu (ignorées) et
+    annonces à traiter ; renvoie aussi les changements de prix de ces dernières.
+    """
+    changed, unchanged, price_changes = [], [], []
+    for row in rows:
+        state = known.get(row["id"])
+        if state and state[0] == row.get("content_hash"):
+            unchanged.append(row)
+            continue
+        changed.append(row)
+        if state:
+            old_price, new_price = state[1], row.get("price")
+            if old_price is not None and new_price is not None and old_price != new_price:
+                price_changes.append((row["id"], old_price, new_price))
+    return changed, unchanged, price_changes
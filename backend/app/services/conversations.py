@@ -0,0 +1,148 @@
+# backend/app/services/conversations.py
+"""
+Résumé des conversations (table conversations, une ligne par participant).
+
+La liste des conversations d'un utilisateur se lit en une requête indexée
+(user_id, last_message_at, conversation_id) au lieu de parcourir tous ses
+messages. Les lignes sont mises à jour dans la même transaction que le
+message envoyé ou lu :
+- record_message : dernier message des deux participants, +1 non lu pour le destinataire
+- mark_read      : non lus du lecteur décrémentés, dernier message marqué lu
+- mark_conversation_read : toute la conversation lue en un UPDATE, compteur remis à zéro
+"""
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Conversation, Message, User
+
+LAST_MESSAGE_FIELDS = (
+    "last_message_id", "last_message_content", "last_sender_id",
+    "last_message_at", "last_message_is_read",
+)
+
+
+def conversation_id_for(user_id: str, other_user_id: str) -> str:
+    return f"{min(user_id, other_user_id)}_{max(user_id, other_user_id)}"
+
+
+async def record_message(db: AsyncSession, message: Message):
+    """Met à jour le résumé des deux participants (message déjà flushé, sans commit)."""
+    last = {
+        "last_message_id": message.id,
+        "last_message_content": message.content,
+        "last_sender_id": message.sender_id,
+        "last_message_at": message.created_at,
+        "last_message_is_read": False,
+    }
+    rows = [
+        {"conversation_id": message.conversation_id, "user_id": message.sender_id,
+         "other_user_id": message.recipient_id, "unread_count": 0, **last},
+        {"conversation_id": message.conversation_id, "user_id": message.recipient_id,
+         "other_user_id": message.sender_id, "unread_count": 1, **last},
+    ]
+    # Ordre de verrouillage stable : A→B et B→A simultanés ne s'interbloquent pas
+    rows.sort(key=lambda row: row["user_id"])
+    table = Conversation.__table__
+    stmt = pg_insert(table).values(rows)
+    # Deux envois concurrents : le plus récent reste le dernier message
+    newer = stmt.excluded.last_message_at >= table.c.last_message_at
+    updates = {name: case((newer, stmt.excluded[name]), else_=table.c[name]) for name in LAST_MESSAGE_FIELDS}
+    updates["unread_count"] = table.c.unread_count + stmt.excluded.unread_count
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.conversation_id, table.c.user_id], set_=updates,
+    ))
+
+
+async def mark_read(db: AsyncSession, conversation_id: str, reader_id: str, message_ids: Sequence[str]):
+    """Répercute la lecture de message_ids par reader_id (sans commit)."""
+    if not message_ids:
+        return
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.conversation_id == conversation_id, Conversation.user_id == reader_id)
+        .values(unread_count=func.greatest(Conversation.unread_count - len(message_ids), 0))
+    )
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.conversation_id == conversation_id,
+               Conversation.last_message_id.in_(list(message_ids)))
+        .values(last_message_is_read=True)
+    )
+
+
+async def mark_conversation_read(db: AsyncSession, conversation_id: str, reader_id: str) -> List[str]:
+    """Marque lus tous les messages reçus par reader_id dans la conversation (sans commit)."""
+    result = await db.execute(
+        update(Message)
+        .where(Message.recipient_id == reader_id,
+               Message.conversation_id == conversation_id,
+               Message.is_read == False)  # noqa: E712
+        .values(is_read=True, read_at=datetime.utcnow())
+        .returning(Message.id)
+        .execution_options(synchronize_session=False)
+    )
+    read_ids = list(result.scalars())
+    if read_ids:
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.conversation_id == conversation_id, Conversation.user_id == reader_id)
+            .values(unread_count=0)
+        )
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.conversation_id == conversation_id,
+                   Conversation.last_message_id.in_(read_ids))
+            .values(last_message_is_read=True)
+        )
+    return read_ids
+
+
+async def list_messages(
+    db: AsyncSession,
+    conversation_id: str,
+    user_id: str,
+    limit: int,
+    before: Optional[Message] = None,
+    after: Optional[Message] = None,
+) -> List[Message]:
+    """
+    Page de messages en ordre chronologique, par curseur (created_at, id) :
+    les plus récents avant `before` (ou les derniers), sinon les suivants après `after`.
+    """
+    query = select(Message).where(
+        Message.conversation_id == conversation_id,
+        (Message.sender_id == user_id) | (Message.recipient_id == user_id),
+    )
+    key = tuple_(Message.created_at, Message.id)
+    if after is not None:
+        query = query.where(key > tuple_(after.created_at, after.id)).order_by(Message.created_at, Message.id)
+    else:
+        if before is not None:
+            query = query.where(key < tuple_(before.created_at, before.id))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc())
+    result = await db.execute(query.limit(limit))
+    messages = list(result.scalars())
+    return messages if after is not None else messages[::-1]
+
+
+async def list_conversations(
+    db: AsyncSession,
+    user_id: str,
+    limit: int,
+    before: Optional[Tuple[datetime, str]] = None,
+) -> List[Tuple[Conversation, User]]:
+    """Conversations de l'utilisateur, plus récentes d'abord, après le curseur (last_message_at, conversation_id)."""
+    query = (
+        select(Conversation, User)
+        .join(User, User.id == Conversation.other_user_id)
+        .where(Conversation.user_id == user_id)
+    )
+    if before is not None:
+        query = query.where(tuple_(Conversation.last_message_at, Conversation.conversation_id) < tuple_(*before))
+    query = query.order_by(Conversation.last_message_at.desc(), Conversation.conversation_id.desc()).limit(limit)
+    result = await db.execute(query)
+    return result.all()
@@ -0,0 +1,168 @@
+# backend/app/services/dedup.py
+"""
+Détection de doublons par empreinte indexée.
+
+Chaque véhicule porte une empreinte (colonne `fingerprint`) calculée à partir de :
+marque/modèle/année normalisés, tranche de prix, tranche de kilométrage et
+localisation. Un doublon se cherche donc par `fingerprint IN (...)` sur un index
+B-tree, puis `similar()` départage les titres sur quelques candidats seulement.
+"""
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import select
+
+from app.models import Vehicle
+from app.services.text import normalize_key as _norm, similar
+
+logger = logging.getLogger(__name__)
+
+# Deux annonces sont considérées identiques sous 1000 € d'écart (règle historique du worker)
+PRICE_TOLERANCE = 1000
+PRICE_BUCKET = 1000
+MILEAGE_BUCKET = 10000
+# Ratio SequenceMatcher minimal entre titres quand les deux sont renseignés
+TITLE_THRESHOLD = 0.6
+# Pas de la grille lat/lon utilisée quand la ville est absente (~50 km)
+GEO_STEP = 0.5
+
+def _extras(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Les champs sans colonne dédiée peuvent être rangés dans source_ids."""
+    extras = data.get("source_ids")
+    return extras if isinstance(extras, dict) else {}
+
+
+def location_hash(data: Dict[str, Any]) -> str:
+    """Ville normalisée, sinon cellule lat/lon, sinon '-'."""
+    extras = _extras(data)
+    city = data.get("location_city") or extras.get("location_city")
+    if city:
+        return _norm(str(city).split(",")[0]) or "-"
+
+    lat = data.get("lat", extras.get("lat"))
+    lon = data.get("lon", extras.get("lon"))
+    try:
+        return f"{round(float(lat) / GEO_STEP)}:{round(float(lon) / GEO_STEP)}"
+    except (TypeError, ValueError):
+        return "-"
+
+
+def _bucket(value: Optional[int], size: int) -> Optional[int]:
+    if value is None:
+        return None
+    return int(value) // size
+
+
+def _digest(make: str, model: str, year: Any, price_bucket: Optional[int],
+            mileage_bucket: Optional[int], location: str) -> str:
+    key = "|".join([
+        make,
+        model,
+        str(year or "-"),
+        "-" if price_bucket is None else str(price_bucket),
+        "-" if mileage_bucket is None else str(mileage_bucket),
+        location,
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+
+
+def compute_fingerprint(data: Dict[str, Any]) -> Optional[str]:
+    """Empreinte stockée dans Vehicle.fingerprint (None si marque/modèle inconnus)."""
+    make, model = _norm(data.get("make")), _norm(data.get("model"))
+    if not make or not model:
+        return None
+    return _digest(
+        make, model, data.get("year"),
+        _bucket(data.get("price"), PRICE_BUCKET),
+        _bucket(data.get("mileage"), MILEAGE_BUCKET),
+        location_hash(data),
+    )
+
+
+def candidate_fingerprints(data: Dict[str, Any]) -> List[str]:
+    """
+    Empreintes à interroger : la tranche de l'annonce et ses voisines,
+    pour qu'un écart de prix < PRICE_TOLERANCE (ou un kilométrage proche)
+    à cheval sur deux tranches soit quand même retrouvé.
+    """
+    make, model = _norm(data.get("make")), _norm(data.get("model"))
+    if not make or not model:
+        return []
+
+    price_bucket = _bucket(data.get("price"), PRICE_BUCKET)
+    mileage_bucket = _bucket(data.get("mileage"), MILEAGE_BUCKET)
+    price_buckets = [None] if price_bucket is None else [price_bucket - 1, price_bucket, price_bucket + 1]
+    mileage_buckets = [None] if mileage_bucket is None else [mileage_bucket - 1, mileage_bucket, mileage_bucket + 1]
+    location = location_hash(data)
+
+    return [
+        _digest(make, model, data.get("year"), p, m, location)
+        for p in price_buckets
+        for m in mileage_buckets
+    ]
+
+
+def _is_match(candidate: Vehicle, data: Dict[str, Any]) -> bool:
+    return abs((candidate.price or 0) - (data.get("price") or 0)) < PRICE_TOLERANCE
+
+
+def find_duplicate(session, data: Dict[str, Any]) -> Optional[Vehicle]:
+    """Doublon d'une annonce normalisée : VIN exact, sinon empreinte + titre."""
+    vin = data.get("vin") or _extras(data).get("vin")
+    if vin:
+        existing = session.execute(
+            select(Vehicle).where(Vehicle.vin == vin).limit(1)
+        ).scalar_one_or_none()
+        if existing:
+            return existing
+
+    fingerprints = candidate_fingerprints(data)
+    if not fingerprints:
+        return None
+
+    query = select(Vehicle).where(Vehicle.fingerprint.in_(fingerprints))
+    if data.get("id"):
+        query = query.where(Vehicle.id != data["id"])
+    candidates = [v for v in session.execute(query.limit(50)).scalars() if _is_match(v, data)]
+    if not candidates:
+        return None
+
+    title = data.get("title")
+    if not title:
+        return candidates[0]
+
+    best, best_score = None, 0.0
+    for candidate in candidates:
+        if not candidate.title:
+            # Pas de titre à comparer : l'empreinte suffit
+            score = TITLE_THRESHOLD
+        else:
+            score = similar(title, candidate.title)
+        if score > best_score:
+            best, best_score = candidate, score
+    return best if best_score >= TITLE_THRESHOLD else None
+
+
+def backfill_fingerprints(session, batch_size: int = 1000) -> int:
+    """Calcule l'empreinte des véhicules qui n'en ont pas encore."""
+    updated = 0
+    while True:
+        vehicles = session.execute(
+            select(Vehicle).where(Vehicle.fingerprint.is_(None), Vehicle.make.isnot(None),
+                                  Vehicle.model.isnot(None)).limit(batch_size)
+        ).scalars().all()
+        if not vehicles:
+            break
+        for v in vehicles:
+            # "-" marque les véhicules sans empreinte calculable pour ne pas les reprendre
+            v.fingerprint = compute_fingerprint({
+                "make": v.make, "model": v.model, "year": v.year, "price": v.price,
+                "mileage": v.mileage, "source_ids": v.source_ids,
+            }) or "-"
+            if v.vin is None and isinstance(v.source_ids, dict) and v.source_ids.get("vin"):
+                v.vin = v.source_ids["vin"]
+        session.commit()
+        updated += len(vehicles)
+        logger.info("Empreintes calculées : %s", updated)
+    return updated
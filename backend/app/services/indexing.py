@@ -0,0 +1,261 @@
+# backend/app/services/indexing.py
+"""
+Indexation des véhicules dans Elasticsearch.
+
+- vehicle_document() : conversion d'une ligne `vehicles` en document ES
+- reindex_all()      : réindexation complète dans un nouvel index versionné
+                       (vehicles-YYYYmmddHHMMSS) puis bascule atomique de l'alias
+- mark_dirty()       : pendant une réindexation, le worker note les véhicules
+                       qu'il écrit ; ils sont réindexés après la bascule
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Callable
+
+from sqlalchemy import select, func
+
+from app.models import Vehicle
+
+logger = logging.getLogger(__name__)
+
+# Clé Redis (hash) de suivi de la réindexation, lue par le dashboard admin
+REINDEX_PROGRESS_KEY = "reindex:elasticsearch"
+REINDEX_LOCK_KEY = "reindex:elasticsearch:lock"
+# Véhicules écrits par le worker pendant la réindexation (set Redis)
+REINDEX_DIRTY_KEY = "reindex:elasticsearch:dirty"
+REINDEX_DIRTY_TTL = 5 * 3600
+
+# KEYS = verrou, set ; ARGV = ids, TTL en dernier. N'écrit rien hors réindexation.
+MARK_DIRTY_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+local ttl = table.remove(ARGV)
+redis.call('SADD', KEYS[2], unpack(ARGV))
+redis.call('EXPIRE', KEYS[2], ttl)
+return 1
+"""
+
+VEHICLES_MAPPING = {
+    "mappings": {
+        "properties": {
+            "title": {"type": "text"},
+            "make": {"type": "keyword"},
+            "model": {"type": "keyword"},
+            "price": {"type": "integer"},
+            "mileage": {"type": "integer"},
+            "year": {"type": "integer"},
+            "vin": {"type": "keyword"},
+            "fuel_type": {"type": "keyword"},
+            "transmission": {"type": "keyword"},
+            "location_city": {"type": "keyword"},
+            "location": {"type": "geo_point"},
+            "posted_date": {"type": "date"},
+            "source_ids": {"type": "object"},
+            "images": {"type": "keyword", "index": False},
+            "url": {"type": "keyword", "index": False},
+            "is_active": {"type": "boolean"},
+            "score": {"type": "float"}
+        }
+    }
+}
+
+# Colonnes lues pour construire les documents
+DOCUMENT_COLUMNS = (
+    Vehicle.id, Vehicle.title, Vehicle.make, Vehicle.model, Vehicle.price,
+    Vehicle.mileage, Vehicle.year, Vehicle.vin, Vehicle.source_ids,
+    Vehicle.created_at, Vehicle.is_active,
+)
+
+
+def vehicle_document(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Document Elasticsearch à partir d'une ligne vehicles (dict ou mapping)."""
+    extras = row.get("source_ids") or {}
+    doc = {
+        "title": row.get("title"),
+        "make": row.get("make"),
+        "model": row.get("model"),
+        "price": row.get("price"),
+        "year": row.get("year"),
+        "mileage": row.get("mileage"),
+        "vin": row.get("vin"),
+        "images": extras.get("images") or [],
+        "fuel_type": extras.get("fuel_type"),
+        "transmission": extras.get("transmission"),
+        "location_city": extras.get("location_city"),
+        "url": extras.get("url"),
+        "is_active": row.get("is_active", True),
+    }
+    if row.get("created_at"):
+        doc["posted_date"] = row["created_at"]
+    if extras.get("lat") is not None and extras.get("lon") is not None:
+        doc["location"] = {"lat": extras["lat"], "lon": extras["lon"]}
+    return doc
+
+
+def stream_vehicles(db, batch_size: int = 1000, since: Optional[datetime] = None,
+                    ids: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Parcourt la table vehicles avec un curseur serveur (yield_per) :
+    la mémoire reste bornée à un lot quelle que soit la taille de la table.
+    """
+    query = select(*DOCUMENT_COLUMNS)
+    if since is not None:
+        query = query.where(Vehicle.created_at >= since)
+    if ids is not None:
+        query = query.where(Vehicle.id.in_(ids))
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    for row in result.mappings():
+        yield row
+
+
+def count_vehicles(db, since: Optional[datetime] = None) -> int:
+    query = select(func.count()).select_from(Vehicle)
+    if since is not None:
+        query = query.where(Vehicle.created_at >= since)
+    return db.execute(query).scalar() or 0
+
+
+def mark_dirty(redis, ids: Iterable[str]):
+    """Note les véhicules écrits si une réindexation est en cours (sans effet sinon)."""
+    ids = list(ids)
+    if redis is None or not ids:
+        return
+    try:
+        redis.eval(MARK_DIRTY_SCRIPT, 2, REINDEX_LOCK_KEY, REINDEX_DIRTY_KEY, *ids, REINDEX_DIRTY_TTL)
+    except Exception as e:
+        logger.warning(f"Véhicules modifiés non notés pour la réindexation: {e}")
+
+
+def take_dirty(redis) -> List[str]:
+    """Lit et vide le set des véhicules écrits pendant la réindexation."""
+    if redis is None:
+        return []
+    pipe = redis.pipeline(transaction=True)
+    pipe.smembers(REINDEX_DIRTY_KEY)
+    pipe.delete(REINDEX_DIRTY_KEY)
+    return sorted(pipe.execute()[0])
+
+
+def vehicle_actions(rows: Iterable[Dict[str, Any]], index: str) -> Iterator[Dict[str, Any]]:
+    for row in rows:
+        yield {"_index": index, "_id": row["id"], "_source": vehicle_document(row)}
+
+
+def bulk_index_rows(es, rows: Iterable[Dict[str, Any]], index: str, thread_count: int = 4,
+                    chunk_size: int = 500,
+                    on_progress: Optional[Callable[[int, int], None]] = None,
+                    progress_every: int = 5000) -> Dict[str, int]:
+    """Envoie les documents via helpers.parallel_bulk ; retourne {'indexed', 'errors'}."""
+    from elasticsearch import helpers
+
+    stats = {"indexed": 0, "errors": 0}
+    for ok, info in helpers.parallel_bulk(
+        es, vehicle_actions(rows, index),
+        thread_count=thread_count, chunk_size=chunk_size,
+        raise_on_error=False, raise_on_exception=False,
+    ):
+        if ok:
+            stats["indexed"] += 1
+        else:
+            stats["errors"] += 1
+            if stats["errors"] <= 10:
+                logger.warning(f"Erreur indexation: {info}")
+        done = stats["indexed"] + stats["errors"]
+        if on_progress and done % progress_every == 0:
+            on_progress(stats["indexed"], stats["errors"])
+    if on_progress:
+        on_progress(stats["indexed"], stats["errors"])
+    return stats
+
+
+def _alias_targets(es, alias: str) -> list:
+    if not es.indices.exists_alias(name=alias):
+        return []
+    return list(es.indices.get_alias(name=alias).keys())
+
+
+def switch_alias(es, alias: str, new_index: str) -> list:
+    """
+    Fait pointer l'alias sur new_index en une seule requête _aliases.
+    Si un index concret porte encore le nom de l'alias (installation historique),
+    il est supprimé dans la même opération atomique.
+    """
+    old_indices = _alias_targets(es, alias)
+    actions = [{"remove": {"index": old, "alias": alias}} for old in old_indices]
+    if not old_indices and es.indices.exists(index=alias):
+        actions.append({"remove_index": {"index": alias}})
+    actions.append({"add": {"index": new_index, "alias": alias}})
+    es.indices.update_aliases(actions=actions)
+    return old_indices
+
+
+def reindex_all(es, db, alias: str, batch_size: int = 1000, thread_count: int = 4,
+                on_progress: Optional[Callable[[int, int], None]] = None,
+                keep_previous: bool = True, redis=None) -> Dict[str, Any]:
+    """
+    Réindexation complète sans interruption de service :
+    1. création de `<alias>-<horodatage>` (refresh désactivé, sans réplique)
+    2. parallel_bulk depuis Postgres en streaming
+    3. bascule atomique de l'alias
+    4. rattrapage des véhicules créés pendant la réindexation, et de ceux
+       que le worker a modifiés (REINDEX_DIRTY_KEY, si `redis` est fourni ;
+       REINDEX_LOCK_KEY doit être posé par l'appelant)
+    """
+    started_at = datetime.utcnow()
+    new_index = f"{alias}-{started_at.strftime('%Y%m%d%H%M%S')}"
+    if redis is not None:
+        # Reliquat d'une réindexation interrompue
+        redis.delete(REINDEX_DIRTY_KEY)
+
+    es.indices.create(
+        index=new_index,
+        mappings=VEHICLES_MAPPING["mappings"],
+        settings={"refresh_interval": "-1", "number_of_replicas": 0},
+    )
+    logger.info(f"Index {new_index} créé")
+
+    try:
+        stats = bulk_index_rows(
+            es, stream_vehicles(db, batch_size), new_index,
+            thread_count=thread_count, chunk_size=batch_size, on_progress=on_progress,
+        )
+        es.indices.put_settings(index=new_index, settings={"refresh_interval": "1s", "number_of_replicas": 1})
+        es.indices.refresh(index=new_index)
+        old_indices = switch_alias(es, alias, new_index)
+    except Exception:
+        # L'alias n'a pas bougé : l'index partiel est abandonné
+        es.indices.delete(index=new_index, ignore_unavailable=True)
+        raise
+    logger.info(f"Alias {alias} -> {new_index} (ancien: {old_indices or 'aucun'})")
+
+    # Le worker écrivait dans l'ancien index jusqu'à la bascule
+    catch_up = bulk_index_rows(es, stream_vehicles(db, batch_size, since=started_at), alias,
+                               thread_count=1, chunk_size=batch_size)
+    stats["indexed"] += catch_up["indexed"]
+    stats["errors"] += catch_up["errors"]
+
+    # Véhicules existants modifiés (prix, empreinte, VIN...) : pas de colonne updated_at
+    dirty = take_dirty(redis)
+    for start in range(0, len(dirty), batch_size):
+        catch_up = bulk_index_rows(es, stream_vehicles(db, batch_size, ids=dirty[start:start + batch_size]),
+                                   alias, thread_count=1, chunk_size=batch_size)
+        stats["indexed"] += catch_up["indexed"]
+        stats["errors"] += catch_up["errors"]
+    if dirty:
+        logger.info(f"{len(dirty)} véhicules modifiés pendant la réindexation rattrapés")
+
+    # Garder l'index précédent pour un retour arrière, supprimer les plus anciens
+    previous = sorted(
+        name for name in es.indices.get(index=f"{alias}-*").keys() if name != new_index
+    )
+    to_delete = previous[:-1] if keep_previous else previous
+    for name in to_delete:
+        es.indices.delete(index=name, ignore_unavailable=True)
+
+    return {
+        "index": new_index,
+        "previous": old_indices,
+        "deleted": to_delete,
+        "indexed": stats["indexed"],
+        "errors": stats["errors"],
+        "duration": (datetime.utcnow() - started_at).total_seconds(),
+    }
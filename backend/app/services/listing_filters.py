@@ -0,0 +1,232 @@
+# backend/app/services/listing_filters.py
+"""
+Filtres post-scraping de la recherche avancée, compilés en un seul prédicat.
+
+compile_filters() lit une fois les filtres actifs et construit une liste de
+petites fermetures (une par filtre) dont les valeurs sont déjà normalisées :
+chaque annonce est évaluée en un seul parcours et l'évaluation s'arrête au
+premier test en échec (les tests numériques, les moins chers, passent en
+premier).
+
+Les textes sont normalisés par app.services.text.fold (cache LRU partagé) :
+"Diesel", "Peugeot" ou "Automatique" ne sont décomposés qu'une fois, et les
+listes d'équipements d'une annonce une fois pour tous les équipements demandés.
+
+Sémantique identique à l'ancien apply_post_filters (un filtre à None, 0 ou ""
+est ignoré, un champ absent de l'annonce l'exclut).
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.text import fold, fold_many
+
+Listing = Dict[str, Any]
+
+# Tolérance de +/- 100 cm³ pour la cylindrée
+ENGINE_SIZE_TOLERANCE = 100
+
+EQUIPMENT_KEYS = (
+    'climate_control', 'leather_interior', 'sunroof', 'panoramic_roof',
+    'heated_seats', 'electric_seats', 'parking_sensors', 'parking_camera',
+    'reversing_camera', 'gps', 'bluetooth', 'apple_carplay', 'android_auto',
+    'cruise_control', 'adaptive_cruise_control', 'keyless_entry',
+    'head_up_display', 'abs', 'esp', 'lane_assist', 'blind_spot',
+    'automatic_emergency_braking', 'alloy_wheels', 'led_headlights',
+    'xenon_headlights', 'tow_bar', 'ski_rack', 'roof_rack',
+)
+
+# Filtres booléens -> champs de l'annonce dont l'un doit valoir True
+BOOLEAN_FILTERS = (
+    ('metallic_color', ('metallic_color',)),
+    ('technical_control_ok', ('technical_control_ok',)),
+    ('non_smoker', ('non_smoker',)),
+    ('no_accident', ('no_accident', 'accident_free')),
+    ('service_history', ('service_history', 'full_service_history')),
+    ('warranty', ('warranty',)),
+    ('manufacturer_warranty', ('manufacturer_warranty',)),
+)
+
+# Sous-chaîne insensible à la casse uniquement (comportement historique)
+LOWER_FILTERS = ('make', 'fuel_type', 'transmission')
+# Sous-chaîne insensible à la casse et aux accents
+FOLDED_FILTERS = ('body_type', 'seller_type', 'color', 'color_interior', 'emission_class', 'drive_type')
+
+
+def _equipment_check(keys) -> Callable[[Listing], bool]:
+    """
+    Chaque équipement demandé doit être présent : champ booléen de l'annonce,
+    entrée de la liste `equipment` ou mention dans `features`. Les listes de
+    l'annonce ne sont normalisées que si un champ booléen ne suffit pas.
+    """
+    keys = tuple((key, fold(key)) for key in keys)
+
+    def check(r):
+        equipment = features = None
+        for key, folded_key in keys:
+            if r.get(key) is True:
+                continue
+            if equipment is None:
+                raw = r.get('equipment')
+                equipment = frozenset(fold_many(raw)) if raw and isinstance(raw, list) else frozenset()
+                raw = r.get('features')
+                features = fold_many(map(str, raw)) if raw and isinstance(raw, list) else []
+            if key in equipment:
+                continue
+            if not any(folded_key in f for f in features):
+                return False
+        return True
+    return check
+
+
+Check = Callable[[Listing], bool]
+
+
+# Fabriques de tests : chaque valeur de filtre est normalisée une fois et liée
+# dans la fermeture, le test par annonce ne fait plus que comparer.
+
+def _range(field: str, low, high) -> Optional[Check]:
+    if low and high:
+        def check(r):
+            v = r.get(field)
+            return bool(v) and low <= v <= high
+    elif low:
+        def check(r):
+            v = r.get(field)
+            return bool(v) and v >= low
+    elif high:
+        def check(r):
+            v = r.get(field)
+            return bool(v) and v <= high
+    else:
+        return None
+    return check
+
+
+def _equals_any(fields, expected) -> Check:
+    return lambda r: any(r.get(field) == expected for field in fields)
+
+
+def _is_true(fields) -> Check:
+    return lambda r: any(r.get(field) is True for field in fields)
+
+
+def _contains_lower(field: str, needle: str) -> Check:
+    needle = needle.lower()
+
+    def check(r):
+        v = r.get(field)
+        return bool(v) and needle in v.lower()
+    return check
+
+
+def _contains_folded(fields, needle: str) -> Check:
+    """Sous-chaîne dans l'un des champs (testés dans l'ordre)"""
+    needle = fold(needle)
+
+    def check(r):
+        for field in fields:
+            v = r.get(field)
+            if v and needle in fold(v):
+                return True
+        return False
+    return check
+
+
+def _engine_size(expected) -> Check:
+    def check(r):
+        v = r.get('engine_size')
+        return bool(v) and abs(v - expected) <= ENGINE_SIZE_TOLERANCE
+    return check
+
+
+def _critair(expected) -> Check:
+    expected = str(expected)
+
+    def check(r):
+        v = r.get('critair')
+        return bool(v) and str(v) == expected
+    return check
+
+
+def _first_registration(r) -> bool:
+    return r.get('first_registration') is True or r.get('owners') == 1
+
+
+def compile_checks(filters: Dict[str, Any]) -> List[Check]:
+    """Tests des filtres actifs, du moins coûteux au plus coûteux."""
+    f = filters.get
+    checks: List[Optional[Check]] = []
+
+    # Bornes numériques (les moins coûteuses)
+    for field, low, high in (
+        ('price', 'price_min', 'price_max'),
+        ('year', 'year_min', 'year_max'),
+        ('mileage', 'mileage_min', 'mileage_max'),
+        ('horsepower', 'horsepower_min', 'horsepower_max'),
+        ('horsepower_fiscal', 'horsepower_fiscal_min', 'horsepower_fiscal_max'),
+    ):
+        checks.append(_range(field, f(low), f(high)))
+    checks.append(_range('co2', None, f('co2_max')))
+    checks.append(_range('airbags', f('airbags'), None))
+    if f('cylinders'):
+        checks.append(_equals_any(('cylinders',), f('cylinders')))
+    if f('engine_size'):
+        checks.append(_engine_size(f('engine_size')))
+    if f('nb_doors'):
+        checks.append(_equals_any(('doors', 'nb_doors'), f('nb_doors')))
+    if f('nb_seats'):
+        checks.append(_equals_any(('seats', 'nb_seats'), f('nb_seats')))
+    if f('critair'):
+        checks.append(_critair(f('critair')))
+
+    # Booléens
+    if f('first_registration') is True:
+        checks.append(_first_registration)
+    for key, fields in BOOLEAN_FILTERS:
+        if f(key) is True:
+            checks.append(_is_true(fields))
+
+    # Texte
+    for key in LOWER_FILTERS:
+        if f(key):
+            checks.append(_contains_lower(key, f(key)))
+    for key in FOLDED_FILTERS:
+        if f(key):
+            checks.append(_contains_folded((key,), f(key)))
+    if f('model'):
+        # Modèle cherché dans le champ model, sinon dans le titre
+        checks.append(_contains_folded(('model', 'title'), f('model')))
+
+    # Équipements (les plus coûteux : listes de l'annonce)
+    equipment = [key for key in EQUIPMENT_KEYS if f(key) is True]
+    if equipment:
+        checks.append(_equipment_check(equipment))
+
+    return [check for check in checks if check is not None]
+
+
+def compile_filters(filters: Dict[str, Any]) -> Optional[Check]:
+    """
+    Prédicat unique pour les filtres donnés (vrai si l'annonce passe),
+    ou None si aucun filtre n'est actif.
+    """
+    checks = tuple(compile_checks(filters))
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+
+    # Équivalent à all(check(r) for check in checks), sans générateur par annonce
+    def predicate(r):
+        for check in checks:
+            if not check(r):
+                return False
+        return True
+    return predicate
+
+
+def filter_listings(results: List[Listing], filters: Dict[str, Any]) -> List[Listing]:
+    """Annonces qui passent tous les filtres, en un seul parcours."""
+    predicate = compile_filters(filters)
+    if predicate is None:
+        return list(results)
+    return [r for r in results if predicate(r)]
@@ -0,0 +1,173 @@
+# backend/app/services/realtime.py
+"""
+Diffusion temps réel des événements véhicules vers les WebSockets.
+
+Le worker d'ingestion publie dans des streams Redis :
+- events:alert_notifications : correspondances d'alertes (instant, digest)
+- events:price_changes       : changements de prix
+
+Chaque processus API lit ces streams (XREAD bloquant, sans groupe de
+consommateurs : chaque processus voit tous les événements) et ne livre qu'aux
+sockets de notifications (authentifiées, /api/notifications/ws) ouvertes sur
+ce processus, jamais aux sockets de messagerie. Les baisses de prix sont
+adressées aux utilisateurs connectés qui ont le véhicule en favori.
+
+Les événements d'un utilisateur sont regroupés : au plus une trame
+{"type": "events", "events": [...]} par FLUSH_INTERVAL.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.services.alert_matching import ALERT_EVENTS_STREAM
+from app.services.content_hash import PRICE_EVENTS_STREAM
+from app.websocket_manager import NOTIFICATIONS, ws_manager
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+FLUSH_INTERVAL = 1.0
+# Événements gardés par utilisateur entre deux trames (les plus récents)
+MAX_EVENTS_PER_FRAME = 100
+READ_BLOCK_MS = 5000
+READ_COUNT = 500
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class EventFanout:
+    """Lecteur des streams d'événements et envoi groupé aux sockets locales."""
+
+    def __init__(self, manager, redis_url: str = settings.REDIS_URL, flush_interval: float = FLUSH_INTERVAL):
+        self.manager = manager
+        self.flush_interval = flush_interval
+        self._redis = aioredis.from_url(redis_url, decode_responses=True) if REDIS_AVAILABLE else None
+        self._pending: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if self._redis is None or self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._read_loop(), name="events-fanout-read"),
+            asyncio.create_task(self._flush_loop(), name="events-fanout-flush"),
+        ]
+        logger.info("📡 Diffusion des événements véhicules démarrée")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    def queue(self, user_id: str, event: Dict[str, Any]):
+        events = self._pending[user_id]
+        events.append(event)
+        if len(events) > MAX_EVENTS_PER_FRAME:
+            del events[:-MAX_EVENTS_PER_FRAME]
+
+    # ----- Lecture des streams -----
+
+    async def _read_loop(self):
+        # "$" : seuls les événements publiés après le démarrage du processus
+        last_ids = {ALERT_EVENTS_STREAM: "$", PRICE_EVENTS_STREAM: "$"}
+        while True:
+            try:
+                response = await self._redis.xread(last_ids, count=READ_COUNT, block=READ_BLOCK_MS)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Lecture des événements impossible: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for stream, entries in response or []:
+                if not entries:
+                    continue
+                last_ids[stream] = entries[-1][0]
+                fields = [entry[1] for entry in entries]
+                try:
+                    if stream == ALERT_EVENTS_STREAM:
+                        self._route_alerts(fields)
+                    else:
+                        await self._route_price_changes(fields)
+                except Exception as e:
+                    logger.warning(f"⚠️ Événements {stream} ignorés: {e}")
+
+    def _route_alerts(self, entries: List[Dict[str, str]]):
+        for entry in entries:
+            user_id = entry.get("user_id")
+            if not user_id or not self.manager.is_connected_locally(user_id, NOTIFICATIONS):
+                continue
+            self.queue(user_id, {
+                "type": "alert_match" if entry.get("kind") == "instant" else "alert_digest",
+                "alerts": json.loads(entry.get("alerts") or "[]"),
+            })
+
+    async def _route_price_changes(self, entries: List[Dict[str, str]]):
+        drops = {}
+        for entry in entries:
+            old_price, new_price = _to_int(entry.get("old_price")), _to_int(entry.get("new_price"))
+            if old_price is not None and new_price is not None and new_price < old_price:
+                drops[entry["vehicle_id"]] = (old_price, new_price)
+        connected = self.manager.local_users(NOTIFICATIONS)
+        if not drops or not connected:
+            return
+
+        for user_id, vehicle_id in await self._favorites(list(drops), connected):
+            old_price, new_price = drops[vehicle_id]
+            self.queue(user_id, {
+                "type": "price_drop",
+                "vehicle_id": vehicle_id,
+                "old_price": old_price,
+                "new_price": new_price,
+            })
+
+    async def _favorites(self, vehicle_ids: List[str], user_ids: List[str]):
+        """(user_id, vehicle_id) des favoris parmi les utilisateurs connectés localement."""
+        from app.db import AsyncSessionLocal
+        from app.models import Favorite
+
+        if AsyncSessionLocal is None:
+            return []
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Favorite.user_id, Favorite.vehicle_id)
+                .where(Favorite.vehicle_id.in_(vehicle_ids), Favorite.user_id.in_(user_ids))
+            )
+            return result.all()
+
+    # ----- Envoi groupé -----
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, defaultdict(list)
+        # Livraison locale uniquement : chaque nœud lit les streams et sert ses propres sockets
+        for user_id, events in pending.items():
+            self.manager.send_local({"type": "events", "events": events}, user_id, NOTIFICATIONS)
+
+
+event_fanout = EventFanout(ws_manager)
@@ -4,11 +4,34 @@ from typing import Dict, Any
 from elasticsearch import Elasticsearch, exceptions as es_exceptions
 import logging
 
+from app.services.search_cache import search_cache, make_key
+
 logger = logging.getLogger(__name__)
 ELASTIC_HOST = os.getenv("ELASTIC_HOST", "http://127.0.0.1:9200")
 ES_INDEX = os.getenv("ES_INDEX", "vehicles")
+# Délai max d'une recherche et taille du pool de connexions par nœud ES
+ES_REQUEST_TIMEOUT = float(os.getenv("ES_REQUEST_TIMEOUT", "5"))
+ES_MAX_CONNECTIONS = int(os.getenv("ES_MAX_CONNECTIONS", "50"))
+
+# Client synchrone : tâches Celery, scripts et tout code hors boucle asyncio
+es = Elasticsearch(hosts=[ELASTIC_HOST], connections_per_node=ES_MAX_CONNECTIONS,
+                   request_timeout=ES_REQUEST_TIMEOUT)
+
+# Client asynchrone (nécessite aiohttp) pour les routes FastAPI
+try:
+    from elasticsearch import AsyncElasticsearch
+    async_es = AsyncElasticsearch(hosts=[ELASTIC_HOST], connections_per_node=ES_MAX_CONNECTIONS,
+                                  request_timeout=ES_REQUEST_TIMEOUT)
+except Exception as e:
+    logger.warning("AsyncElasticsearch indisponible (%s), recherche exécutée dans le threadpool", e)
+    async_es = None
+
+
+async def close_async_client():
+    """Ferme le pool de connexions asynchrone (arrêt de l'application)."""
+    if async_es is not None:
+        await async_es.close()
 
-es = Elasticsearch(hosts=[ELASTIC_HOST])
 
 class SearchService:
     index = ES_INDEX
@@ -70,7 +93,27 @@ class SearchService:
         return body
 
     @staticmethod
-    def search(q: str = None, filters: Dict[str, Any] = None, page: int = 1, size: int = 20) -> Dict[str, Any]:
+    def _parse_response(resp) -> Dict[str, Any]:
+        hits = []
+        total = resp.get("hits", {}).get("total", {}).get("value", 0)
+        for h in resp.get("hits", {}).get("hits", []):
+            hits.append({
+                "id": h.get("_id"),
+                "score": h.get("_score", 0.0),
+                "source": h.get("_source", {})
+            })
+        return {"total": total, "hits": hits}
+
+    @staticmethod
+    def search(q: str = None, filters: Dict[str, Any] = None, page: int = 1, size: int = 20,
+               use_cache: bool = True) -> Dict[str, Any]:
+        """Version synchrone (Celery, scripts). Dans une route async, utiliser asearch()."""
+        cache_key = make_key(q, filters, page, size) if use_cache else None
+        if cache_key:
+            cached = search_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         body = SearchService._build_query(q=q, filters=filters or {})
         from_ = (page - 1) * size
         try:
@@ -82,12 +125,38 @@ class SearchService:
             logger.exception("ES search error")
             raise
 
-        hits = []
-        total = resp.get("hits", {}).get("total", {}).get("value", 0)
-        for h in resp.get("hits", {}).get("hits", []):
-            hits.append({
-                "id": h.get("_id"),
-                "score": h.get("_score", 0.0),
-                "source": h.get("_source", {})
-            })
-        return {"total": total, "hits": hits}
+        result = SearchService._parse_response(resp)
+        if cache_key:
+            search_cache.set(cache_key, result)
+        return result
+
+    @staticmethod
+    async def asearch(q: str = None, filters: Dict[str, Any] = None, page: int = 1, size: int = 20,
+                      use_cache: bool = True, timeout: float = None) -> Dict[str, Any]:
+        """Recherche non bloquante pour les routes FastAPI (timeout en secondes)."""
+        if async_es is None:
+            from starlette.concurrency import run_in_threadpool
+            return await run_in_threadpool(SearchService.search, q, filters, page, size, use_cache)
+
+        cache_key = make_key(q, filters, page, size) if use_cache else None
+        if cache_key:
+            cached = await search_cache.aget(cache_key)
+            if cached is not None:
+                return cached
+
+        body = SearchService._build_query(q=q, filters=filters or {})
+        from_ = (page - 1) * size
+        client = async_es.options(request_timeout=timeout) if timeout else async_es
+        try:
+            resp = await client.search(index=SearchService.index, body=body, from_=from_, size=size)
+        except es_exceptions.NotFoundError:
+            logger.info("ES index not found: %s", SearchService.index)
+            return {"total": 0, "hits": []}
+        except Exception as e:
+            logger.exception("ES search error")
+            raise
+
+        result = SearchService._parse_response(resp)
+        if cache_key:
+            await search_cache.aset(cache_key, result)
+        return result
@@ -0,0 +1,198 @@
+# backend/app/services/search_cache.py
+"""
+Cache des résultats de SearchService.search.
+
+Deux niveaux :
+- LRU en mémoire (par processus) pour les recherches très répétées ("clio", "golf diesel")
+- Redis, partagé entre les workers uvicorn, avec TTL
+
+La clé inclut une "génération" d'index : le worker d'ingestion incrémente
+GENERATION_KEY après chaque lot, ce qui rend toutes les entrées précédentes
+inaccessibles sans avoir à les supprimer (elles expirent via le TTL).
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "search:generation"
+KEY_PREFIX = "search:result"
+# Durée pendant laquelle un processus réutilise la génération lue dans Redis
+GENERATION_REFRESH = 1.0
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+def _canonical(value: Any) -> Any:
+    """Forme stable des filtres : clés triées, valeurs vides retirées, texte normalisé."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))
+                if v is not None and v != "" and v != []}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def make_key(q: Optional[str], filters: Optional[Dict[str, Any]], page: int, size: int) -> str:
+    payload = {
+        "q": " ".join(q.lower().split()) if q else None,
+        "filters": _canonical(filters or {}),
+        "page": int(page),
+        "size": int(size),
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    def __init__(self, redis_url: str = settings.REDIS_URL, ttl: int = settings.SEARCH_CACHE_TTL,
+                 local_size: int = settings.SEARCH_CACHE_LOCAL_SIZE):
+        self.ttl = ttl
+        self.local_size = local_size
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._generation_checked = 0.0
+        self._redis = redis.from_url(redis_url, decode_responses=True,
+                                     socket_timeout=0.2) if REDIS_AVAILABLE else None
+        # Client asyncio pour les routes FastAPI (ne bloque pas la boucle)
+        self._aredis = aioredis.from_url(redis_url, decode_responses=True,
+                                         socket_timeout=0.2) if REDIS_AVAILABLE else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def generation(self) -> int:
+        now = time.monotonic()
+        if self._redis and now - self._generation_checked > GENERATION_REFRESH:
+            try:
+                self._generation = int(self._redis.get(GENERATION_KEY) or 0)
+            except Exception as e:
+                logger.debug("Génération du cache indisponible: %s", e)
+            self._generation_checked = now
+        return self._generation
+
+    async def ageneration(self) -> int:
+        now = time.monotonic()
+        if self._aredis and now - self._generation_checked > GENERATION_REFRESH:
+            # Marqué avant l'await : une seule coroutine relit la génération
+            self._generation_checked = now
+            try:
+                self._generation = int(await self._aredis.get(GENERATION_KEY) or 0)
+            except Exception as e:
+                logger.debug("Génération du cache indisponible: %s", e)
+        return self._generation
+
+    def _get_local(self, key: str, generation: int) -> Optional[Dict[str, Any]]:
+        if not self.local_size:
+            return None
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            entry_generation, expires_at, value = entry
+            if entry_generation == generation and expires_at > time.monotonic():
+                self._local.move_to_end(key)
+                return value
+            del self._local[key]
+        return None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        generation = self.generation()
+        value = self._get_local(key, generation)
+        if value is not None or not self._redis:
+            return value
+        try:
+            raw = self._redis.get(f"{KEY_PREFIX}:{generation}:{key}")
+        except Exception as e:
+            logger.debug("Lecture cache Redis impossible: %s", e)
+            return None
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        self._store_local(key, generation, value)
+        return value
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        generation = await self.ageneration()
+        value = self._get_local(key, generation)
+        if value is not None or not self._aredis:
+            return value
+        try:
+            raw = await self._aredis.get(f"{KEY_PREFIX}:{generation}:{key}")
+        except Exception as e:
+            logger.debug("Lecture cache Redis impossible: %s", e)
+            return None
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        self._store_local(key, generation, value)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+        generation = self.generation()
+        self._store_local(key, generation, value)
+        if not self._redis:
+            return
+        try:
+            self._redis.set(f"{KEY_PREFIX}:{generation}:{key}", json.dumps(value, default=str), ex=self.ttl)
+        except Exception as e:
+            logger.debug("Écriture cache Redis impossible: %s", e)
+
+    async def aset(self, key: str, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+        generation = await self.ageneration()
+        self._store_local(key, generation, value)
+        if not self._aredis:
+            return
+        try:
+            await self._aredis.set(f"{KEY_PREFIX}:{generation}:{key}", json.dumps(value, default=str), ex=self.ttl)
+        except Exception as e:
+            logger.debug("Écriture cache Redis impossible: %s", e)
+
+    def _store_local(self, key: str, generation: int, value: Dict[str, Any]):
+        if not self.local_size:
+            return
+        with self._lock:
+            self._local[key] = (generation, time.monotonic() + self.ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+
+def bump_generation(redis_client) -> Optional[int]:
+    """Invalide le cache de recherche (appelé après ingestion ou réindexation)."""
+    try:
+        return redis_client.incr(GENERATION_KEY)
+    except Exception as e:
+        logger.warning("Invalidation du cache de recherche impossible: %s", e)
+        return None
+
+
+search_cache = SearchCache()
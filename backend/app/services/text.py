@@ -0,0 +1,95 @@
+# backend/app/services/text.py
+"""
+Normalisation de texte partagée (recherche avancée, déduplication du worker,
+enrichissement des scrapers).
+
+- fold()           : minuscules sans accents ("Série 1" -> "serie 1"), mis en cache LRU
+- fold_many()      : fold() sur une liste (équipements, options...)
+- normalize_key()  : fold() + ponctuation remplacée par des espaces (clés de dédup)
+- similar()        : ratio de similarité entre deux titres
+
+fold() passe d'abord par une table str.translate couvrant les accents latins
+courants ; unicodedata (NFD) n'est utilisé que si le résultat contient encore
+des caractères non ASCII. Le résultat est identique à l'ancienne normalisation
+NFD + suppression des marques diacritiques (catégorie Mn) + lower().
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Any, Iterable, List
+
+# Au-delà, le texte (description complète...) n'est pas mis en cache
+CACHE_MAX_LENGTH = 256
+CACHE_SIZE = 65536
+
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def _fold_unicode(text: str) -> str:
+    """Décomposition NFD, suppression des accents, minuscules."""
+    nfd = unicodedata.normalize("NFD", text)
+    return "".join(char for char in nfd if unicodedata.category(char) != "Mn").lower()
+
+
+def _build_table() -> dict:
+    """Table de translittération dérivée de _fold_unicode (Latin-1 et Latin étendu A)."""
+    table = {}
+    for code in range(0xC0, 0x180):
+        folded = _fold_unicode(chr(code))
+        if len(folded) == 1 and folded.isascii():
+            table[code] = folded
+    return table
+
+
+_LATIN_TABLE = _build_table()
+
+
+def _fold(text: str) -> str:
+    folded = text.translate(_LATIN_TABLE).lower()
+    if folded.isascii():
+        return folded
+    return _fold_unicode(text)
+
+
+_fold_cached = lru_cache(maxsize=CACHE_SIZE)(_fold)
+
+
+def fold(value: Any) -> str:
+    """Minuscules sans accents ; chaîne vide pour None ou ""."""
+    if not value:
+        return ""
+    if not isinstance(value, str):
+        value = str(value)
+    if len(value) > CACHE_MAX_LENGTH:
+        return _fold(value)
+    return _fold_cached(value)
+
+
+def fold_many(values: Iterable[Any]) -> List[str]:
+    """fold() sur chaque valeur (valeurs vides -> "")."""
+    return [fold(value) for value in values]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalize_key(text: str) -> str:
+    return NON_ALNUM.sub(" ", fold(text)).strip()
+
+
+def normalize_key(value: Any) -> str:
+    """Minuscules, sans accents ni ponctuation ("Citroën C3," -> "citroen c3")."""
+    if value is None:
+        return ""
+    return _normalize_key(value if isinstance(value, str) else str(value))
+
+
+def similar(a: str, b: str) -> float:
+    """Ratio SequenceMatcher (0..1) entre deux textes, insensible à la casse."""
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+def cache_info() -> dict:
+    """Statistiques des caches (débogage / benchmark)."""
+    return {"fold": _fold_cached.cache_info()._asdict(), "normalize_key": _normalize_key.cache_info()._asdict()}
@@ -0,0 +1,172 @@
+# backend/app/services/unread_counters.py
+"""
+Compteurs de messages non lus dans Redis.
+
+Un hash par utilisateur, messages:unread:<user_id> :
+- un champ par conversation (nombre de non lus, absent si 0)
+- "total" : somme pour le badge (/api/messages/unread/count, lecture O(1))
+
+Le hash n'existe que pour les utilisateurs qui ont interrogé le compteur :
+il est chargé depuis la table conversations au premier appel (TTL KEY_TTL).
+Les incréments (envoi) et décréments (lecture) sont des scripts Lua sans
+effet si la clé est absente : un hash n'est jamais partiellement rempli.
+
+Une mise à jour concurrente du chargement peut se perdre ; la tâche
+reconcile_unread_counters réécrit périodiquement les hashes existants à partir
+des messages non lus en base (index partiel ix_messages_unread_recipient).
+"""
+import logging
+from typing import Dict, Iterable, List
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+KEY_PREFIX = "messages:unread"
+TOTAL_FIELD = "total"
+KEY_TTL = 7 * 24 * 3600
+RECONCILE_BATCH = 500
+
+# KEYS[1] = hash ; ARGV = conversation_id, delta, ttl. Retourne le total, -1 si absent.
+INCR_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -1 end
+local delta = tonumber(ARGV[2])
+local n = redis.call('HINCRBY', KEYS[1], ARGV[1], delta)
+if n <= 0 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    delta = delta - n
+end
+local total = redis.call('HINCRBY', KEYS[1], 'total', delta)
+if total < 0 then
+    redis.call('HSET', KEYS[1], 'total', 0)
+    total = 0
+end
+if delta > 0 then redis.call('EXPIRE', KEYS[1], ARGV[3]) end
+return total
+"""
+
+# KEYS[1] = hash ; ARGV = champ, valeur, ... Réécrit le hash en conservant son TTL.
+REPLACE_SCRIPT = """
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl < 0 then return 0 end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], unpack(ARGV))
+redis.call('PEXPIRE', KEYS[1], ttl)
+return 1
+"""
+
+
+def counter_key(user_id: str) -> str:
+    return f"{KEY_PREFIX}:{user_id}"
+
+
+def _mapping(counts: Dict[str, int]) -> Dict[str, int]:
+    counts = {conversation_id: n for conversation_id, n in counts.items() if n > 0}
+    return {**counts, TOTAL_FIELD: sum(counts.values())}
+
+
+class UnreadCounters:
+    """Compteurs de non lus utilisés par les routes de messagerie (client asyncio)."""
+
+    def __init__(self, redis_url: str = settings.REDIS_URL, ttl: int = KEY_TTL):
+        self.ttl = ttl
+        self._redis = aioredis.from_url(redis_url, decode_responses=True,
+                                        socket_timeout=0.2) if REDIS_AVAILABLE else None
+        self._incr = self._redis.register_script(INCR_SCRIPT) if self._redis is not None else None
+
+    async def incr(self, user_id: str, conversation_id: str, delta: int = 1):
+        """À appeler après le commit : delta > 0 à l'envoi, < 0 à la lecture."""
+        if self._redis is None or not delta:
+            return
+        try:
+            await self._incr(keys=[counter_key(user_id)], args=[conversation_id, delta, self.ttl])
+        except Exception as e:
+            logger.debug(f"Compteur non lus de {user_id} non mis à jour: {e}")
+
+    async def decr(self, user_id: str, conversation_id: str, count: int):
+        await self.incr(user_id, conversation_id, -count)
+
+    async def total(self, db: AsyncSession, user_id: str) -> int:
+        """Nombre total de non lus : Redis, sinon table conversations (et chargement du hash)."""
+        key = counter_key(user_id)
+        if self._redis is not None:
+            try:
+                cached = await self._redis.hget(key, TOTAL_FIELD)
+                if cached is not None:
+                    return int(cached)
+            except Exception as e:
+                logger.debug(f"Compteur non lus de {user_id} indisponible: {e}")
+
+        result = await db.execute(
+            select(Conversation.conversation_id, Conversation.unread_count)
+            .where(Conversation.user_id == user_id, Conversation.unread_count > 0)
+        )
+        mapping = _mapping(dict(result.all()))
+
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=True)
+                pipe.hset(key, mapping=mapping)
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+            except Exception as e:
+                logger.debug(f"Compteur non lus de {user_id} non chargé: {e}")
+        return mapping[TOTAL_FIELD]
+
+
+def _scan_users(redis) -> Iterable[List[str]]:
+    batch = []
+    for key in redis.scan_iter(match=f"{KEY_PREFIX}:*", count=RECONCILE_BATCH):
+        batch.append(key.split(":", 2)[2])
+        if len(batch) >= RECONCILE_BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reconcile(db, redis) -> Dict[str, int]:
+    """
+    Réécrit les hashes existants à partir des messages non lus en base
+    (session SQLAlchemy synchrone, client Redis synchrone). Retourne
+    {"users": hashes vérifiés, "fixed": hashes corrigés}.
+    """
+    stats = {"users": 0, "fixed": 0}
+    replace = redis.register_script(REPLACE_SCRIPT)
+    for user_ids in _scan_users(redis):
+        rows = db.execute(
+            select(Message.recipient_id, Message.conversation_id, func.count())
+            .where(Message.recipient_id.in_(user_ids), Message.is_read == False)  # noqa: E712
+            .group_by(Message.recipient_id, Message.conversation_id)
+        ).all()
+        counts: Dict[str, Dict[str, int]] = {user_id: {} for user_id in user_ids}
+        for user_id, conversation_id, n in rows:
+            counts[user_id][conversation_id] = n
+
+        pipe = redis.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.hgetall(counter_key(user_id))
+        cached = pipe.execute()
+
+        for user_id, current in zip(user_ids, cached):
+            stats["users"] += 1
+            expected = _mapping(counts[user_id])
+            if not current or {k: int(v) for k, v in current.items()} == expected:
+                continue
+            args = [item for pair in expected.items() for item in pair]
+            if replace(keys=[counter_key(user_id)], args=args):
+                stats["fixed"] += 1
+    return stats
+
+
+unread_counters = UnreadCounters()
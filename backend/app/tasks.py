@@ -18,7 +18,8 @@ from scrapers.autoscoot_scraper import AutoScout24Scraper
 try:
     import redis
     from app.db import SessionLocal
-    from app.models import Vehicle, SearchHistory, Alert
+    from app.models import Vehicle, SearchHistory
+    from app.services.search_cache import bump_generation
     from sqlalchemy import func
     REDIS_AVAILABLE = True
 except ImportError as e:
@@ -111,9 +112,11 @@ def check_scraper_health(source: str) -> Dict[str, Any]:
 
 @app.task(bind=True, name='app.tasks.scrape_leboncoin')
 def scrape_leboncoin(self, query: str = 'voiture', max_pages: int = 5, 
-                     deep_scrape: bool = False) -> Dict[str, Any]:
+                     deep_scrape: bool = False, incremental: bool = True) -> Dict[str, Any]:
     """
     Tâche de scraping LeBonCoin avec retry et monitoring
+    incremental=True : seules les annonces nouvelles ou modifiées depuis le
+    dernier run sont envoyées au worker (voir scrapers.incremental)
     """
     start_time = datetime.utcnow()
     source = 'leboncoin'
@@ -123,10 +126,12 @@ def scrape_leboncoin(self, query: str = 'voiture', max_pages: int = 5,
     try:
         scraper = LeBonCoinScraper()
         
-        results = scraper.scrape({
+        # Pages demandées en parallèle (LEBONCOIN_CONCURRENCY) sous le plafond de débit
+        results = scraper.scrape_concurrent({
             'query': query,
             'max_pages': max_pages,
-            'deep_scrape': deep_scrape
+            'deep_scrape': deep_scrape,
+            'incremental': incremental
         })
         
         success_count = 0
@@ -227,8 +232,8 @@ def scrape_lacentrale(self, queries: List[str] = None, max_pages: int = 10) -> D
 
 
 @app.task(bind=True, name='app.tasks.scrape_autoscout')
-def scrape_autoscout(self, max_pages: int = 5) -> Dict[str, Any]:
-    """Tâche de scraping AutoScout24"""
+def scrape_autoscout(self, max_pages: int = 5, incremental: bool = True) -> Dict[str, Any]:
+    """Tâche de scraping AutoScout24 (annonces déjà envoyées ignorées si incremental)"""
     start_time = datetime.utcnow()
     source = 'autoscout24'
     
@@ -238,7 +243,8 @@ def scrape_autoscout(self, max_pages: int = 5) -> Dict[str, Any]:
         scraper = AutoScout24Scraper()
         
         results = scraper.scrape({
-            'max_pages': max_pages
+            'max_pages': max_pages,
+            'incremental': incremental
         })
         
         success_count = 0
@@ -309,98 +315,139 @@ def cleanup_old_listings(days: int = 90):
 
 
 @app.task(name='app.tasks.update_elasticsearch_index')
-def update_elasticsearch_index():
+def update_elasticsearch_index(hours: int = 24):
     """Réindexe les véhicules récents dans Elasticsearch"""
     logger.info("🔍 Mise à jour index Elasticsearch")
     
     try:
         from app.elasticsearch_client import es
         from app.config import settings
+        from app.services import indexing
         
         db = SessionLocal()
         
-        # Réindexer les véhicules des dernières 24h
-        since = datetime.utcnow() - timedelta(hours=24)
+        # Réindexer les véhicules des dernières 24h (pas de colonne updated_at)
+        since = datetime.utcnow() - timedelta(hours=hours)
         
-        vehicles = db.query(Vehicle).filter(
-            Vehicle.updated_at >= since
-        ).all()
+        try:
+            stats = indexing.bulk_index_rows(
+                es, indexing.stream_vehicles(db, since=since), settings.ES_INDEX,
+                thread_count=2,
+            )
+        finally:
+            db.close()
         
-        indexed = 0
-        for vehicle in vehicles:
-            try:
-                es.index(
-                    index=settings.ES_INDEX,
-                    id=vehicle.id,
-                    document={
-                        'title': vehicle.title,
-                        'make': vehicle.make,
-                        'model': vehicle.model,
-                        'price': vehicle.price,
-                        'year': vehicle.year,
-                        'mileage': vehicle.mileage,
-                        'fuel_type': vehicle.fuel_type,
-                        'transmission': vehicle.transmission,
-                        'location_city': vehicle.location_city,
-                    }
-                )
-                indexed += 1
-            except Exception as e:
-                logger.warning(f"Erreur indexation {vehicle.id}: {e}")
+        if stats['indexed'] and redis_client:
+            bump_generation(redis_client)
         
-        db.close()
-        
-        logger.info(f"✅ Indexé {indexed} véhicules")
+        logger.info(f"✅ Indexé {stats['indexed']} véhicules ({stats['errors']} erreurs)")
         
-        return {'indexed': indexed}
+        return stats
         
     except Exception as e:
         logger.error(f"❌ Erreur indexation ES: {e}")
         return {'error': str(e)}
 
 
-@app.task(name='app.tasks.send_alert_notifications')
-def send_alert_notifications():
-    """Envoie les notifications d'alertes aux utilisateurs"""
-    logger.info("📧 Envoi notifications alertes")
+@app.task(bind=True, name='app.tasks.reindex_elasticsearch', max_retries=0,
+          soft_time_limit=4 * 3600, time_limit=4 * 3600 + 300)
+def reindex_elasticsearch(self, batch_size: int = 1000, thread_count: int = 4) -> Dict[str, Any]:
+    """
+    Réindexation complète : nouvel index versionné rempli via parallel_bulk,
+    puis bascule atomique de l'alias ES_INDEX. L'avancement est publié
+    dans le hash Redis REINDEX_PROGRESS_KEY.
+    """
+    from app.elasticsearch_client import es
+    from app.config import settings
+    from app.services import indexing
+    
+    task_id = self.request.id or 'local'
+    key = indexing.REINDEX_PROGRESS_KEY
+    
+    # Une seule réindexation à la fois
+    if redis_client and not redis_client.set(indexing.REINDEX_LOCK_KEY, task_id, nx=True, ex=4 * 3600):
+        logger.warning("⚠️ Réindexation déjà en cours")
+        return {'error': 'already_running'}
     
+    db = SessionLocal()
     try:
-        db = SessionLocal()
+        total = indexing.count_vehicles(db)
+        if redis_client:
+            redis_client.delete(key)
+            redis_client.hset(key, mapping={
+                'task_id': task_id,
+                'status': 'running',
+                'total': total,
+                'indexed': 0,
+                'errors': 0,
+                'started_at': datetime.utcnow().isoformat(),
+            })
         
-        # Récupérer alertes actives
-        alerts = db.query(Alert).filter(
-            Alert.is_active == True
-        ).all()
-        
-        notifications_sent = 0
-        
-        for alert in alerts:
-            # Vérifier fréquence
-            if alert.last_sent_at:
-                hours_since = (datetime.utcnow() - alert.last_sent_at).total_seconds() / 3600
-                
-                if alert.frequency == 'daily' and hours_since < 24:
-                    continue
-                elif alert.frequency == 'weekly' and hours_since < 168:
-                    continue
-            
-            # Rechercher nouveaux véhicules correspondants
-            # TODO: Implémenter logique de recherche selon criteria
-            
-            # Marquer comme envoyé
-            alert.last_sent_at = datetime.utcnow()
-            notifications_sent += 1
+        def on_progress(indexed: int, errors: int):
+            if redis_client:
+                redis_client.hset(key, mapping={'indexed': indexed, 'errors': errors})
         
-        db.commit()
-        db.close()
+        logger.info(f"🔍 Réindexation complète de {total} véhicules")
+        result = indexing.reindex_all(
+            es, db, settings.ES_INDEX,
+            batch_size=batch_size, thread_count=thread_count, on_progress=on_progress,
+            redis=redis_client,
+        )
         
-        logger.info(f"✅ {notifications_sent} notifications envoyées")
+        if redis_client:
+            redis_client.hset(key, mapping={
+                'status': 'done',
+                'index': result['index'],
+                'indexed': result['indexed'],
+                'errors': result['errors'],
+                'finished_at': datetime.utcnow().isoformat(),
+            })
+            redis_client.expire(key, 86400 * 7)
+            bump_generation(redis_client)
         
-        return {'sent': notifications_sent}
+        logger.info(f"✅ Réindexation terminée: {result['indexed']} documents en {result['duration']:.1f}s "
+                    f"-> {result['index']}")
+        return result
         
     except Exception as e:
+        logger.error(f"❌ Erreur réindexation: {e}")
+        logger.error(traceback.format_exc())
+        if redis_client:
+            redis_client.hset(key, mapping={
+                'status': 'failed',
+                'error': str(e),
+                'finished_at': datetime.utcnow().isoformat(),
+            })
+        return {'error': str(e)}
+    finally:
+        db.close()
+        if redis_client:
+            redis_client.delete(indexing.REINDEX_LOCK_KEY)
+
+
+@app.task(name='app.tasks.send_alert_notifications')
+def send_alert_notifications():
+    """
+    Envoie les digests d'alertes (daily/weekly) aux utilisateurs.
+    Les correspondances sont calculées à l'ingestion par percolation
+    (app.services.alert_matching) ; les alertes "instant" sont déjà parties.
+    """
+    from app.services.alert_matching import send_digests
+
+    logger.info("📧 Envoi notifications alertes")
+    
+    db = SessionLocal()
+    try:
+        stats = send_digests(db, redis_client)
+        logger.info(f"✅ {stats['digests']} digests envoyés ({stats['alerts']} alertes)")
+        return {'sent': stats['digests'], 'alerts': stats['alerts']}
+        
+    except Exception as e:
+        db.rollback()
         logger.error(f"❌ Erreur notifications: {e}")
         return {'error': str(e)}
+    finally:
+        db.close()
 
 
 @app.task(name='app.tasks.generate_stats_report')
@@ -492,6 +539,39 @@ def health_check_scrapers():
     return health_report
 
 
+@app.task(name='app.tasks.check_proxies')
+def check_proxies():
+    """Test de santé des proxies (PROXY_LIST) : latence et taux de succès dans Redis"""
+    import asyncio
+    from scrapers.proxy_manager import ProxyManager
+
+    manager = ProxyManager()
+    if not manager.all_proxies:
+        return {'total': 0}
+
+    report = asyncio.run(manager.check_all())
+    stats = manager.get_stats()
+    logger.info(f"🩺 Proxies: {stats['working']}/{stats['total']} disponibles ({sum(report.values())}/{len(report)} tests OK)")
+    return stats
+
+
+@app.task(name='app.tasks.reconcile_unread_counters')
+def reconcile_unread_counters():
+    """Recale les compteurs Redis de messages non lus sur la base (dérive due aux courses)"""
+    from app.services.unread_counters import reconcile
+
+    db = SessionLocal()
+    try:
+        stats = reconcile(db, redis_client)
+        logger.info(f"📬 Compteurs non lus: {stats['fixed']}/{stats['users']} corrigés")
+        return stats
+    except Exception as e:
+        logger.error(f"❌ Erreur réconciliation compteurs non lus: {e}")
+        return {'error': str(e)}
+    finally:
+        db.close()
+
+
 # ============ TÂCHES DE TEST ============
 
 @app.task(name='app.tasks.test_task')
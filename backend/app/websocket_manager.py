@@ -1,68 +1,284 @@
 # backend/app/websocket_manager.py
+"""
+Hub WebSocket partagé par tous les processus API (workers uvicorn, nœuds).
+
+- Chaque processus (nœud) garde ses sockets locales et s'abonne à son propre
+  canal Redis ws:node:<node_id>.
+- Présence : ws:presence:<user_id> est un sorted set node_id -> échéance,
+  rafraîchi toutes les HEARTBEAT_INTERVAL secondes pour les utilisateurs
+  connectés au nœud. Un nœud arrêté brutalement disparaît après PRESENCE_TTL.
+- send_personal_message() livre aux sockets locales et publie le message sur
+  le canal des autres nœuds où l'utilisateur est présent.
+- Chaque socket a sa file d'envoi bornée et sa tâche d'écriture : un client
+  lent ne bloque ni l'appelant ni les autres. Une socket dont la file déborde
+  est fermée (le client se reconnecte).
+- Chaque socket appartient à un canal : "messages" (messagerie) ou
+  "notifications" (événements véhicules, socket authentifiée). Un envoi ne
+  vise que les sockets de son canal.
+
+Sans Redis, le hub fonctionne en mode local (un seul processus).
+"""
+import asyncio
+import json
 import logging
-from typing import Dict, List
+import os
+import socket
+import time
+import uuid
+from typing import Dict, List, Optional
+
 from fastapi import WebSocket
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+CHANNEL_PREFIX = "ws:node"
+PRESENCE_PREFIX = "ws:presence"
+HEARTBEAT_INTERVAL = 20
+PRESENCE_TTL = 60
+# Messages en attente par socket avant fermeture pour lenteur
+SEND_QUEUE_SIZE = 256
+SEND_TIMEOUT = 10
+
+# Canaux des sockets
+MESSAGES = "messages"
+NOTIFICATIONS = "notifications"
+
+
+class Connection:
+    """Socket locale avec sa file d'envoi et sa tâche d'écriture."""
+
+    def __init__(self, websocket: WebSocket, user_id: str, manager: "WebSocketManager", channel: str = MESSAGES):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.channel = channel
+        self.manager = manager
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.writer = asyncio.create_task(self._write_loop())
+
+    def send(self, message: dict) -> bool:
+        """Met le message en file ; False si la socket est trop lente (file pleine)."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write_loop(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                await asyncio.wait_for(self.websocket.send_json(message), timeout=SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erreur envoi message WS à {self.user_id}: {e}")
+            self.manager.disconnect(self.websocket, self.user_id)
+
+    async def close(self, code: int = 1013):
+        self.writer.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
 class WebSocketManager:
-    """Gestionnaire centralisé des connexions WebSocket"""
-    
-    def __init__(self):
-        # Dict[user_id, List[WebSocket]]
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-    
-    async def connect(self, websocket: WebSocket, user_id: str):
-        """Accepter une nouvelle connexion WebSocket"""
+    """Gestionnaire centralisé des connexions WebSocket (hub multi-nœuds)"""
+
+    def __init__(self, redis_url: str = settings.REDIS_URL):
+        # Dict[user_id, List[Connection]] : sockets de ce processus
+        self.connections: Dict[str, List[Connection]] = {}
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._redis = aioredis.from_url(redis_url, decode_responses=True) if REDIS_AVAILABLE else None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def active_connections(self) -> Dict[str, List[WebSocket]]:
+        """Sockets locales par utilisateur"""
+        return {user_id: [c.websocket for c in conns] for user_id, conns in self.connections.items()}
+
+    @property
+    def channel(self) -> str:
+        return f"{CHANNEL_PREFIX}:{self.node_id}"
+
+    # ----- Cycle de vie -----
+
+    async def start(self):
+        """Abonnement au canal du nœud et heartbeat de présence"""
+        if self._redis is None or self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._listen(), name="ws-hub-listen"),
+            asyncio.create_task(self._heartbeat(), name="ws-hub-heartbeat"),
+        ]
+        logger.info(f"🔌 Hub WebSocket démarré (nœud {self.node_id})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for user_id in self.connections:
+                    pipe.zrem(f"{PRESENCE_PREFIX}:{user_id}", self.node_id)
+                await pipe.execute()
+            except Exception as e:
+                logger.debug(f"Présence non nettoyée: {e}")
+            await self._redis.aclose()
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                async for item in pubsub.listen():
+                    try:
+                        payload = json.loads(item["data"])
+                        self.send_local(payload["message"], payload["user_id"], payload.get("channel", MESSAGES))
+                    except Exception as e:
+                        logger.warning(f"Message hub invalide: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Abonnement hub WebSocket perdu: {e}")
+                await asyncio.sleep(1)
+
+    async def _heartbeat(self):
+        while True:
+            await self._refresh_presence(list(self.connections))
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def _refresh_presence(self, user_ids: List[str]):
+        if self._redis is None or not user_ids:
+            return
+        expires_at = time.time() + PRESENCE_TTL
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for user_id in user_ids:
+                key = f"{PRESENCE_PREFIX}:{user_id}"
+                pipe.zadd(key, {self.node_id: expires_at})
+                pipe.expire(key, PRESENCE_TTL)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Présence non rafraîchie: {e}")
+
+    async def _nodes(self, user_id: str) -> List[str]:
+        """Nœuds où l'utilisateur a au moins une socket (présence non expirée)"""
+        if self._redis is None:
+            return []
+        try:
+            return await self._redis.zrangebyscore(f"{PRESENCE_PREFIX}:{user_id}", time.time(), "+inf")
+        except Exception as e:
+            logger.debug(f"Présence de {user_id} indisponible: {e}")
+            return []
+
+    # ----- Connexions -----
+
+    async def connect(self, websocket: WebSocket, user_id: str, channel: str = MESSAGES):
+        """Accepter une nouvelle connexion WebSocket sur un canal (messages ou notifications)"""
         await websocket.accept()
-        
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        
-        self.active_connections[user_id].append(websocket)
-        logger.info(f"WebSocket connecté: user {user_id} (total: {len(self.active_connections[user_id])})")
-    
+
+        if user_id not in self.connections:
+            self.connections[user_id] = []
+            await self._refresh_presence([user_id])
+
+        self.connections[user_id].append(Connection(websocket, user_id, self, channel))
+        logger.info(f"WebSocket connecté: user {user_id}, {channel} (total: {len(self.connections[user_id])})")
+
     def disconnect(self, websocket: WebSocket, user_id: str):
         """Supprimer une connexion WebSocket"""
-        if user_id in self.active_connections:
-            try:
-                self.active_connections[user_id].remove(websocket)
+        conns = self.connections.get(user_id, [])
+        for conn in conns:
+            if conn.websocket is websocket:
+                conns.remove(conn)
+                if conn.writer is not asyncio.current_task():
+                    conn.writer.cancel()
                 logger.info(f"WebSocket déconnecté: user {user_id}")
-                
-                # Nettoyer si plus de connexions
-                if not self.active_connections[user_id]:
-                    del self.active_connections[user_id]
-            except ValueError:
-                pass
-    
-    async def send_personal_message(self, message: dict, user_id: str):
-        """Envoyer un message à toutes les connexions d'un utilisateur"""
-        if user_id in self.active_connections:
-            disconnected = []
-            
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Erreur envoi message WS à {user_id}: {e}")
-                    disconnected.append(connection)
-            
-            # Nettoyer les connexions mortes
-            for conn in disconnected:
-                self.disconnect(conn, user_id)
-    
+                break
+
+        # Nettoyer si plus de connexions
+        if user_id in self.connections and not conns:
+            del self.connections[user_id]
+            if self._redis is not None:
+                asyncio.create_task(self._leave(user_id))
+
+    async def _leave(self, user_id: str):
+        try:
+            await self._redis.zrem(f"{PRESENCE_PREFIX}:{user_id}", self.node_id)
+        except Exception as e:
+            logger.debug(f"Présence de {user_id} non retirée: {e}")
+
+    # ----- Envoi -----
+
+    def _enqueue(self, conn: Connection, message: dict) -> bool:
+        if conn.send(message):
+            return True
+        # Client trop lent : fermé plutôt que de laisser la file grossir
+        logger.warning(f"⚠️ WebSocket lente fermée: user {conn.user_id}")
+        self.disconnect(conn.websocket, conn.user_id)
+        asyncio.create_task(conn.close())
+        return False
+
+    def _local(self, user_id: str, channel: Optional[str] = None) -> List[Connection]:
+        """Sockets de l'utilisateur sur ce processus (d'un canal, ou toutes)"""
+        conns = self.connections.get(user_id, [])
+        return [conn for conn in conns if channel is None or conn.channel == channel]
+
+    def send_local(self, message: dict, user_id: str, channel: str = MESSAGES) -> int:
+        """Met le message en file pour les sockets du canal sur ce processus ; retourne le nombre de sockets"""
+        return sum(self._enqueue(conn, message) for conn in self._local(user_id, channel))
+
+    def reply(self, websocket: WebSocket, user_id: str, message: dict) -> bool:
+        """Répond sur une socket précise (ex. pong), via sa file d'envoi"""
+        for conn in self.connections.get(user_id, []):
+            if conn.websocket is websocket:
+                return self._enqueue(conn, message)
+        return False
+
+    async def send_personal_message(self, message: dict, user_id: str, channel: str = MESSAGES):
+        """Envoyer un message aux connexions d'un utilisateur sur un canal, sur tous les nœuds"""
+        self.send_local(message, user_id, channel)
+        remote = [node for node in await self._nodes(user_id) if node != self.node_id]
+        if not remote:
+            return
+        payload = json.dumps({"user_id": user_id, "channel": channel, "message": message}, default=str)
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for node in remote:
+                pipe.publish(f"{CHANNEL_PREFIX}:{node}", payload)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Erreur publication message WS pour {user_id}: {e}")
+
     async def broadcast_to_users(self, message: dict, user_ids: List[str]):
         """Envoyer un message à plusieurs utilisateurs"""
-        for user_id in user_ids:
-            await self.send_personal_message(message, user_id)
-    
-    def is_user_connected(self, user_id: str) -> bool:
-        """Vérifier si un utilisateur a des connexions actives"""
-        return user_id in self.active_connections and len(self.active_connections[user_id]) > 0
-    
+        await asyncio.gather(*(self.send_personal_message(message, user_id) for user_id in user_ids))
+
+    def is_connected_locally(self, user_id: str, channel: Optional[str] = None) -> bool:
+        """L'utilisateur a une socket (du canal donné) sur ce processus"""
+        return bool(self._local(user_id, channel))
+
+    def local_users(self, channel: Optional[str] = None) -> List[str]:
+        """Utilisateurs ayant une socket (du canal donné) sur ce processus"""
+        return [user_id for user_id in list(self.connections) if self._local(user_id, channel)]
+
+    async def is_user_connected(self, user_id: str) -> bool:
+        """Vérifier si un utilisateur a des connexions actives (tous nœuds confondus)"""
+        return self.is_connected_locally(user_id) or bool(await self._nodes(user_id))
+
     def get_connection_count(self, user_id: str) -> int:
-        """Obtenir le nombre de connexions d'un utilisateur"""
-        return len(self.active_connections.get(user_id, []))
+        """Obtenir le nombre de connexions locales d'un utilisateur"""
+        return len(self.connections.get(user_id, []))
 
 # Instance globale
-ws_manager = WebSocketManager()
\ No newline at end of file
+ws_manager = WebSocketManager()
@@ -8,7 +8,8 @@ Ce worker :
 - normalise, déduplique et indexe les annonces dans Elasticsearch
 
 Usage :
-    python app/worker.py --run-worker       # boucle continue sur Redis
+    python app/worker.py --run-worker       # boucle continue sur Redis (par lots)
+    python app/worker.py --run-worker --batch-size 1   # une annonce à la fois
     python app/worker.py --test-single      # test rapide local
     python app/worker.py --process-file fichier.json
 """
@@ -19,8 +20,7 @@ import json
 import time
 import traceback
 from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
-from difflib import SequenceMatcher
+from typing import Dict, Any, Optional, Tuple, List
 from math import radians, cos, sin, asin, sqrt
 
 # === ENVIRONNEMENT ===
@@ -38,13 +38,15 @@ ELASTIC_HOST = settings.ELASTIC_HOST
 REDIS_URL = settings.REDIS_URL
 ES_INDEX = settings.ES_INDEX
 REDIS_QUEUE_KEY = settings.REDIS_QUEUE_KEY
+WORKER_BATCH_SIZE = settings.WORKER_BATCH_SIZE
 
 # === LIBS ===
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, select, func, cast, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert, JSONB
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, helpers
 import redis
 
 # === INITIALISATION DES CLIENTS ===
@@ -61,6 +63,14 @@ except Exception as e:
     print("⚠️ Impossible d'importer app.models.Vehicle :", e)
     Vehicle = None
 
+# === SERVICES ===
+# Indispensables au traitement (normalize, process_batch) : une erreur
+# d'import doit arrêter le worker plutôt que d'échouer à la première annonce
+from app.services import alert_matching, dedup
+from app.services.content_hash import ContentCache, content_hash, split_unchanged
+from app.services.indexing import mark_dirty, vehicle_document
+from app.services.search_cache import bump_generation
+
 # === FONCTIONS UTILES ===
 def haversine_km(lat1, lon1, lat2, lon2):
     lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
@@ -69,11 +79,6 @@ def haversine_km(lat1, lon1, lat2, lon2):
     a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
     return 6371 * 2 * asin(sqrt(a))
 
-def similar(a: str, b: str) -> float:
-    if not a or not b:
-        return 0.0
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-
 def parse_int(v):
     try:
         return int(str(v).replace(" ", "").replace(",", "").replace(".", ""))
@@ -83,9 +88,13 @@ def parse_int(v):
 # === NORMALISATION ===
 def normalize(raw: Dict[str, Any]) -> Dict[str, Any]:
     """Nettoie et formate une annonce pour ingestion."""
+    # Les scrapers envoient {"source_ids": {source: id}} plutôt que "source"
+    source_ids = raw.get("source_ids") if isinstance(raw.get("source_ids"), dict) else {}
+    source = raw.get("source") or next(iter(source_ids), None)
+
     n = {}
-    n["source"] = raw.get("source")
-    n["source_id"] = raw.get("id") or raw.get("source_id")
+    n["source"] = source
+    n["source_id"] = raw.get("source_id") or source_ids.get(source) or raw.get("id")
     n["title"] = (raw.get("title") or "").strip()
     n["make"] = raw.get("make") or raw.get("brand")
     n["model"] = raw.get("model")
@@ -96,77 +105,337 @@ def normalize(raw: Dict[str, Any]) -> Dict[str, Any]:
     n["lat"] = raw.get("lat")
     n["lon"] = raw.get("lon")
     n["images"] = raw.get("images") or []
+    n["fuel_type"] = raw.get("fuel_type")
+    n["transmission"] = raw.get("transmission")
+    n["location_city"] = raw.get("location_city") or raw.get("location")
+    n["url"] = raw.get("url")
+    n["content_hash"] = raw.get("content_hash") or content_hash({**n, "description": raw.get("description")})
     n["created_at"] = datetime.utcnow()
     n["id"] = f"{n['source']}::{n['source_id']}" if n["source"] and n["source_id"] else None
     return n
 
-# === DEDUPLICATION SIMPLE ===
-def find_duplicate(session, data: Dict[str, Any]) -> Optional[Any]:
-    """Recherche simple d’un doublon basé sur vin ou (make, model, year, prix proche)."""
-    vin = data.get("vin")
-    if vin:
-        existing = session.query(Vehicle).filter(Vehicle.vin == vin).first()
-        if existing:
-            return existing
+# === MAPPING VERS LA TABLE vehicles ===
+# Colonnes réellement présentes en base (cf. app.models.Vehicle)
+VEHICLE_COLUMNS = ("id", "title", "make", "model", "price", "mileage", "year", "vin", "fingerprint", "content_hash")
+# Colonnes reprises de la dernière version de l'annonce (les autres ne sont que complétées) ;
+# l'empreinte de doublon dépend du prix et doit suivre son changement
+REFRESHED_COLUMNS = ("price", "content_hash", "fingerprint")
+# Champs sans colonne dédiée, conservés dans le JSON source_ids
+EXTRA_FIELDS = ("lat", "lon", "images", "fuel_type", "transmission", "location_city", "url")
 
-    q = session.query(Vehicle).filter(
-        Vehicle.make == data.get("make"),
-        Vehicle.model == data.get("model"),
-        Vehicle.year == data.get("year")
-    ).all()
+def to_vehicle_row(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Projette une annonce normalisée sur les colonnes de la table vehicles."""
+    row = {key: data.get(key) for key in VEHICLE_COLUMNS}
+    row["fingerprint"] = dedup.compute_fingerprint(data)
+    source_ids = {}
+    if data.get("source"):
+        source_ids[data["source"]] = data.get("source_id")
+    for key in EXTRA_FIELDS:
+        if data.get(key) not in (None, "", []):
+            source_ids[key] = data[key]
+    row["source_ids"] = source_ids
+    row["created_at"] = data.get("created_at") or datetime.utcnow()
+    return row
 
-    for v in q:
-        if abs((v.price or 0) - (data.get("price") or 0)) < 1000:
-            return v
-    return None
+# === DEDUPLICATION ===
+def find_duplicate(session, data: Dict[str, Any]) -> Optional[Any]:
+    """Doublon basé sur le VIN ou l'empreinte indexée (voir app.services.dedup)."""
+    return dedup.find_duplicate(session, data)
 
 # === INGESTION ===
-def process_listing(raw: Dict[str, Any]):
+def process_listing(raw: Dict[str, Any]) -> str:
+    """Ingère une annonce ; retourne "inserted", "updated", "unchanged" ou "errors"."""
     session = SessionLocal()
+    outcome = None
     try:
         data = normalize(raw)
-        existing = find_duplicate(session, data)
+        row = to_vehicle_row(data)
+
+        price_changes = []
+        if data["id"]:
+            _, unchanged, price_changes = split_unchanged([row], known_states(session, [data["id"]]))
+            if unchanged:
+                print(f"⚪ Inchangée : {row['title']}")
+                return "unchanged"
+
+        # L'annonce elle-même d'abord : find_duplicate exclut son propre id
+        existing = session.get(Vehicle, data["id"]) if data["id"] else None
+        if existing is None:
+            existing = find_duplicate(session, data)
 
         if existing:
-            for key, val in data.items():
-                if val and getattr(existing, key, None) is None:
+            for key, val in row.items():
+                if key != "id" and val and (key in REFRESHED_COLUMNS or getattr(existing, key, None) is None):
                     setattr(existing, key, val)
             session.add(existing)
             obj = existing
             print(f"🟡 Mise à jour : {obj.title}")
         else:
-            obj = Vehicle(**data)
+            obj = Vehicle(**row)
             session.add(obj)
             print(f"🟢 Nouveau véhicule ajouté : {obj.title}")
 
         session.commit()
+        outcome = "updated" if existing else "inserted"
+        # Une réindexation en cours le reprendra après la bascule d'alias
+        mark_dirty(redis_client, [obj.id])
+        if data["id"]:
+            content_cache.store({data["id"]: (row["content_hash"], row["price"])})
+            # Événements adressés au véhicule (Favorite.vehicle_id), pas à l'annonce fusionnée
+            content_cache.emit_price_changes([(obj.id, old, new) for _, old, new in price_changes])
 
         # Indexation ES
         if es.ping():
-            es.index(index=ES_INDEX, id=obj.id, document={
-                "title": obj.title,
-                "make": obj.make,
-                "model": obj.model,
-                "price": obj.price,
-                "year": obj.year,
-                "mileage": obj.mileage,
-                "vin": obj.vin,
-                "images": obj.images,
-            })
+            document = vehicle_document({key: getattr(obj, key) for key in VEHICLE_COLUMNS + ("source_ids",)})
+            es.index(index=ES_INDEX, id=obj.id, document=document)
+            bump_generation(redis_client)
+            if not existing:
+                alert_matching.match_new_vehicles(es, redis_client, [{**document, "id": obj.id}])
         else:
             print("⚠️ Elasticsearch non joignable")
+        return outcome
 
     except SQLAlchemyError as e:
         session.rollback()
         print("Erreur SQL :", e)
+        return "errors"
     except Exception as e:
         print("Erreur générale :", e)
         traceback.print_exc()
+        # Écrite en base malgré l'erreur (indexation ES) : comptée comme écrite
+        return outcome or "errors"
     finally:
         session.close()
 
+# === INGESTION PAR LOTS ===
+# Retire atomiquement jusqu'à N éléments côté BRPOP (droite de la liste) :
+# LRANGE + LTRIM dans un seul script pour que deux workers ne récupèrent
+# jamais les mêmes annonces.
+DRAIN_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], -tonumber(ARGV[1]), -1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], 0, -#items - 1)
+end
+return items
+"""
+drain_script = redis_client.register_script(DRAIN_SCRIPT)
+
+# Dernière empreinte et dernier prix de chaque annonce (app.services.content_hash)
+content_cache = ContentCache(redis_client)
+
+def known_states(session, ids: List[str]) -> Dict[str, Tuple[str, Optional[int]]]:
+    """État (empreinte, prix) connu des annonces : cache Redis, sinon colonne content_hash."""
+    known = content_cache.lookup(ids)
+    missing = [id_ for id_ in ids if id_ not in known]
+    if missing:
+        rows = session.execute(
+            select(Vehicle.id, Vehicle.content_hash, Vehicle.price)
+            .where(Vehicle.id.in_(missing), Vehicle.content_hash.is_not(None))
+        )
+        known.update({id_: (digest, price) for id_, digest, price in rows})
+    return known
+
+def drain_queue(batch_size: int) -> List[str]:
+    """Récupère jusqu'à batch_size annonces, les plus anciennes en premier."""
+    if batch_size <= 0:
+        return []
+    items = drain_script(keys=[REDIS_QUEUE_KEY], args=[batch_size])
+    # LPUSH insère à gauche : la fin de la liste contient les plus anciennes
+    items.reverse()
+    return items
+
+def merge_rows(base: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Fusionne deux versions d'une même annonce, la plus récente l'emporte."""
+    for key, val in new.items():
+        if key == "source_ids":
+            base["source_ids"] = {**(base.get("source_ids") or {}), **(val or {})}
+        elif key != "id" and val is not None:
+            base[key] = val
+    return base
+
+def dedup_batch(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Dédoublonne un lot en mémoire (même id ou même VIN)."""
+    by_id: Dict[str, Dict[str, Any]] = {}
+    id_by_vin: Dict[str, str] = {}
+    for row in rows:
+        vin = row.get("vin")
+        if vin and vin in id_by_vin:
+            row["id"] = id_by_vin[vin]
+        if row["id"] in by_id:
+            merge_rows(by_id[row["id"]], row)
+        else:
+            by_id[row["id"]] = row
+        if vin:
+            id_by_vin.setdefault(vin, row["id"])
+    return list(by_id.values())
+
+def resolve_existing(session, rows: List[Dict[str, Any]]):
+    """Rattache les nouvelles annonces à un véhicule existant s'il s'agit d'un doublon."""
+    ids = [row["id"] for row in rows]
+    known = set(session.execute(select(Vehicle.id).where(Vehicle.id.in_(ids))).scalars())
+    for row in rows:
+        if row["id"] in known:
+            continue
+        existing = find_duplicate(session, row)
+        if existing:
+            row["id"] = existing.id
+
+def upsert_vehicles(session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    INSERT ... ON CONFLICT (id) DO UPDATE pour tout le lot.
+
+    Comme process_listing, les valeurs déjà en base sont conservées et seules
+    les colonnes vides sont complétées, sauf REFRESHED_COLUMNS (prix, empreinte)
+    qui prennent la nouvelle valeur ; source_ids est fusionné.
+    """
+    table = Vehicle.__table__
+    stmt = pg_insert(table).values(rows)
+    excluded = stmt.excluded
+    updates = {
+        col: func.coalesce(excluded[col], table.c[col]) if col in REFRESHED_COLUMNS
+        else func.coalesce(table.c[col], excluded[col])
+        for col in VEHICLE_COLUMNS if col != "id"
+    }
+    updates["source_ids"] = cast(
+        cast(excluded.source_ids, JSONB).op("||")(
+            func.coalesce(cast(table.c.source_ids, JSONB), literal_column("'{}'::jsonb"))
+        ),
+        table.c.source_ids.type,
+    )
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.id], set_=updates)
+    # xmax = 0 uniquement pour les lignes réellement insérées
+    stmt = stmt.returning(*table.c, literal_column("(xmax = 0)").label("inserted"))
+    return [dict(r) for r in session.execute(stmt).mappings()]
+
+def bulk_index(vehicles: List[Dict[str, Any]]) -> int:
+    """Indexe un lot de véhicules via l'API _bulk d'Elasticsearch."""
+    actions = (
+        {"_index": ES_INDEX, "_id": v["id"], "_source": vehicle_document(v)}
+        for v in vehicles
+    )
+    indexed, errors = helpers.bulk(es, actions, raise_on_error=False, request_timeout=60)
+    if errors:
+        print(f"⚠️ {len(errors)} erreurs d'indexation ES (bulk)")
+    return indexed
+
+def process_batch(items: List[str]) -> Dict[str, int]:
+    """Ingestion d'un lot : une transaction Postgres et une requête _bulk ES."""
+    stats = {"received": len(items), "inserted": 0, "updated": 0, "unchanged": 0, "errors": 0}
+
+    rows = []
+    for item in items:
+        try:
+            data = normalize(json.loads(item))
+        except Exception:
+            print("❌ Erreur JSON :", item)
+            stats["errors"] += 1
+            continue
+        if not data["id"]:
+            stats["errors"] += 1
+            continue
+        rows.append(to_vehicle_row(data))
+
+    rows = dedup_batch(rows)
+    if not rows:
+        return stats
+
+    session = SessionLocal()
+    try:
+        # Annonces identiques à leur dernière version : ni Postgres ni ES
+        rows, unchanged, price_changes = split_unchanged(rows, known_states(session, [row["id"] for row in rows]))
+        stats["unchanged"] = len(unchanged)
+        if not rows:
+            session.rollback()
+            print(f"📦 Lot traité : {stats['received']} reçues, toutes inchangées")
+            return stats
+        # Identifiants propres des annonces, avant rattachement à un doublon
+        states = {row["id"]: (row["content_hash"], row["price"]) for row in rows}
+
+        resolve_existing(session, rows)
+        # Annonce -> véhicule auquel elle a été rattachée (même id sans doublon)
+        vehicle_ids = {listing_id: row["id"] for listing_id, row in zip(states, rows)}
+        # Deux annonces du lot peuvent pointer vers le même véhicule existant
+        rows = dedup_batch(rows)
+        saved = upsert_vehicles(session, rows)
+        session.commit()
+    except SQLAlchemyError as e:
+        session.rollback()
+        print(f"Erreur SQL sur le lot ({len(rows)} annonces), repli unitaire :", e)
+        # Tout le lot repasse par process_listing : compteurs repris de zéro
+        stats.update(unchanged=0, errors=0)
+        for item in items:
+            try:
+                stats[process_listing(json.loads(item))] += 1
+            except Exception:
+                stats["errors"] += 1
+        print(f"📦 Lot traité (unitaire) : {stats['received']} reçues, {stats['inserted']} nouvelles, "
+              f"{stats['updated']} mises à jour, {stats['unchanged']} inchangées, {stats['errors']} erreurs")
+        return stats
+    finally:
+        session.close()
+
+    stats["inserted"] = sum(1 for v in saved if v["inserted"])
+    stats["updated"] = len(saved) - stats["inserted"]
+    # Le cache reste indexé par annonce (lookup par "source::id"), les événements par véhicule
+    content_cache.store(states)
+    price_changes = [(vehicle_ids.get(listing_id, listing_id), old, new) for listing_id, old, new in price_changes]
+    if content_cache.emit_price_changes(price_changes):
+        print(f"💶 {len(price_changes)} changements de prix publiés")
+
+    try:
+        bulk_index(saved)
+    except Exception as e:
+        print("⚠️ Indexation ES du lot impossible :", e)
+    # Une réindexation en cours les reprendra après la bascule d'alias
+    mark_dirty(redis_client, [v["id"] for v in saved])
+
+    # Alertes : les nouvelles annonces du lot percolées en une requête
+    new_vehicles = [{**vehicle_document(v), "id": v["id"]} for v in saved if v["inserted"]]
+    if new_vehicles:
+        alerts = alert_matching.match_new_vehicles(es, redis_client, new_vehicles)
+        if alerts["instant"] or alerts["pending"]:
+            print(f"🔔 Alertes : {alerts['instant']} instantanées, {alerts['pending']} en attente de digest")
+
+    # Les résultats de recherche en cache ne reflètent plus l'index
+    if saved:
+        bump_generation(redis_client)
+
+    print(f"📦 Lot traité : {stats['received']} reçues, {stats['inserted']} nouvelles, "
+          f"{stats['updated']} mises à jour, {stats['unchanged']} inchangées, {stats['errors']} erreurs")
+    return stats
+
 # === REDIS WORKER LOOP ===
-def run_worker():
+def run_batch_worker(batch_size: int):
+    """Boucle par lots : vide jusqu'à batch_size annonces par cycle."""
+    print(f"🚀 Worker connecté à Redis: {REDIS_URL}")
+    print(f"📦 Écoute la file : {REDIS_QUEUE_KEY} (lots de {batch_size})")
+    while True:
+        items = []
+        try:
+            items = drain_queue(batch_size)
+            if not items:
+                # File vide : attente bloquante plutôt que du polling
+                item = redis_client.brpop(REDIS_QUEUE_KEY, timeout=5)
+                if not item:
+                    continue
+                items = [item[1]] + drain_queue(batch_size - 1)
+            process_batch(items)
+        except KeyboardInterrupt:
+            print("🛑 Arrêt du worker.")
+            break
+        except redis.RedisError as e:
+            print("❌ Erreur Redis :", e)
+            time.sleep(1)
+        except Exception as e:
+            # Le lot est déjà retiré de la file : on le journalise et on continue
+            print(f"❌ Erreur sur un lot de {len(items)} annonces :", e)
+            traceback.print_exc()
+
+def run_worker(batch_size: int = 1):
+    if batch_size > 1:
+        run_batch_worker(batch_size)
+        return
+
     print(f"🚀 Worker connecté à Redis: {REDIS_URL}")
     print(f"📦 Écoute la file : {REDIS_QUEUE_KEY}")
     while True:
@@ -192,15 +461,30 @@ if __name__ == "__main__":
     parser.add_argument("--run-worker", action="store_true", help="Lancer le worker Redis")
     parser.add_argument("--process-file", type=str, help="Traiter un fichier JSON local")
     parser.add_argument("--test-single", action="store_true", help="Tester avec une annonce factice")
+    parser.add_argument("--batch-size", type=int, default=WORKER_BATCH_SIZE,
+                        help="Nombre d'annonces par lot (1 = traitement unitaire)")
+    parser.add_argument("--backfill-fingerprints", action="store_true",
+                        help="Calculer l'empreinte de déduplication des véhicules existants")
     args = parser.parse_args()
 
-    if args.run_worker:
-        run_worker()
+    if args.backfill_fingerprints:
+        session = SessionLocal()
+        try:
+            count = dedup.backfill_fingerprints(session)
+            print(f"✅ {count} empreintes calculées")
+        finally:
+            session.close()
+    elif args.run_worker:
+        run_worker(batch_size=args.batch_size)
     elif args.process_file:
         with open(args.process_file, "r", encoding="utf-8") as f:
             data = json.load(f)
-        for d in data:
-            process_listing(d)
+        if args.batch_size > 1:
+            for start in range(0, len(data), args.batch_size):
+                process_batch([json.dumps(d) for d in data[start:start + args.batch_size]])
+        else:
+            for d in data:
+                process_listing(d)
     elif args.test_single:
         sample = {
             "source": "leboncoin",
@@ -1,10 +1,63 @@
-from typing import List, Dict, Any, Optional
+from collections import deque
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import logging
+import os
 import re
-from .base_scraper import BaseScraper
+from .base_scraper import BaseScraper, LISTING_TIMEOUT, NAVIGATION_TIMEOUT
+from .incremental import IncrementalState
+from .rate_limit import BLOCK_STATUSES, rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Onglets chargés en parallèle (1 = une page après l'autre)
+CONCURRENCY = int(os.getenv("AUTOSCOUT24_CONCURRENCY", "4"))
+# Changements de proxy tentés quand la première page est bloquée
+PROXY_ROTATIONS = 2
+
+# Champs bruts d'une carte d'annonce, extraits dans le navigateur (même logique
+# de sélecteurs que l'ancien parse_listing élément par élément)
+CARD_FN = """
+(el) => {
+    const link = el.tagName === 'A' ? el : (el.querySelector('a[href*="/offres/"]') || el.querySelector('a'));
+    let title = null;
+    for (const s of ['h2', 'h3', '[data-testid*="title"]', '[class*="title"]', '[class*="Title"]', 'a']) {
+        const t = el.querySelector(s);
+        if (t) {
+            title = t.innerText.trim();
+            if (title && title.length > 3) break;
+        }
+    }
+    const images = Array.from(el.querySelectorAll('img')).slice(0, 3).map(img =>
+        img.getAttribute('src') || img.getAttribute('data-src') || img.getAttribute('data-lazy-src') ||
+        img.getAttribute('data-original') || img.getAttribute('data-lazy') ||
+        (img.getAttribute('srcset') || '').split(',')[0].trim().split(/\\s+/)[0] || null
+    );
+    return {
+        href: link ? link.getAttribute('href') : null,
+        link_title: link ? (link.getAttribute('title') || link.getAttribute('aria-label')) : null,
+        title: title,
+        text: el.innerText || '',
+        images: images,
+    };
+}
+"""
+
+# Toutes les cartes de la page en un seul aller-retour Playwright : premier
+# sélecteur qui donne des annonces, puis extraction de chaque carte
+PAGE_SCRIPT = """
+(selectors) => {
+    const extract = """ + CARD_FN + """;
+    for (const selector of selectors) {
+        let cards = Array.from(document.querySelectorAll(selector));
+        if (selector === 'article') {
+            cards = cards.filter(el => el.querySelector('a[href*="/annonces/"]'));
+        }
+        if (cards.length) return {selector: selector, cards: cards.map(extract)};
+    }
+    return {selector: null, cards: []};
+}
+"""
+
 class AutoScout24Scraper(BaseScraper):
     """Scraper pour AutoScout24 avec extraction complète des données"""
 
@@ -25,59 +78,184 @@ class AutoScout24Scraper(BaseScraper):
             - max_year: int (optionnel)
             - max_price: int (optionnel)
             - fuel_type: str (optionnel: 'B' benzine, 'D' diesel, 'E' électrique)
+            - concurrency: int (optionnel, défaut: AUTOSCOUT24_CONCURRENCY)
+            - incremental: bool (optionnel, True = annonces déjà vues ignorées)
         """
-        max_pages = search_params.get('max_pages', 20)
         results = []
+        for page_results in self.iter_pages(search_params):
+            results.extend(page_results)
+        return results
+
+    def iter_pages(self, search_params: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Génère les annonces page par page ; le navigateur est fermé à la fin du générateur.
+
+        Avec concurrency > 1, les pages suivantes sont chargées dans plusieurs
+        onglets à la fois et rendues dans l'ordre des pages (arrêt à la
+        première page vide). Chaque navigation passe par le limiteur de débit
+        du domaine : la concurrence ne dépasse pas le plafond de requêtes.
+        """
+        max_pages = search_params.get('max_pages', 20)
+        concurrency = max(1, int(search_params.get('concurrency') or CONCURRENCY))
+        incremental = IncrementalState(self.get_source_name(), search_params) if search_params.get('incremental') else None
+        total = 0
 
         try:
             self.init_browser(headless=True)
-            logger.info(f"🔵 AutoScout24: Scraping {max_pages} pages")
+            logger.info(f"🔵 AutoScout24: Scraping {max_pages} pages ({concurrency} onglets)")
 
             # Construire l'URL de recherche
             base_search_url = self._build_search_url(search_params)
 
             # Navigation initiale
             logger.info(f"🔗 URL: {base_search_url}")
-            self.page.goto(base_search_url, wait_until='domcontentloaded', timeout=300000)
-            self.random_delay(3, 5)
-
-            # Gérer les cookies si présents
-            self._handle_cookie_banner()
-
-            for page_num in range(max_pages):
-                logger.info(f"📄 Page {page_num + 1}/{max_pages}")
+            self._open_search(base_search_url)
+            self.warm_up_delay()
 
-                if page_num > 0:
-                    # Naviguer vers la page suivante
-                    page_url = f"{base_search_url}&page={page_num + 1}"
-                    self.page.goto(page_url, wait_until='domcontentloaded', timeout=300000)
-                    # Petit délai pour laisser charger
-                    self.random_delay(1, 2)
-                else:
-                    # Première page, délai très court
-                    self.random_delay(0.5, 1)
+            # Gérer les cookies si présents (partagés par les onglets du contexte,
+            # déjà acceptés quand la session est reprise)
+            if not self.session_restored:
+                self._handle_cookie_banner()
 
-                # Attendre les résultats
-                page_results = self._scrape_page()
+            if concurrency > 1:
+                pages = self._iter_pages_concurrent(base_search_url, max_pages, concurrency)
+            else:
+                pages = self._iter_pages_sequential(base_search_url, max_pages)
 
+            for page_num, page_results in pages:
                 if not page_results:
-                    logger.warning(f"⚠️ Aucun résultat page {page_num + 1}, arrêt")
+                    logger.warning(f"⚠️ Aucun résultat page {page_num}, arrêt")
                     break
 
-                results.extend(page_results)
-                logger.info(f"✅ Page {page_num + 1}: {len(page_results)} annonces")
+                logger.info(f"✅ Page {page_num}: {len(page_results)} annonces")
+                if incremental:
+                    # Tri par pertinence : pas de territoire connu, filtrage seul
+                    page_results, _ = incremental.filter_page(page_results)
+                if page_results:
+                    total += len(page_results)
+                    yield page_results
 
-                # Délai entre pages
-                self.random_delay(2, 4)
-
-            logger.info(f"🎉 AutoScout24 terminé: {len(results)} annonces récupérées")
+            if incremental:
+                incremental.commit()
+            logger.info(f"🎉 AutoScout24 terminé: {total} annonces récupérées")
 
         except Exception as e:
             logger.exception(f"❌ Erreur AutoScout24: {e}")
         finally:
             self.close_browser()
 
-        return results
+    def _open_search(self, url: str):
+        """
+        Première page de résultats. Si le proxy est bloqué, le contexte passe
+        sur un autre proxy (même navigateur) avant de réessayer.
+        """
+        for attempt in range(PROXY_ROTATIONS + 1):
+            rate_limiter.wait(url)
+            response = self.page.goto(url, wait_until='domcontentloaded', timeout=NAVIGATION_TIMEOUT)
+            try:
+                self._check_response(url, response)
+                return
+            except RuntimeError:
+                if attempt == PROXY_ROTATIONS or not (self.use_proxy and self.proxy_manager):
+                    raise
+                logger.warning(f"⚠️ Proxy {self.current_proxy} bloqué, changement de contexte")
+                self.rotate_context()
+
+    def _check_response(self, url: str, response):
+        """Statut de la navigation remonté au limiteur ; un blocage (403, 429) lève une erreur."""
+        status = response.status if response is not None else None
+        rate_limiter.report_status(url, status)
+        if status in BLOCK_STATUSES:
+            self.mark_proxy_blocked()
+            raise RuntimeError(f"Bloqué par AutoScout24 (HTTP {status})")
+
+    def _page_url(self, base_search_url: str, page_num: int) -> str:
+        return base_search_url if page_num == 1 else f"{base_search_url}&page={page_num}"
+
+    def _iter_pages_sequential(self, base_search_url: str, max_pages: int) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """Une page après l'autre dans l'onglet principal (page 1 déjà chargée)."""
+        for page_num in range(1, max_pages + 1):
+            logger.info(f"📄 Page {page_num}/{max_pages}")
+
+            if page_num > 1:
+                # Délai entre pages puis navigation vers la page suivante
+                self.random_delay(2, 4)
+                page_url = self._page_url(base_search_url, page_num)
+                rate_limiter.wait(page_url)
+                # Le rendu des annonces est attendu par _scrape_page (sélecteur ciblé)
+                response = self.page.goto(page_url, wait_until='commit', timeout=NAVIGATION_TIMEOUT)
+                self._check_response(page_url, response)
+            else:
+                # Première page, délai très court
+                self.random_delay(0.5, 1)
+
+            page_results = self._scrape_page()
+            yield page_num, page_results
+            if not page_results:
+                return
+
+    def _iter_pages_concurrent(self, base_search_url: str, max_pages: int,
+                               concurrency: int) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Fenêtre glissante de `concurrency` onglets : chaque onglet lance sa
+        navigation sans attendre le rendu (wait_until='commit'), le navigateur
+        charge les pages en parallèle et elles sont lues dans l'ordre. L'onglet
+        lu repart aussitôt sur la page suivante non encore demandée.
+        """
+        logger.info(f"📄 Page 1/{max_pages}")
+        page_results = self._scrape_page()
+        yield 1, page_results
+        if not page_results or max_pages <= 1:
+            return
+
+        tabs = [self.page] + [self.new_page() for _ in range(min(concurrency, max_pages - 1) - 1)]
+        in_flight = deque()
+        next_page = 2
+
+        def dispatch(tab):
+            nonlocal next_page
+            page_num = next_page
+            next_page += 1
+            page_url = self._page_url(base_search_url, page_num)
+            error = None
+            try:
+                rate_limiter.wait(page_url)
+                response = tab.goto(page_url, wait_until='commit', timeout=NAVIGATION_TIMEOUT)
+                self._check_response(page_url, response)
+            except Exception as e:
+                error = e
+            in_flight.append((tab, page_num, error))
+
+        for tab in tabs:
+            if next_page <= max_pages:
+                dispatch(tab)
+
+        while in_flight:
+            tab, page_num, error = in_flight.popleft()
+            logger.info(f"📄 Page {page_num}/{max_pages}")
+            page_results = self._load_results(tab, base_search_url, page_num, error)
+            yield page_num, page_results
+            if not page_results:
+                # Les pages suivantes déjà demandées sont ignorées
+                return
+            if next_page <= max_pages:
+                dispatch(tab)
+
+    def _load_results(self, tab, base_search_url: str, page_num: int,
+                      error: Optional[Exception]) -> List[Dict[str, Any]]:
+        """Parse la page d'un onglet ; une navigation en échec est retentée une fois."""
+        if error is not None:
+            logger.warning(f"⚠️ Page {page_num}: {error}, nouvel essai")
+            page_url = self._page_url(base_search_url, page_num)
+            try:
+                rate_limiter.wait(page_url)
+                response = tab.goto(page_url, wait_until='commit', timeout=NAVIGATION_TIMEOUT)
+                self._check_response(page_url, response)
+            except Exception as e:
+                logger.error(f"❌ Page {page_num} inaccessible: {e}")
+                return []
+
+        return self._scrape_page(tab)
 
     def _build_search_url(self, params: Dict[str, Any]) -> str:
         """Construit l'URL de recherche avec filtres"""
@@ -140,8 +318,9 @@ class AutoScout24Scraper(BaseScraper):
         except Exception as e:
             logger.debug(f"Pas de banner cookies ou erreur: {e}")
 
-    def _scrape_page(self) -> List[Dict[str, Any]]:
-        """Scrape une page de résultats"""
+    def _scrape_page(self, page=None) -> List[Dict[str, Any]]:
+        """Scrape une page de résultats (onglet principal par défaut)"""
+        page = page or self.page
         results = []
 
         try:
@@ -155,33 +334,26 @@ class AutoScout24Scraper(BaseScraper):
                 'div[class*="ListItem"]'  # Contient ListItem dans la classe
             ]
 
-            listings = []
-            for selector in selectors:
-                try:
-                    self.page.wait_for_selector(selector, timeout=10000)
-                    elements = self.page.query_selector_all(selector)
-
-                    # Filtrer pour ne garder que les éléments pertinents
-                    if selector == 'article':
-                        # Pour le sélecteur générique, vérifier qu'il y a un lien d'annonce
-                        listings = [el for el in elements if el.query_selector('a[href*="/annonces/"]')]
-                    else:
-                        listings = elements
-
-                    if listings and len(listings) > 0:
-                        logger.info(f"✅ Trouvé {len(listings)} annonces avec sélecteur: {selector}")
-                        break
-                except Exception as e:
-                    logger.debug(f"Sélecteur '{selector}' non trouvé: {e}")
-                    continue
+            # Une seule attente sur l'union des sélecteurs (au lieu de 10 s par
+            # sélecteur absent)
+            try:
+                page.wait_for_selector(', '.join(selectors), state='attached', timeout=LISTING_TIMEOUT)
+            except Exception as e:
+                logger.debug(f"Annonces non rendues: {e}")
+                return results
 
-            if not listings or len(listings) == 0:
+            # Extraction groupée : un seul page.evaluate pour toutes les cartes,
+            # Python ne fait que normaliser
+            extracted = page.evaluate(PAGE_SCRIPT, selectors)
+            listings = extracted['cards']
+            if not listings:
                 logger.warning("⚠️ Aucune annonce trouvée avec tous les sélecteurs")
                 return results
+            logger.info(f"✅ Trouvé {len(listings)} annonces avec sélecteur: {extracted['selector']}")
 
-            for idx, listing in enumerate(listings):
+            for idx, card in enumerate(listings):
                 try:
-                    parsed = self.parse_listing(listing)
+                    parsed = self.parse_card(card)
                     if parsed:
                         normalized = self.normalize_data(parsed)
                         results.append(normalized)
@@ -199,26 +371,17 @@ class AutoScout24Scraper(BaseScraper):
         return results
 
     def parse_listing(self, element) -> Optional[Dict[str, Any]]:
-        """Parse une annonce AutoScout24 avec extraction générique et robuste"""
+        """Parse une annonce AutoScout24 à partir de son élément (un seul appel Playwright)"""
         try:
-            # Trouver le lien principal (plusieurs méthodes)
-            link = None
-            # Vérifier si l'élément lui-même est un lien <a>
-            try:
-                tag_name = element.evaluate('el => el.tagName.toLowerCase()')
-                if tag_name == 'a':
-                    link = element
-            except:
-                pass
-
-            # Si pas un lien, chercher un lien dans l'élément
-            if not link:
-                link = element.query_selector('a[href*="/offres/"]') or element.query_selector('a')
-
-            if not link:
-                return None
+            return self.parse_card(element.evaluate(CARD_FN))
+        except Exception as e:
+            logger.warning(f"Erreur parse listing: {e}")
+            return None
 
-            url = link.get_attribute('href')
+    def parse_card(self, card: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Normalise les champs bruts d'une carte (extraits par CARD_FN)"""
+        try:
+            url = card.get('href')
             if not url:
                 logger.debug("Pas d'attribut href sur le lien")
                 return None
@@ -241,25 +404,13 @@ class AutoScout24Scraper(BaseScraper):
             # Extraire l'ID depuis l'URL
             source_id = url.split('/')[-1] if '/' in url else 'unknown'
 
-            # Extraction GÉNÉRIQUE du texte complet de l'élément
-            try:
-                full_text = element.inner_text()
-            except:
-                full_text = ""
-
-            # Titre - essayer plusieurs sélecteurs puis fallback sur premier h2/h3
-            title = None
-            title_selectors = ['h2', 'h3', '[data-testid*="title"]', '[class*="title"]', '[class*="Title"]', 'a']
-            for selector in title_selectors:
-                title_elem = element.query_selector(selector)
-                if title_elem:
-                    title = title_elem.inner_text().strip()
-                    if title and len(title) > 3:  # Au moins 3 caractères
-                        break
+            # Texte complet de la carte et titre (premier h2/h3/titre de plus de 3 caractères)
+            full_text = card.get('text') or ""
+            title = card.get('title')
 
             # Si pas de titre, essayer d'extraire de l'attribut du lien
-            if not title and link:
-                title = link.get_attribute('title') or link.get_attribute('aria-label')
+            if not title:
+                title = card.get('link_title')
 
             # Prix - chercher pattern de prix dans le texte
             price = None
@@ -308,24 +459,7 @@ class AutoScout24Scraper(BaseScraper):
 
             # Image - chercher toutes les images
             images = []
-            img_elems = element.query_selector_all('img')
-            for img_elem in img_elems[:3]:  # Max 3 images par annonce
-                # Essayer plusieurs attributs
-                img_src = (
-                    img_elem.get_attribute('src') or
-                    img_elem.get_attribute('data-src') or
-                    img_elem.get_attribute('data-lazy-src') or
-                    img_elem.get_attribute('data-original') or
-                    img_elem.get_attribute('data-lazy')
-                )
-
-                # Aussi vérifier srcset pour lazy loading
-                if not img_src:
-                    srcset = img_elem.get_attribute('srcset')
-                    if srcset:
-                        # Prendre la première URL du srcset
-                        img_src = srcset.split(',')[0].split()[0]
-
+            for img_src in card.get('images') or []:  # Max 3 images par annonce
                 if img_src and not img_src.endswith('.svg') and 'placeholder' not in img_src.lower() and len(img_src) > 10:
                     # Rendre l'URL absolue si nécessaire
                     if img_src.startswith('//'):
@@ -1,6 +1,7 @@
 # backend/scrapers/base_scraper.py - VERSION PRODUCTION ANTI-DÉTECTION AVANCÉE
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
+from urllib.parse import urlparse, urlsplit
 import random
 import time
 import logging
@@ -10,6 +11,15 @@ import re
 
 logger = logging.getLogger(__name__)
 
+try:
+    from .browser_pool import browser_pool, POOL_ENABLED
+    from .sessions import session_store
+except ImportError:
+    from scrapers.browser_pool import browser_pool, POOL_ENABLED
+    from scrapers.sessions import session_store
+
+from app.services.content_hash import content_hash
+
 # Gestion optionnelle de Playwright
 try:
     from playwright.sync_api import sync_playwright, Browser, Page
@@ -34,19 +44,64 @@ except ImportError:
     FAKE_UA_AVAILABLE = False
     logger.warning("⚠️ fake_useragent non disponible. Installez avec: pip install fake-useragent")
 
+# Chargement allégé : les pages de résultats ne sont lues que pour leur texte et
+# les URLs d'images, les requêtes de ces types sont annulées
+BLOCK_RESOURCES = os.getenv("SCRAPER_BLOCK_RESOURCES", "true").lower() in ("1", "true", "yes")
+BLOCKED_RESOURCE_TYPES = frozenset(
+    t.strip() for t in os.getenv("SCRAPER_BLOCKED_RESOURCE_TYPES", "image,media,font").split(",") if t.strip()
+)
+# Mesure d'audience, publicité, replay de session (sous-domaines compris)
+TRACKER_DOMAINS = frozenset([
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net',
+    'googlesyndication.com', 'googleadservices.com', 'adservice.google.com',
+    'facebook.net', 'connect.facebook.net', 'hotjar.com', 'criteo.com',
+    'criteo.net', 'taboola.com', 'outbrain.com', 'adnxs.com', 'amazon-adsystem.com',
+    'scorecardresearch.com', 'quantserve.com', 'bat.bing.com', 'clarity.ms',
+    'tiktok.com', 'snapchat.com', 'pinterest.com', 'smartadserver.com',
+    'rubiconproject.com', 'pubmatic.com', 'casalemedia.com', 'teads.tv',
+    'xiti.com', 'atinternet.com', 'mediarithmics.com', 'adsrvr.org',
+] + [d.strip() for d in os.getenv("SCRAPER_BLOCKED_DOMAINS", "").split(",") if d.strip()])
+
+# Délais Playwright (ms)
+NAVIGATION_TIMEOUT = int(os.getenv("SCRAPER_NAVIGATION_TIMEOUT", "60")) * 1000
+LISTING_TIMEOUT = 15000
+
+
+def is_tracker(host: str) -> bool:
+    """Hôte appartenant à un domaine de TRACKER_DOMAINS (test par suffixes)"""
+    labels = host.split('.')
+    return any('.'.join(labels[i:]) in TRACKER_DOMAINS for i in range(len(labels) - 1))
+
+
 class BaseScraper(ABC):
     """
     Classe abstraite pour tous les scrapers
     Anti-détection avancé : proxies, fingerprinting, comportement humain
     """
+
+    # Sous-chaînes d'URL jamais bloquées (anti-bot, images nécessaires, etc.)
+    RESOURCE_ALLOWLIST: tuple = ()
     
     def __init__(self, use_proxy: bool = False, proxy_manager=None):
         self.use_proxy = use_proxy
         self.proxy_manager = proxy_manager
         self.current_proxy = None
+        # Proxy bloqué pendant ce job (signalé au ProxyManager à la fermeture)
+        self._proxy_blocked = False
+        # Proxy passé au lancement du navigateur (hors pool)
+        self._launch_proxy = None
+        # Contexte repris d'une session enregistrée (cookies déjà acceptés)
+        self.session_restored = False
+        self._user_agent = None
+        # Requêtes annulées / laissées passer par le filtre de ressources
+        self.resource_stats = {'blocked': 0, 'allowed': 0}
         self.browser: Optional[Browser] = None
+        self.context = None
         self.page: Optional[Page] = None
         self.playwright = None
+        # Navigateur emprunté au pool (None si lancé pour ce seul job)
+        self._pooled = None
+        self._stealth_mode = True
         
         # User agents par défaut
         self.fallback_ua = [
@@ -103,8 +158,6 @@ class BaseScraper(ABC):
                 proxy = proxy or self.proxy_manager.get_proxy()
                 self.current_proxy = proxy
 
-            self.playwright = sync_playwright().start()
-
             # Arguments Chrome pour anti-détection (set stable pour éviter crashes)
             chrome_args = [
                 '--disable-blink-features=AutomationControlled',
@@ -129,131 +182,290 @@ class BaseScraper(ABC):
                 'chromium_sandbox': False,
             }
 
-            # Ajouter proxy si configuré
-            if proxy:
+            # Ajouter proxy si configuré (au niveau du contexte avec le pool,
+            # pour que tous les jobs partagent le même navigateur)
+            if proxy and not POOL_ENABLED:
                 launch_options['proxy'] = {
                     'server': proxy
                 }
+                self._launch_proxy = proxy
 
-            self.browser = self.playwright.chromium.launch(**launch_options)
-
-            # Context avec anti-fingerprinting et headers réalistes
-            context_options = {
-                'user_agent': self.get_random_user_agent(),
-                'viewport': {'width': 1920, 'height': 1080},
-                'locale': 'fr-FR',
-                'timezone_id': 'Europe/Paris',
-                'permissions': ['geolocation'],
-                'geolocation': {'latitude': 48.8566, 'longitude': 2.3522},  # Paris
-                'ignore_https_errors': True,  # Ignore SSL certificate errors
-                'extra_http_headers': {
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                    'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'DNT': '1',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                    'Sec-Fetch-Dest': 'document',
-                    'Sec-Fetch-Mode': 'navigate',
-                    'Sec-Fetch-Site': 'none',
-                    'Sec-Fetch-User': '?1',
-                    'Cache-Control': 'max-age=0',
-                }
-            }
-
+            if POOL_ENABLED:
+                # Navigateur déjà démarré : seul le contexte est propre à ce job
+                self._pooled = browser_pool.acquire(launch_options)
+                self.browser = self._pooled.browser
+            else:
+                self.playwright = sync_playwright().start()
+                self.browser = self.playwright.chromium.launch(**launch_options)
 
-            context = self.browser.new_context(**context_options)
-
-            # Injecter scripts anti-détection AVANCÉS
-            context.add_init_script("""
-                // Masquer webdriver
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-
-                // Faux plugins
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [
-                        {
-                            0: {type: "application/x-google-chrome-pdf", suffixes: "pdf", description: "Portable Document Format"},
-                            description: "Portable Document Format",
-                            filename: "internal-pdf-viewer",
-                            length: 1,
-                            name: "Chrome PDF Plugin"
-                        },
-                        {
-                            0: {type: "application/pdf", suffixes: "pdf", description: "Portable Document Format"},
-                            description: "Portable Document Format",
-                            filename: "mhjfbmdgcfjbbpaeojofohoefgiehjai",
-                            length: 1,
-                            name: "Chrome PDF Viewer"
-                        }
-                    ]
-                });
-
-                // Languages
-                Object.defineProperty(navigator, 'languages', {
-                    get: () => ['fr-FR', 'fr', 'en-US', 'en']
-                });
-
-                // Permissions
-                const originalQuery = window.navigator.permissions.query;
-                window.navigator.permissions.query = (parameters) => (
-                    parameters.name === 'notifications' ?
-                        Promise.resolve({ state: Notification.permission }) :
-                        originalQuery(parameters)
-                );
-
-                // Chrome runtime
-                window.chrome = {
-                    runtime: {}
-                };
-
-                // Platform
-                Object.defineProperty(navigator, 'platform', {
-                    get: () => 'Win32'
-                });
-
-                // HardwareConcurrency
-                Object.defineProperty(navigator, 'hardwareConcurrency', {
-                    get: () => 8
-                });
-
-                // DeviceMemory
-                Object.defineProperty(navigator, 'deviceMemory', {
-                    get: () => 8
-                });
-            """)
-
-            self.page = context.new_page()
-
-            # Appliquer playwright-stealth à la page si disponible
-            if stealth_mode and STEALTH_AVAILABLE:
-                try:
-                    Stealth().apply_stealth_sync(self.page)
-                    logger.info("✅ Playwright-stealth activé sur la page")
-                except Exception as stealth_err:
-                    logger.warning(f"⚠️ Erreur activation stealth page: {stealth_err}")
+            self._stealth_mode = stealth_mode
+            self._open_context(proxy)
 
             logger.info("✅ Browser Playwright initialisé avec succès")
 
         except Exception as e:
             logger.error(f"❌ Erreur init browser: {e}")
-            self.close_browser()
+            self.close_browser(failed=True)
             raise
 
-    def close_browser(self):
-        """Ferme proprement le browser"""
+    def _open_context(self, proxy: Optional[str]):
+        """Contexte du job (anti-fingerprinting, proxy, session reprise) et son onglet principal"""
+        self.current_proxy = proxy
+        # Context avec anti-fingerprinting et headers réalistes
+        context_options = {
+            'user_agent': self.get_random_user_agent(),
+            'viewport': {'width': 1920, 'height': 1080},
+            'locale': 'fr-FR',
+            'timezone_id': 'Europe/Paris',
+            'permissions': ['geolocation'],
+            'geolocation': {'latitude': 48.8566, 'longitude': 2.3522},  # Paris
+            'ignore_https_errors': True,  # Ignore SSL certificate errors
+            'extra_http_headers': {
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+                'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
+                'Accept-Encoding': 'gzip, deflate, br',
+                'DNT': '1',
+                'Connection': 'keep-alive',
+                'Upgrade-Insecure-Requests': '1',
+                'Sec-Fetch-Dest': 'document',
+                'Sec-Fetch-Mode': 'navigate',
+                'Sec-Fetch-Site': 'none',
+                'Sec-Fetch-User': '?1',
+                'Cache-Control': 'max-age=0',
+            }
+        }
+
+
+        # Proxy du contexte (celui du lancement s'applique sinon)
+        if proxy and proxy != self._launch_proxy:
+            context_options['proxy'] = {'server': proxy}
+
+        # Session collante : cookies et user-agent du dernier job sur ce domaine et ce proxy
+        session = session_store.load(self.session_domain(), proxy)
+        if session:
+            context_options['storage_state'] = session['storage_state']
+            context_options['user_agent'] = session.get('user_agent') or context_options['user_agent']
+        self.session_restored = bool(session)
+        self._user_agent = context_options['user_agent']
+
+        if BLOCK_RESOURCES:
+            # Un service worker servirait les ressources sans passer par context.route
+            context_options['service_workers'] = 'block'
+
+        context = self.browser.new_context(**context_options)
+        self.context = context
+        if BLOCK_RESOURCES:
+            # Note : l'interception désactive le cache HTTP du contexte, un coût
+            # largement compensé par les images et scripts tiers non chargés
+            context.route("**/*", self._route_request)
+
+        # Injecter scripts anti-détection AVANCÉS
+        context.add_init_script("""
+            // Masquer webdriver
+            Object.defineProperty(navigator, 'webdriver', {
+                get: () => undefined
+            });
+
+            // Faux plugins
+            Object.defineProperty(navigator, 'plugins', {
+                get: () => [
+                    {
+                        0: {type: "application/x-google-chrome-pdf", suffixes: "pdf", description: "Portable Document Format"},
+                        description: "Portable Document Format",
+                        filename: "internal-pdf-viewer",
+                        length: 1,
+                        name: "Chrome PDF Plugin"
+                    },
+                    {
+                        0: {type: "application/pdf", suffixes: "pdf", description: "Portable Document Format"},
+                        description: "Portable Document Format",
+                        filename: "mhjfbmdgcfjbbpaeojofohoefgiehjai",
+                        length: 1,
+                        name: "Chrome PDF Viewer"
+                    }
+                ]
+            });
+
+            // Languages
+            Object.defineProperty(navigator, 'languages', {
+                get: () => ['fr-FR', 'fr', 'en-US', 'en']
+            });
+
+            // Permissions
+            const originalQuery = window.navigator.permissions.query;
+            window.navigator.permissions.query = (parameters) => (
+                parameters.name === 'notifications' ?
+                    Promise.resolve({ state: Notification.permission }) :
+                    originalQuery(parameters)
+            );
+
+            // Chrome runtime
+            window.chrome = {
+                runtime: {}
+            };
+
+            // Platform
+            Object.defineProperty(navigator, 'platform', {
+                get: () => 'Win32'
+            });
+
+            // HardwareConcurrency
+            Object.defineProperty(navigator, 'hardwareConcurrency', {
+                get: () => 8
+            });
+
+            // DeviceMemory
+            Object.defineProperty(navigator, 'deviceMemory', {
+                get: () => 8
+            });
+        """)
+
+        self.page = self.new_page()
+        if self.session_restored:
+            logger.info(f"🍪 Session {self.session_domain()} reprise")
+
+    def _route_request(self, route):
+        """Annule images, médias, polices et trackers, sauf URLs de RESOURCE_ALLOWLIST"""
+        request = route.request
+        url = request.url
+        if (
+            (request.resource_type in BLOCKED_RESOURCE_TYPES or is_tracker(urlsplit(url).hostname or ''))
+            and not any(allowed in url for allowed in self.RESOURCE_ALLOWLIST)
+        ):
+            self.resource_stats['blocked'] += 1
+            route.abort()
+        else:
+            self.resource_stats['allowed'] += 1
+            route.continue_()
+
+    def new_page(self) -> "Page":
+        """
+        Ouvre un onglet dans le contexte du job (stealth appliqué).
+        Plusieurs onglets peuvent être ouverts pour charger des pages en parallèle.
+        """
+        page = self.context.new_page()
+        if self._pooled:
+            page.on("domcontentloaded", self._pooled.count_page)
+
+        # Appliquer playwright-stealth à la page si disponible
+        if self._stealth_mode and STEALTH_AVAILABLE:
+            try:
+                Stealth().apply_stealth_sync(page)
+                logger.info("✅ Playwright-stealth activé sur la page")
+            except Exception as stealth_err:
+                logger.warning(f"⚠️ Erreur activation stealth page: {stealth_err}")
+        return page
+
+    def session_domain(self) -> str:
+        """Domaine des sessions collantes (hôte de BASE_URL, sinon nom de la source)"""
+        base_url = getattr(self, 'BASE_URL', None)
+        return (urlparse(base_url).hostname if base_url else None) or self.get_source_name()
+
+    def warm_up_delay(self):
+        """Délai après la première navigation, réduit quand la session est reprise"""
+        if self.session_restored:
+            self.random_delay(0.3, 0.8)
+        else:
+            self.random_delay(3, 5)
+
+    def _save_session(self):
+        """Enregistre (ou oublie si le proxy a été bloqué) la session du contexte courant"""
+        if not self.context:
+            return
+        domain = self.session_domain()
+        try:
+            if self._proxy_blocked:
+                session_store.discard(domain, self.current_proxy)
+            else:
+                session_store.save(domain, self.current_proxy, self.context.storage_state(), self._user_agent)
+        except Exception as e:
+            logger.debug(f"Session {domain} non enregistrée: {e}")
+
+    def _close_context(self):
+        # Fermer le contexte ferme aussi ses onglets
+        if self.context:
+            self.context.close()
+        self.page = None
+        self.context = None
+
+    def rotate_context(self, proxy: Optional[str] = None):
+        """
+        Change de proxy sans relancer le navigateur : la session du proxy
+        courant est enregistrée (ou oubliée s'il a été bloqué), le contexte
+        fermé, puis un contexte est ouvert sur le nouveau proxy avec sa propre
+        session. Les onglets ouverts par new_page() sont fermés.
+        """
+        # Le blocage est remonté avant de choisir : le proxy bloqué est déjà en quarantaine
+        self._save_session()
+        self._report_proxy(failed=False)
+        if proxy is None and self.use_proxy and self.proxy_manager:
+            proxy = self.proxy_manager.get_proxy()
+        try:
+            self._close_context()
+        except Exception as e:
+            logger.warning(f"⚠️ Erreur fermeture contexte: {e}")
+            self.page = None
+            self.context = None
+        self._open_context(proxy)
+        logger.info(f"🔄 Contexte changé (proxy: {proxy or 'aucun'})")
+
+    def mark_proxy_blocked(self):
+        """Le proxy courant a été bloqué par le site (403, 429, captcha)."""
+        self._proxy_blocked = True
+
+    def _report_proxy(self, failed: bool):
+        """Remonte au ProxyManager le résultat du job pour le proxy utilisé."""
+        if not (self.proxy_manager and self.current_proxy):
+            return
+        try:
+            if failed or self._proxy_blocked:
+                self.proxy_manager.mark_proxy_failed(self.current_proxy)
+            else:
+                self.proxy_manager.mark_proxy_working(self.current_proxy)
+        except Exception as e:
+            logger.debug(f"Statistiques proxy non enregistrées: {e}")
+        self.current_proxy = None
+        self._proxy_blocked = False
+
+    def close_browser(self, failed: bool = False):
+        """
+        Ferme proprement le browser
+        Avec le pool, seul le contexte du job est fermé et le navigateur est rendu
+        (failed=True le fait recycler).
+        """
+        if not failed or self._proxy_blocked:
+            self._save_session()
+        self._report_proxy(failed)
+        if self.resource_stats['blocked']:
+            logger.info(
+                f"🚫 {self.resource_stats['blocked']} requêtes bloquées, "
+                f"{self.resource_stats['allowed']} chargées"
+            )
+            self.resource_stats = {'blocked': 0, 'allowed': 0}
         try:
-            if self.page:
-                self.page.close()
-            if self.browser:
-                self.browser.close()
-            if self.playwright:
-                self.playwright.stop()
+            self._close_context()
+        except Exception as e:
+            failed = True
+            logger.warning(f"⚠️ Erreur fermeture contexte: {e}")
+
+        try:
+            if self._pooled:
+                browser_pool.release(self._pooled, failed=failed)
+            else:
+                if self.browser:
+                    self.browser.close()
+                if self.playwright:
+                    self.playwright.stop()
             logger.info("✅ Browser fermé")
         except Exception as e:
             logger.warning(f"⚠️ Erreur fermeture browser: {e}")
+        finally:
+            self.page = None
+            self.context = None
+            self.browser = None
+            self.playwright = None
+            self._pooled = None
+            self._launch_proxy = None
 
     @abstractmethod
     def get_source_name(self) -> str:
@@ -268,6 +480,21 @@ class BaseScraper(ABC):
         """
         pass
 
+    def iter_pages(self, search_params: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Génère les annonces normalisées page par page (recherche en streaming).
+        Par défaut une seule "page" contenant tout le résultat de scrape() ;
+        les scrapers paginés la surchargent pour livrer chaque page dès qu'elle est lue.
+        """
+        yield self.scrape(search_params)
+
+    def extract_make_model_from_title(self, title: str):
+        """Marque (premier mot) et modèle (deuxième mot) d'un titre d'annonce"""
+        parts = title.split()
+        make = parts[0] if parts else None
+        model = parts[1] if len(parts) > 1 else None
+        return make, model
+
     def normalize_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Normalise les données scrapées"""
         source_name = self.get_source_name()
@@ -276,7 +503,7 @@ class BaseScraper(ABC):
         # Créer un ID unique en combinant source + id
         unique_id = f"{source_name}_{source_id}" if source_id else None
 
-        return {
+        data = {
             'id': unique_id,  # ID unique pour le frontend
             'source_ids': {source_name: source_id},
             'title': raw_data.get('title', ''),
@@ -291,6 +518,9 @@ class BaseScraper(ABC):
             'url': raw_data.get('url'),
             'images': raw_data.get('images', [])
         }
+        # Prix, km, titre, images, description : le worker ignore les annonces inchangées
+        data['content_hash'] = content_hash({**data, 'description': raw_data.get('description')})
+        return data
 
     def _normalize_price(self, price: Any) -> Optional[int]:
         """Normalise le prix en entier"""
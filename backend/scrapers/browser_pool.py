@@ -0,0 +1,227 @@
+# backend/scrapers/browser_pool.py
+"""
+Pool de navigateurs Chromium partagé entre les exécutions de scrapers.
+
+Lancer Chromium coûte 2 à 4 s et ~300 Mo : au lieu d'un lancement par
+scrape(), BaseScraper.init_browser() emprunte un navigateur déjà démarré et
+n'ouvre qu'un contexte isolé (cookies, stockage, user-agent) par job.
+
+L'API synchrone de Playwright est liée au thread qui l'a démarrée : chaque
+thread garde donc ses propres navigateurs. Les scrapers lancés depuis l'API
+passent par `executor`, un pool de threads permanent, pour que leurs
+navigateurs restent chauds d'une requête à l'autre ; un worker Celery
+(prefork) réutilise naturellement son thread unique.
+
+Un thread de `executor` n'exécute qu'un job à la fois et ne garde que ses
+propres navigateurs : `executor` a donc par défaut BROWSER_POOL_SIZE threads
+(un navigateur chaud chacun). Avec plus de threads que de navigateurs du pool,
+les threads en trop lanceraient un Chromium temporaire à chaque job. Une
+requête HTTP n'y occupe au plus que SCRAPER_JOBS_PER_REQUEST threads
+(RequestJobs) : une recherche multi-sources de plusieurs minutes ne bloque pas
+les autres requêtes.
+
+Un navigateur est recyclé (fermé puis relancé au prochain emprunt) :
+- après BROWSER_POOL_MAX_PAGES documents chargés ou BROWSER_POOL_MAX_AGE secondes
+- s'il est resté BROWSER_POOL_IDLE_TIMEOUT secondes sans emprunt (vérifié au
+  prochain emprunt dans son thread : aucun thread de fond ne ferme les
+  navigateurs inactifs, seul close_thread() le fait)
+- s'il s'est déconnecté (crash) ou si le job a signalé une erreur de navigateur
+
+Plusieurs jobs d'un même thread peuvent partager un navigateur en même temps
+(un contexte chacun), jusqu'à BROWSER_POOL_MAX_CONTEXTS. Au-delà de BROWSER_POOL_SIZE
+navigateurs dans le processus, les navigateurs supplémentaires sont fermés
+à la fin du job au lieu d'être conservés.
+
+BROWSER_POOL_ENABLED=false rétablit un lancement par job.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from playwright.sync_api import sync_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+POOL_ENABLED = os.getenv("BROWSER_POOL_ENABLED", "true").lower() in ("1", "true", "yes")
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+MAX_PAGES = int(os.getenv("BROWSER_POOL_MAX_PAGES", "500"))
+MAX_AGE = float(os.getenv("BROWSER_POOL_MAX_AGE", "3600"))
+IDLE_TIMEOUT = float(os.getenv("BROWSER_POOL_IDLE_TIMEOUT", "900"))
+MAX_CONTEXTS = int(os.getenv("BROWSER_POOL_MAX_CONTEXTS", "4"))
+# Threads qui exécutent les scrapers lancés depuis l'API (défaut : un par navigateur du pool)
+SCRAPER_THREADS = int(os.getenv("SCRAPER_THREADS", str(POOL_SIZE)))
+# Jobs simultanés d'une même requête HTTP sur ces threads
+JOBS_PER_REQUEST = int(os.getenv("SCRAPER_JOBS_PER_REQUEST", "2"))
+
+
+class PooledBrowser:
+    """Navigateur emprunté : compteurs d'usage et état de santé."""
+
+    def __init__(self, browser, key: str, pooled: bool):
+        self.browser = browser
+        self.key = key
+        self.pooled = pooled
+        self.pages = 0
+        self.jobs = 0
+        self.active = 0
+        self.failed = False
+        self.created_at = self.last_used = time.monotonic()
+        browser.on("disconnected", self._on_disconnected)
+
+    def _on_disconnected(self, _browser):
+        self.failed = True
+
+    def count_page(self, *_args):
+        """Callback `domcontentloaded` : un document chargé de plus."""
+        self.pages += 1
+
+    @property
+    def healthy(self) -> bool:
+        return not self.failed and self.browser.is_connected()
+
+    def expired(self, now: float) -> bool:
+        return (
+            self.pages >= MAX_PAGES
+            or now - self.created_at > MAX_AGE
+            or now - self.last_used > IDLE_TIMEOUT
+        )
+
+
+class BrowserPool:
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._count = 0
+        self.stats = {"launched": 0, "reused": 0, "recycled": 0}
+
+    @property
+    def size(self) -> int:
+        """Navigateurs ouverts dans le processus (tous threads confondus)."""
+        return self._count
+
+    def _thread_state(self):
+        local = self._local
+        if not hasattr(local, "browsers"):
+            local.playwright = None
+            local.browsers = {}  # navigateurs du pool, par options de lancement
+            local.open = 0       # tous les navigateurs ouverts par ce thread
+        return local
+
+    def acquire(self, launch_options: Dict[str, Any]) -> PooledBrowser:
+        """Navigateur chaud pour ces options de lancement, lancé si besoin."""
+        state = self._thread_state()
+        key = json.dumps(launch_options, sort_keys=True, default=str)
+        now = time.monotonic()
+
+        entry = state.browsers.get(key)
+        if entry is not None and entry.active == 0 and (not entry.healthy or entry.expired(now)):
+            self._close(entry, reason="santé/usage", keep_driver=True)
+            self.stats["recycled"] += 1
+            entry = None
+        if entry is not None and (not entry.healthy or entry.active >= MAX_CONTEXTS):
+            # Navigateur occupé ou en échec : un navigateur dédié à ce job
+            entry = self._launch(launch_options, key, pooled=False)
+        elif entry is None:
+            entry = self._launch(launch_options, key, pooled=True)
+        else:
+            self.stats["reused"] += 1
+
+        entry.active += 1
+        entry.jobs += 1
+        entry.last_used = now
+        return entry
+
+    def release(self, entry: PooledBrowser, failed: bool = False):
+        """Rend le navigateur ; il est fermé s'il n'est pas réutilisable."""
+        entry.active = max(0, entry.active - 1)
+        entry.last_used = time.monotonic()
+        if failed:
+            entry.failed = True
+        if entry.active == 0 and (not entry.pooled or not entry.healthy or entry.expired(entry.last_used)):
+            self._close(entry, reason="fin de job")
+
+    def _launch(self, launch_options: Dict[str, Any], key: str, pooled: bool) -> PooledBrowser:
+        if not PLAYWRIGHT_AVAILABLE:
+            raise RuntimeError("❌ Playwright n'est pas installé. Exécutez: pip install playwright && playwright install chromium")
+
+        state = self._thread_state()
+        if state.playwright is None:
+            state.playwright = sync_playwright().start()
+
+        with self._lock:
+            if pooled and self._count >= POOL_SIZE:
+                pooled = False
+            self._count += 1
+        try:
+            browser = state.playwright.chromium.launch(**launch_options)
+        except Exception:
+            with self._lock:
+                self._count -= 1
+            raise
+
+        state.open += 1
+        entry = PooledBrowser(browser, key, pooled)
+        if pooled:
+            state.browsers[key] = entry
+        self.stats["launched"] += 1
+        logger.info(f"🚀 Chromium lancé ({'pool' if pooled else 'temporaire'}, {self._count} ouverts)")
+        return entry
+
+    def _close(self, entry: PooledBrowser, reason: str = "", keep_driver: bool = False):
+        state = self._thread_state()
+        if state.browsers.get(entry.key) is entry:
+            del state.browsers[entry.key]
+        try:
+            entry.browser.close()
+        except Exception as e:
+            logger.debug(f"Fermeture navigateur: {e}")
+        with self._lock:
+            self._count -= 1
+        state.open -= 1
+        logger.info(f"♻️ Chromium fermé ({reason}, {entry.jobs} jobs, {entry.pages} pages)")
+
+        if state.open == 0 and state.playwright is not None and not keep_driver:
+            try:
+                state.playwright.stop()
+            except Exception as e:
+                logger.debug(f"Arrêt Playwright: {e}")
+            state.playwright = None
+
+    def close_thread(self):
+        """Ferme les navigateurs inactifs du thread courant."""
+        state = self._thread_state()
+        for entry in list(state.browsers.values()):
+            if entry.active == 0:
+                self._close(entry, reason="arrêt")
+
+
+browser_pool = BrowserPool()
+
+executor = ThreadPoolExecutor(max_workers=SCRAPER_THREADS, thread_name_prefix="scraper")
+
+
+class RequestJobs:
+    """Jobs scrapers d'une requête HTTP : au plus `limit` à la fois sur `executor`."""
+
+    def __init__(self, limit: int = JOBS_PER_REQUEST):
+        self._slots = asyncio.Semaphore(max(1, limit))
+
+    async def run(self, fn, *args):
+        # Le créneau est pris avant la soumission : un job en attente n'occupe pas de thread
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    if not POOL_ENABLED:
+        return None
+    return {**browser_pool.stats, "open": browser_pool.size, "max": POOL_SIZE}
@@ -0,0 +1,193 @@
+# backend/scrapers/incremental.py
+"""
+Scraping incrémental : ne renvoyer que les annonces nouvelles ou modifiées.
+
+État conservé dans Redis :
+- un filtre de Bloom par source (bitmap SETBIT/GETBIT) des versions d'annonces
+  déjà vues, clé "<id>:<date d'indexation>" : une annonce modifiée (nouvelle
+  index_date) repasse le filtre. Le filtre tourne toutes les
+  SCRAPER_SEEN_ROTATION secondes (génération courante + précédente) pour que
+  son taux de faux positifs reste stable.
+- une high-water mark par source et par recherche (hash des search_params) :
+  la date de publication la plus récente vue.
+
+Avec un tri "plus récentes d'abord", une page dont la date la plus ancienne
+est déjà sous la high-water mark marque l'entrée en territoire connu : la
+pagination s'arrête après elle.
+
+Rien n'est enregistré avant commit(), appelé en fin de run : un run interrompu
+renverra les mêmes annonces au suivant. Un run incomplet (page bloquée, en
+erreur, disjoncteur ouvert) enregistre les annonces renvoyées mais pas la
+high-water mark : le run suivant repasse sur les pages manquées. Sans Redis,
+toutes les annonces passent.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from .redis_client import get_redis
+except ImportError:
+    from scrapers.redis_client import get_redis
+
+# 2^23 bits = 1 Mo par génération : ~1 % de faux positifs à 870 000 annonces
+BLOOM_BITS = int(os.getenv("SCRAPER_BLOOM_BITS", str(2 ** 23)))
+BLOOM_HASHES = 7
+SEEN_ROTATION = int(os.getenv("SCRAPER_SEEN_ROTATION", str(7 * 24 * 3600)))
+
+KEY_PREFIX = "scraper"
+
+# Paramètres sans effet sur les annonces renvoyées (exclus du hash de recherche)
+IGNORED_PARAMS = ("max_pages", "concurrency", "incremental", "deep_scrape")
+
+
+def search_scope(search_params: Dict[str, Any]) -> str:
+    """Identifiant stable d'une recherche (mêmes filtres -> même high-water mark)."""
+    params = {k: v for k, v in search_params.items() if k not in IGNORED_PARAMS and v not in (None, "", [])}
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _bit_offsets(key: str) -> List[int]:
+    """Positions du filtre de Bloom (double hachage sur un blake2b de 128 bits)."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "big")
+    h2 = int.from_bytes(digest[8:], "big") | 1
+    return [(h1 + i * h2) % BLOOM_BITS for i in range(BLOOM_HASHES)]
+
+
+def item_date(item: Dict[str, Any]) -> Optional[str]:
+    """Date de (re)publication comparable de l'annonce ("AAAA-MM-JJ HH:MM:SS")."""
+    value = item.get("index_date") or item.get("first_publication_date")
+    return str(value) if value else None
+
+
+def item_key(item: Dict[str, Any]) -> Optional[str]:
+    """Version de l'annonce : id source + date d'indexation."""
+    source_id = item.get("id")
+    if not source_id:
+        return None
+    return f"{source_id}:{item_date(item) or ''}"
+
+
+class IncrementalState:
+    """État incrémental d'un run de scraping (une source, une recherche)."""
+
+    def __init__(self, source: str, search_params: Dict[str, Any], redis_client=None):
+        self.source = source
+        self.scope = search_scope(search_params)
+        self.redis = redis_client if redis_client is not None else get_redis()
+        self.high_water_mark = self._load_high_water_mark()
+        self._seen_keys: List[str] = []
+        self._max_date: Optional[str] = None
+        self.stats = {"new": 0, "skipped": 0}
+
+    @property
+    def _hwm_key(self) -> str:
+        return f"{KEY_PREFIX}:hwm:{self.source}:{self.scope}"
+
+    def _bloom_key(self, generation: int) -> str:
+        return f"{KEY_PREFIX}:seen:{self.source}:{generation}"
+
+    def _generations(self) -> Tuple[int, int]:
+        current = int(time.time() // SEEN_ROTATION)
+        return current, current - 1
+
+    def _load_high_water_mark(self) -> Optional[str]:
+        if self.redis is None:
+            return None
+        try:
+            value = self.redis.get(self._hwm_key)
+        except Exception as e:
+            logger.warning(f"⚠️ High-water mark indisponible ({self.source}): {e}")
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def _seen(self, keys: List[str]) -> List[bool]:
+        """Pour chaque clé : déjà vue dans la génération courante ou précédente."""
+        if self.redis is None or not keys:
+            return [False] * len(keys)
+        current, previous = self._generations()
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key in keys:
+                for offset in _bit_offsets(key):
+                    pipe.getbit(self._bloom_key(current), offset)
+                    pipe.getbit(self._bloom_key(previous), offset)
+            bits = pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Filtre des annonces vues indisponible ({self.source}): {e}")
+            return [False] * len(keys)
+
+        seen = []
+        step = 2 * BLOOM_HASHES
+        for i in range(len(keys)):
+            chunk = bits[i * step:(i + 1) * step]
+            seen.append(all(chunk[0::2]) or all(chunk[1::2]))
+        return seen
+
+    def filter_page(self, items: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Annonces nouvelles ou modifiées de la page, et True si la page atteint
+        le territoire connu (sa date la plus ancienne est sous la high-water mark).
+        """
+        keys = [item_key(item) for item in items]
+        seen = self._seen([key for key in keys if key])
+        seen_iter = iter(seen)
+
+        fresh = []
+        for item, key in zip(items, keys):
+            if key and next(seen_iter):
+                self.stats["skipped"] += 1
+                continue
+            fresh.append(item)
+            self.stats["new"] += 1
+            if key:
+                self._seen_keys.append(key)
+
+        dates = [d for d in map(item_date, items) if d]
+        if dates:
+            newest = max(dates)
+            if self._max_date is None or newest > self._max_date:
+                self._max_date = newest
+        known = bool(dates) and self.high_water_mark is not None and min(dates) <= self.high_water_mark
+        return fresh, known
+
+    def commit(self, complete: bool = True):
+        """
+        Enregistre les annonces renvoyées et, si toutes les pages jusqu'à l'arrêt
+        ont été lues (complete), la nouvelle high-water mark.
+        """
+        if self.redis is None:
+            return
+        current, _ = self._generations()
+        bloom_key = self._bloom_key(current)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key in self._seen_keys:
+                for offset in _bit_offsets(key):
+                    pipe.setbit(bloom_key, offset, 1)
+            if self._seen_keys:
+                pipe.expire(bloom_key, 2 * SEEN_ROTATION)
+            if complete and self._max_date and (self.high_water_mark is None or self._max_date > self.high_water_mark):
+                pipe.set(self._hwm_key, self._max_date, ex=2 * SEEN_ROTATION)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Enregistrement de l'état incrémental impossible ({self.source}): {e}")
+            return
+        hwm = (self._max_date or self.high_water_mark) if complete else f"{self.high_water_mark} conservée, run incomplet"
+        logger.info(
+            f"📌 {self.source}: {self.stats['new']} nouvelles/modifiées, {self.stats['skipped']} déjà vues "
+            f"(high-water mark: {hwm})"
+        )
+        self._seen_keys = []
+
+    def reset(self):
+        """Oublie la high-water mark de cette recherche (prochain run complet)."""
+        if self.redis is not None:
+            self.redis.delete(self._hwm_key)
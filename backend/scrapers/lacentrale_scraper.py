@@ -1,10 +1,35 @@
 # backend/scrapers/lacentrale_scraper.py - VERSION PRODUCTION
 from typing import List, Dict, Any
 import logging
-from .base_scraper import BaseScraper
+from .base_scraper import BaseScraper, LISTING_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
+# Champs bruts d'une carte .searchCard, extraits dans le navigateur
+CARD_FN = """
+(el) => {
+    const text = (selector) => {
+        const node = el.querySelector(selector);
+        return node ? node.innerText.trim() : null;
+    };
+    const link = el.querySelector('a');
+    const img = el.querySelector('img');
+    return {
+        href: link ? link.getAttribute('href') : null,
+        title: text('.searchCardTitle'),
+        price: text('.searchCardPrice'),
+        mileage: text('.searchCardMileage'),
+        year: text('.searchCardYear'),
+        fuel: text('.searchCardFuel'),
+        location: text('.searchCardLocation'),
+        image: img ? img.getAttribute('src') : null,
+    };
+}
+"""
+
+# Toutes les cartes de la page en un seul aller-retour Playwright
+PAGE_SCRIPT = "(selector) => Array.from(document.querySelectorAll(selector)).map(" + CARD_FN + ")"
+
 class LaCentraleScraper(BaseScraper):
     """
     Scraper pour LaCentrale (lacentrale.fr)
@@ -13,6 +38,8 @@ class LaCentraleScraper(BaseScraper):
     
     BASE_URL = "https://www.lacentrale.fr"
     SEARCH_URL = f"{BASE_URL}/listing?makesModelsCommercialNames={{query}}"
+    # Script et captcha DataDome : les bloquer déclencherait la protection
+    RESOURCE_ALLOWLIST = ('datadome.co', 'captcha-delivery.com')
     
     def get_source_name(self) -> str:
         return "lacentrale"
@@ -53,8 +80,12 @@ class LaCentraleScraper(BaseScraper):
                 
                 # Navigation
                 try:
-                    self.page.goto(url, wait_until='networkidle', timeout=30000)
-                    self.random_delay(3, 5)
+                    # Document seulement : les cartes sont attendues ci-dessous
+                    self.page.goto(url, wait_until='domcontentloaded', timeout=30000)
+                    if page_num == 1:
+                        self.warm_up_delay()
+                    else:
+                        self.random_delay(3, 5)
                 except Exception as e:
                     logger.error(f"❌ Erreur navigation page {page_num}: {e}")
                     continue
@@ -62,14 +93,14 @@ class LaCentraleScraper(BaseScraper):
                 # Attendre les résultats
                 # LaCentrale utilise .searchCard pour les résultats
                 try:
-                    self.page.wait_for_selector('.searchCard', timeout=15000)
+                    self.page.wait_for_selector('.searchCard', timeout=LISTING_TIMEOUT)
                 except Exception as e:
                     logger.warning(f"⚠️ Timeout ou pas d'annonces page {page_num}: {e}")
                     break
                 
-                # Parser les listings
+                # Parser les listings (extraction groupée : un seul page.evaluate)
                 try:
-                    listings = self.page.query_selector_all('.searchCard')
+                    listings = self.page.evaluate(PAGE_SCRIPT, '.searchCard')
                     logger.info(f"✅ Trouvé {len(listings)} annonces")
                     
                     if len(listings) == 0:
@@ -78,7 +109,7 @@ class LaCentraleScraper(BaseScraper):
                     
                     for idx, listing in enumerate(listings, 1):
                         try:
-                            parsed = self.parse_listing(listing)
+                            parsed = self.parse_card(listing)
                             if parsed and parsed.get('id'):
                                 normalized = self.normalize_data(parsed)
                                 results.append(normalized)
@@ -106,11 +137,18 @@ class LaCentraleScraper(BaseScraper):
         return results
     
     def parse_listing(self, element) -> Dict[str, Any]:
-        """Parse un élément de listing LaCentrale"""
+        """Parse un élément de listing LaCentrale (un seul appel Playwright)"""
+        try:
+            return self.parse_card(element.evaluate(CARD_FN))
+        except Exception as e:
+            logger.debug(f"Erreur parse_listing: {e}")
+            return None
+
+    def parse_card(self, card: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalise les champs bruts d'une carte (extraits par CARD_FN)"""
         try:
             # URL et ID
-            link_elem = element.query_selector('a')
-            url = link_elem.get_attribute('href') if link_elem else None
+            url = card.get('href')
             
             if not url:
                 return None
@@ -127,26 +165,16 @@ class LaCentraleScraper(BaseScraper):
                 # Fallback: utiliser toute l'URL comme ID
                 source_id = url.replace('/', '_').replace('.html', '')
             
-            # Titre (marque + modèle + version)
-            title = self.safe_get_text(element, '.searchCardTitle')
-            
-            # Prix
-            price_text = self.safe_get_text(element, '.searchCardPrice')
-            
-            # Kilométrage
-            mileage_text = self.safe_get_text(element, '.searchCardMileage')
-            
-            # Année
-            year_text = self.safe_get_text(element, '.searchCardYear')
-            
-            # Carburant
-            fuel_text = self.safe_get_text(element, '.searchCardFuel')
-            
-            # Localisation
-            location = self.safe_get_text(element, '.searchCardLocation')
+            # Titre (marque + modèle + version), prix, kilométrage, année, carburant, localisation
+            title = card.get('title')
+            price_text = card.get('price')
+            mileage_text = card.get('mileage')
+            year_text = card.get('year')
+            fuel_text = card.get('fuel')
+            location = card.get('location')
             
             # Image
-            img_url = self.safe_get_attribute(element, 'img', 'src')
+            img_url = card.get('image')
             
             # Extraction marque/modèle
             make, model = self.extract_make_model_from_title(title) if title else (None, None)
@@ -1,7 +1,11 @@
 # backend/scrapers/leboncoin_scraper.py - VERSION AVEC BIBLIOTHÈQUE LBC
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+import asyncio
 import logging
+import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 try:
@@ -13,8 +17,42 @@ except ImportError:
     sys.path.append(str(Path(__file__).parent.parent))
     from scrapers.base_scraper import BaseScraper
 
+from app.services.text import fold
+
+try:
+    from .incremental import IncrementalState
+    from .rate_limit import BLOCK_STATUSES, CircuitOpenError, rate_limiter
+except ImportError:
+    from scrapers.incremental import IncrementalState
+    from scrapers.rate_limit import BLOCK_STATUSES, CircuitOpenError, rate_limiter
+
 logger = logging.getLogger(__name__)
 
+API_URL = "https://api.leboncoin.fr"
+PAGE_SIZE = 35
+# Requêtes simultanées de la variante asynchrone (aiter_pages)
+CONCURRENCY = int(os.getenv("LEBONCOIN_CONCURRENCY", "4"))
+# Nouveaux essais d'une page bloquée, au débit réduit par le limiteur
+MAX_BLOCK_RETRIES = 2
+BLOCKED_PATTERN = re.compile(r'\b(403|429)\b')
+
+# Extraction NLP (_enrich_with_nlp) : expressions compilées une fois, texte déjà sans accents
+YEAR_PATTERN = re.compile(r'\b(19[9]\d|20[0-3]\d)\b')
+KM_PATTERNS = (
+    re.compile(r'(\d+)\s*000\s*km'),  # 150 000 km
+    re.compile(r'(\d+)k\s*km'),        # 150k km
+    re.compile(r'(\d{3,6})\s*km'),     # 150000 km
+)
+FUEL_KEYWORDS = {
+    'essence': ('essence', 'sp95', 'sp98', 'e85'),
+    'diesel': ('diesel', 'gazole', 'hdi', 'tdi', 'dci'),
+    'electrique': ('electrique', 'ev'),
+    'hybride': ('hybride', 'hybrid', 'plug-in'),
+    'gpl': ('gpl', 'lpg'),
+}
+AUTOMATIC_KEYWORDS = ('automatique', 'auto', 'bva', 'cvt', 'dsg')
+MANUAL_KEYWORDS = ('manuelle', 'manuel', 'bvm')
+
 # Importer la bibliothèque lbc
 try:
     from lbc import Client, Category, Sort
@@ -24,6 +62,40 @@ except ImportError:
     logger.error("❌ Bibliothèque 'lbc' non disponible. Installez avec: pip install lbc")
 
 
+def _is_datadome(error: Exception) -> bool:
+    return 'datadome' in str(error).lower() or 'datadome' in type(error).__name__.lower()
+
+
+def _is_blocked(error: Exception) -> bool:
+    """Blocage anti-bot (DataDome, 403, 429) : à signaler au limiteur de débit."""
+    if _is_datadome(error):
+        return True
+    status = getattr(error, 'status_code', None) or getattr(error, 'status', None)
+    if status in BLOCK_STATUSES:
+        return True
+    return bool(BLOCKED_PATTERN.search(str(error)))
+
+
+def _search(client, base_kwargs: Dict[str, Any], page_num: int):
+    """client.search d'une page, avec retour au limiteur (succès ou blocage)."""
+    try:
+        search_result = client.search(**base_kwargs, page=page_num)
+    except Exception as e:
+        if _is_blocked(e):
+            rate_limiter.blocked(API_URL, "DataDome" if _is_datadome(e) else str(e)[:80])
+        raise
+    rate_limiter.success(API_URL)
+    return search_result
+
+
+def _log_datadome(page_num: int):
+    logger.error(f"❌ Bloqué par DataDome sur page {page_num}")
+    logger.error(f"💡 Solutions:")
+    logger.error(f"   1. Attendre quelques heures (IP bloquée temporairement)")
+    logger.error(f"   2. Utiliser un proxy rotatif (voir doc lbc)")
+    logger.error(f"   3. Tester depuis une autre machine/réseau")
+
+
 class LeBonCoinScraper(BaseScraper):
     """
     Scraper pour LeBonCoin (leboncoin.fr) utilisant la bibliothèque lbc
@@ -35,6 +107,14 @@ class LeBonCoinScraper(BaseScraper):
     def get_source_name(self) -> str:
         return "leboncoin"
 
+    def normalize_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalisation commune + dates de l'annonce (scraping incrémental)"""
+        data = super().normalize_data(raw_data)
+        for key in ('first_publication_date', 'index_date'):
+            value = raw_data.get(key)
+            data[key] = str(value) if value is not None else None
+        return data
+
     def scrape(self, search_params: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Scrape LeBonCoin avec la bibliothèque lbc - EXTRACTION COMPLÈTE
@@ -76,15 +156,26 @@ class LeBonCoinScraper(BaseScraper):
 
             FILTRES VENDEUR:
             - owner_type: str ('pro', 'private', 'all')
+
+            EXÉCUTION:
+            - concurrency: int (requêtes simultanées de aiter_pages, défaut: LEBONCOIN_CONCURRENCY)
+            - incremental: bool (True = uniquement les annonces nouvelles ou modifiées depuis le dernier run)
         """
+        results = []
+        for page_results in self.iter_pages(search_params):
+            results.extend(page_results)
+        return results
+
+    def iter_pages(self, search_params: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        """Génère les annonces page par page (mêmes search_params que scrape)."""
         if not LBC_AVAILABLE:
             logger.error("❌ Bibliothèque lbc non disponible")
-            return []
+            return
 
         query = search_params.get('query', 'voiture')
         max_pages = search_params.get('max_pages', 5)
 
-        results = []
+        total = 0
 
         try:
             # Créer le client lbc avec impersonation aléatoire
@@ -96,121 +187,26 @@ class LeBonCoinScraper(BaseScraper):
             logger.info(f"🔵 LeBonCoin (API): Recherche '{query}' sur {max_pages} pages")
             logger.info(f"💡 Utilise curl-cffi pour contourner la détection de bot")
 
-            # Construire les filtres (ranges et enums)
-            filters = {}
-
-            # FILTRES DE PRIX (range)
-            min_price = search_params.get('min_price')
-            max_price = search_params.get('max_price')
-            if min_price is not None or max_price is not None:
-                filters['price'] = (min_price or 0, max_price or 999999)
-
-            # FILTRES ANNÉE (regdate range)
-            min_year = search_params.get('min_year')
-            max_year = search_params.get('max_year')
-            if min_year is not None or max_year is not None:
-                filters['regdate'] = (min_year or 1900, max_year or 2030)
-
-            # FILTRES KILOMÉTRAGE (mileage range)
-            min_mileage = search_params.get('min_mileage')
-            max_mileage = search_params.get('max_mileage')
-            if min_mileage is not None or max_mileage is not None:
-                filters['mileage'] = (min_mileage or 0, max_mileage or 999999)
-
-            # FILTRES PUISSANCE FISCALE (horsepower range)
-            min_horsepower = search_params.get('min_horsepower')
-            max_horsepower = search_params.get('max_horsepower')
-            if min_horsepower is not None or max_horsepower is not None:
-                filters['horsepower'] = (min_horsepower or 0, max_horsepower or 999)
-
-            # FILTRES PUISSANCE DIN (horse_power_din range)
-            min_horse_power_din = search_params.get('min_horse_power_din')
-            max_horse_power_din = search_params.get('max_horse_power_din')
-            if min_horse_power_din is not None or max_horse_power_din is not None:
-                filters['horse_power_din'] = (min_horse_power_din or 0, max_horse_power_din or 999)
-
-            # FILTRES CARBURANT (fuel enum)
-            fuel_types = search_params.get('fuel_types')
-            if fuel_types:
-                filters['fuel'] = tuple(fuel_types) if isinstance(fuel_types, list) else (fuel_types,)
-
-            # FILTRES TRANSMISSION (gearbox enum)
-            transmissions = search_params.get('transmissions')
-            if transmissions:
-                filters['gearbox'] = tuple(transmissions) if isinstance(transmissions, list) else (transmissions,)
-
-            # FILTRES PORTES (doors enum)
-            doors = search_params.get('doors')
-            if doors:
-                filters['doors'] = tuple(doors) if isinstance(doors, list) else (doors,)
-
-            # FILTRES PLACES (seats enum)
-            seats = search_params.get('seats')
-            if seats:
-                filters['seats'] = tuple(seats) if isinstance(seats, list) else (seats,)
-
-            # FILTRES TYPE DE VÉHICULE (vehicle_type enum)
-            vehicle_types = search_params.get('vehicle_types')
-            if vehicle_types:
-                filters['vehicle_type'] = tuple(vehicle_types) if isinstance(vehicle_types, list) else (vehicle_types,)
-
-            # FILTRES COULEUR (vehicule_color enum)
-            colors = search_params.get('colors')
-            if colors:
-                filters['vehicule_color'] = tuple(colors) if isinstance(colors, list) else (colors,)
-
-            # FILTRES ÉTAT DU VÉHICULE (vehicle_damage enum)
-            vehicle_damage = search_params.get('vehicle_damage')
-            if vehicle_damage:
-                filters['vehicle_damage'] = tuple(vehicle_damage) if isinstance(vehicle_damage, list) else (vehicle_damage,)
-
-            # FILTRES BOOLÉENS (convertis en enum)
-            if search_params.get('first_hand') is True:
-                filters['first_hand_vehicle'] = ('1',)  # '1' = oui
-
-            if search_params.get('maintenance_booklet') is True:
-                filters['maintenance_booklet_available'] = ('1',)  # '1' = oui
-
-            # AUTRES PARAMÈTRES (owner_type, locations)
-            owner_type_param = search_params.get('owner_type')
-            locations_param = search_params.get('locations')
-
-            if filters:
-                logger.info(f"🔍 Filtres appliqués: {list(filters.keys())}")
+            base_kwargs = self._build_search_kwargs(search_params)
+            incremental = IncrementalState(self.get_source_name(), search_params) if search_params.get('incremental') else None
 
+            # False si une page manque (blocage, disjoncteur, erreur) : la
+            # high-water mark ne doit pas passer au-dessus des pages non lues
+            complete = True
             for page_num in range(1, max_pages + 1):
                 try:
                     logger.info(f"📄 Page {page_num}/{max_pages}")
 
-                    # Préparer les paramètres de recherche
-                    search_kwargs = {
-                        'text': query,
-                        'category': Category.VEHICULES_VOITURES,
-                        'sort': Sort.NEWEST,  # Trier par date (les plus récentes)
-                        'page': page_num,
-                        'limit': 35,  # Max par page
-                    }
-
-                    # Ajouter owner_type si spécifié
-                    if owner_type_param:
-                        from lbc import OwnerType
-                        owner_type_map = {
-                            'pro': OwnerType.PRO,
-                            'private': OwnerType.PRIVATE,
-                            'all': OwnerType.ALL
-                        }
-                        if owner_type_param.lower() in owner_type_map:
-                            search_kwargs['owner_type'] = owner_type_map[owner_type_param.lower()]
-
-                    # Ajouter locations si spécifié
-                    if locations_param:
-                        search_kwargs['locations'] = locations_param
-
-                    # Ajouter tous les filtres
-                    search_kwargs.update(filters)
-
-                    # Effectuer la recherche
-                    search_result = client.search(**search_kwargs)
+                    # Effectuer la recherche (réessayée au débit réduit si bloquée)
+                    for attempt in range(MAX_BLOCK_RETRIES + 1):
+                        rate_limiter.wait(API_URL)
+                        try:
+                            search_result = _search(client, base_kwargs, page_num)
+                            break
+                        except Exception as e:
+                            if not _is_blocked(e) or attempt == MAX_BLOCK_RETRIES:
+                                raise
+                            logger.warning(f"🐢 Blocage sur page {page_num}, nouvel essai ({attempt + 1}/{MAX_BLOCK_RETRIES})")
 
                     logger.info(f"✅ Trouvé {len(search_result.ads)} annonces sur page {page_num}")
                     logger.info(f"📊 Total disponible: {search_result.total} annonces")
@@ -219,60 +215,347 @@ class LeBonCoinScraper(BaseScraper):
                         logger.warning(f"❌ Aucune annonce sur page {page_num}, arrêt")
                         break
 
-                    # Parser chaque annonce
-                    page_results = 0
-                    for idx, ad in enumerate(search_result.ads, 1):
-                        try:
-                            parsed = self._parse_ad_from_lbc(ad)
-
-                            if not parsed:
-                                continue
-
-                            # Normaliser
-                            normalized = self.normalize_data(parsed)
+                    page_items = self._parse_ads(search_result.ads, page_num)
 
-                            results.append(normalized)
-                            page_results += 1
-
-                            logger.info(f"  ✓ Annonce {idx}: {normalized.get('title', 'N/A')[:60]} - {normalized.get('price')}€")
+                    # Si aucun résultat, arrêter
+                    if not page_items:
+                        logger.warning(f"⚠️ Aucun résultat sur page {page_num}, arrêt")
+                        break
 
-                        except Exception as e:
-                            logger.error(f"  ✗ Erreur annonce {idx}: {e}")
-                            import traceback
-                            traceback.print_exc()
+                    known = False
+                    if incremental:
+                        page_items, known = incremental.filter_page(page_items)
 
-                    logger.info(f"📊 Page {page_num}: {page_results} annonces valides ajoutées")
+                    if page_items:
+                        total += len(page_items)
+                        yield page_items
 
-                    # Si aucun résultat, arrêter
-                    if page_results == 0:
-                        logger.warning(f"⚠️ Aucun résultat sur page {page_num}, arrêt")
+                    if known:
+                        logger.info(f"📌 Page {page_num} en territoire connu, arrêt")
                         break
 
                     # Respecter un délai entre les pages
                     if page_num < max_pages:
                         self.random_delay(1, 3)
 
+                except CircuitOpenError as e:
+                    logger.error(f"🛑 {e}, arrêt")
+                    complete = False
+                    break
                 except Exception as e:
-                    error_msg = str(e)
-                    if 'Datadome' in error_msg or 'datadome' in error_msg.lower():
-                        logger.error(f"❌ Bloqué par DataDome sur page {page_num}")
-                        logger.error(f"💡 Solutions:")
-                        logger.error(f"   1. Attendre quelques heures (IP bloquée temporairement)")
-                        logger.error(f"   2. Utiliser un proxy rotatif (voir doc lbc)")
-                        logger.error(f"   3. Tester depuis une autre machine/réseau")
-                        break  # Arrêter si bloqué par DataDome
+                    complete = False
+                    if _is_blocked(e):
+                        _log_datadome(page_num)
+                        break  # Arrêter si toujours bloqué par DataDome
                     else:
                         logger.error(f"❌ Erreur sur page {page_num}: {e}")
                         continue
 
-            logger.info(f"🎉 LeBonCoin terminé: {len(results)} annonces récupérées")
+            if incremental:
+                incremental.commit(complete=complete)
+            logger.info(f"🎉 LeBonCoin terminé: {total} annonces récupérées")
 
         except Exception as e:
             logger.error(f"❌ Erreur critique LeBonCoin: {e}")
             import traceback
             traceback.print_exc()
 
-        return results
+    async def aiter_pages(self, search_params: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Variante asynchrone de iter_pages : les pages sont demandées en parallèle
+        et rendues dans l'ordre où elles arrivent (pas forcément l'ordre des pages).
+
+        - au plus `concurrency` requêtes en vol (défaut LEBONCOIN_CONCURRENCY),
+          chacune passant par le limiteur de débit du domaine de l'API
+        - la page 1 donne le total d'annonces : seules les pages existantes
+          (dans la limite de max_pages) sont demandées ensuite
+        - le client lbc étant synchrone, chaque requête tourne dans un thread
+          (un client par thread) et le parsing dans l'exécuteur par défaut
+        - une page bloquée (DataDome, 403, 429) est signalée au limiteur, qui
+          réduit le débit du domaine, puis réessayée ; un blocage persistant ou
+          le disjoncteur ouvert annule les requêtes restantes
+        - incremental=True : seules les annonces nouvelles ou modifiées sont
+          rendues et la pagination s'arrête en territoire connu (voir
+          scrapers.incremental)
+        """
+        if not LBC_AVAILABLE:
+            logger.error("❌ Bibliothèque lbc non disponible")
+            return
+
+        query = search_params.get('query', 'voiture')
+        max_pages = search_params.get('max_pages', 5)
+        concurrency = max(1, int(search_params.get('concurrency') or CONCURRENCY))
+        base_kwargs = self._build_search_kwargs(search_params)
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        http_pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="lbc")
+        clients = threading.local()
+
+        def search(page_num: int):
+            if not hasattr(clients, 'client'):
+                clients.client = Client()
+            return _search(clients.client, base_kwargs, page_num)
+
+        async def fetch(page_num: int):
+            """(page, total disponible, annonces normalisées, erreur)"""
+            try:
+                async with semaphore:
+                    for attempt in range(MAX_BLOCK_RETRIES + 1):
+                        await rate_limiter.wait_async(API_URL)
+                        try:
+                            search_result = await loop.run_in_executor(http_pool, search, page_num)
+                            break
+                        except Exception as e:
+                            if not _is_blocked(e) or attempt == MAX_BLOCK_RETRIES:
+                                raise
+                            logger.warning(f"🐢 Blocage sur page {page_num}, nouvel essai ({attempt + 1}/{MAX_BLOCK_RETRIES})")
+                items = await loop.run_in_executor(None, self._parse_ads, search_result.ads, page_num)
+                return page_num, search_result.total, items, None
+            except Exception as e:
+                return page_num, None, [], e
+
+        incremental = IncrementalState(self.get_source_name(), search_params) if search_params.get('incremental') else None
+
+        logger.info(f"🔵 LeBonCoin (API async): Recherche '{query}' sur {max_pages} pages ({concurrency} en parallèle)")
+        total = 0
+        in_flight: Dict[asyncio.Future, int] = {}
+        try:
+            page_num, available, items, error = await fetch(1)
+            if error is not None:
+                if isinstance(error, CircuitOpenError):
+                    logger.error(f"🛑 {error}, arrêt")
+                elif _is_blocked(error):
+                    _log_datadome(page_num)
+                else:
+                    logger.error(f"❌ Erreur sur page 1: {error}")
+                return
+            if not items:
+                logger.warning("⚠️ Aucun résultat sur page 1, arrêt")
+                return
+
+            last_page = min(max_pages, -(-(available or 0) // PAGE_SIZE))
+            logger.info(f"📊 Total disponible: {available} annonces, {last_page} pages à récupérer")
+
+            if incremental:
+                items, known = incremental.filter_page(items)
+                if known:
+                    logger.info("📌 Page 1 en territoire connu, arrêt")
+                    last_page = 1
+            if items:
+                total += len(items)
+                yield items
+
+            # Fenêtre de pages demandées : deux fois la concurrence, pour que
+            # le parsing d'une page recouvre les requêtes suivantes (la
+            # concurrence seule en incrémental, où l'arrêt est attendu tôt)
+            window = concurrency if incremental else 2 * concurrency
+            next_page = 2
+
+            def schedule():
+                nonlocal next_page
+                while len(in_flight) < window and next_page <= last_page:
+                    in_flight[asyncio.ensure_future(fetch(next_page))] = next_page
+                    next_page += 1
+
+            complete = True  # voir iter_pages
+            schedule()
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                blocked = False
+                for task in sorted(done, key=in_flight.get):
+                    if in_flight.pop(task, None) is None:
+                        continue  # écartée : au-delà du territoire connu
+                    page_num, _, items, error = task.result()
+                    if page_num > last_page:
+                        continue
+                    if error is not None:
+                        complete = False
+                        if isinstance(error, CircuitOpenError) or _is_blocked(error):
+                            if isinstance(error, CircuitOpenError):
+                                logger.error(f"🛑 {error}, arrêt")
+                            else:
+                                _log_datadome(page_num)
+                            blocked = True
+                            break
+                        logger.error(f"❌ Erreur sur page {page_num}: {error}")
+                        continue
+                    if not items:
+                        logger.warning(f"⚠️ Aucun résultat sur page {page_num}")
+                        continue
+
+                    if incremental:
+                        items, known = incremental.filter_page(items)
+                        if known and page_num < last_page:
+                            logger.info(f"📌 Page {page_num} en territoire connu, arrêt")
+                            last_page = page_num
+                            for pending, pending_page in list(in_flight.items()):
+                                if pending_page > last_page:
+                                    pending.cancel()
+                                    del in_flight[pending]
+                    if items:
+                        total += len(items)
+                        yield items
+                if blocked:
+                    break
+                schedule()
+
+            if incremental:
+                incremental.commit(complete=complete)
+            logger.info(f"🎉 LeBonCoin terminé: {total} annonces récupérées")
+
+        finally:
+            for task in in_flight:
+                task.cancel()
+            http_pool.shutdown(wait=False, cancel_futures=True)
+
+    def scrape_concurrent(self, search_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Toutes les annonces de aiter_pages, pour les appelants synchrones (tâches Celery)."""
+        async def collect():
+            results = []
+            async for page_items in self.aiter_pages(search_params):
+                results.extend(page_items)
+            return results
+
+        return asyncio.run(collect())
+
+    def _build_search_kwargs(self, search_params: Dict[str, Any]) -> Dict[str, Any]:
+        """Paramètres de client.search (hors numéro de page) : requête, tri, filtres, vendeur, localisation."""
+        query = search_params.get('query', 'voiture')
+
+        # Construire les filtres (ranges et enums)
+        filters = {}
+
+        # FILTRES DE PRIX (range)
+        min_price = search_params.get('min_price')
+        max_price = search_params.get('max_price')
+        if min_price is not None or max_price is not None:
+            filters['price'] = (min_price or 0, max_price or 999999)
+
+        # FILTRES ANNÉE (regdate range)
+        min_year = search_params.get('min_year')
+        max_year = search_params.get('max_year')
+        if min_year is not None or max_year is not None:
+            filters['regdate'] = (min_year or 1900, max_year or 2030)
+
+        # FILTRES KILOMÉTRAGE (mileage range)
+        min_mileage = search_params.get('min_mileage')
+        max_mileage = search_params.get('max_mileage')
+        if min_mileage is not None or max_mileage is not None:
+            filters['mileage'] = (min_mileage or 0, max_mileage or 999999)
+
+        # FILTRES PUISSANCE FISCALE (horsepower range)
+        min_horsepower = search_params.get('min_horsepower')
+        max_horsepower = search_params.get('max_horsepower')
+        if min_horsepower is not None or max_horsepower is not None:
+            filters['horsepower'] = (min_horsepower or 0, max_horsepower or 999)
+
+        # FILTRES PUISSANCE DIN (horse_power_din range)
+        min_horse_power_din = search_params.get('min_horse_power_din')
+        max_horse_power_din = search_params.get('max_horse_power_din')
+        if min_horse_power_din is not None or max_horse_power_din is not None:
+            filters['horse_power_din'] = (min_horse_power_din or 0, max_horse_power_din or 999)
+
+        # FILTRES CARBURANT (fuel enum)
+        fuel_types = search_params.get('fuel_types')
+        if fuel_types:
+            filters['fuel'] = tuple(fuel_types) if isinstance(fuel_types, list) else (fuel_types,)
+
+        # FILTRES TRANSMISSION (gearbox enum)
+        transmissions = search_params.get('transmissions')
+        if transmissions:
+            filters['gearbox'] = tuple(transmissions) if isinstance(transmissions, list) else (transmissions,)
+
+        # FILTRES PORTES (doors enum)
+        doors = search_params.get('doors')
+        if doors:
+            filters['doors'] = tuple(doors) if isinstance(doors, list) else (doors,)
+
+        # FILTRES PLACES (seats enum)
+        seats = search_params.get('seats')
+        if seats:
+            filters['seats'] = tuple(seats) if isinstance(seats, list) else (seats,)
+
+        # FILTRES TYPE DE VÉHICULE (vehicle_type enum)
+        vehicle_types = search_params.get('vehicle_types')
+        if vehicle_types:
+            filters['vehicle_type'] = tuple(vehicle_types) if isinstance(vehicle_types, list) else (vehicle_types,)
+
+        # FILTRES COULEUR (vehicule_color enum)
+        colors = search_params.get('colors')
+        if colors:
+            filters['vehicule_color'] = tuple(colors) if isinstance(colors, list) else (colors,)
+
+        # FILTRES ÉTAT DU VÉHICULE (vehicle_damage enum)
+        vehicle_damage = search_params.get('vehicle_damage')
+        if vehicle_damage:
+            filters['vehicle_damage'] = tuple(vehicle_damage) if isinstance(vehicle_damage, list) else (vehicle_damage,)
+
+        # FILTRES BOOLÉENS (convertis en enum)
+        if search_params.get('first_hand') is True:
+            filters['first_hand_vehicle'] = ('1',)  # '1' = oui
+
+        if search_params.get('maintenance_booklet') is True:
+            filters['maintenance_booklet_available'] = ('1',)  # '1' = oui
+
+        # AUTRES PARAMÈTRES (owner_type, locations)
+        owner_type_param = search_params.get('owner_type')
+        locations_param = search_params.get('locations')
+
+        if filters:
+            logger.info(f"🔍 Filtres appliqués: {list(filters.keys())}")
+
+        # Préparer les paramètres de recherche
+        search_kwargs = {
+            'text': query,
+            'category': Category.VEHICULES_VOITURES,
+            'sort': Sort.NEWEST,  # Trier par date (les plus récentes)
+            'limit': PAGE_SIZE,  # Max par page
+        }
+
+        # Ajouter owner_type si spécifié
+        if owner_type_param:
+            from lbc import OwnerType
+            owner_type_map = {
+                'pro': OwnerType.PRO,
+                'private': OwnerType.PRIVATE,
+                'all': OwnerType.ALL
+            }
+            if owner_type_param.lower() in owner_type_map:
+                search_kwargs['owner_type'] = owner_type_map[owner_type_param.lower()]
+
+        # Ajouter locations si spécifié
+        if locations_param:
+            search_kwargs['locations'] = locations_param
+
+        # Ajouter tous les filtres
+        search_kwargs.update(filters)
+        return search_kwargs
+
+    def _parse_ads(self, ads, page_num: int) -> List[Dict[str, Any]]:
+        """Parse et normalise les annonces d'une page"""
+        page_items = []
+        for idx, ad in enumerate(ads, 1):
+            try:
+                parsed = self._parse_ad_from_lbc(ad)
+
+                if not parsed:
+                    continue
+
+                # Normaliser
+                normalized = self.normalize_data(parsed)
+
+                page_items.append(normalized)
+
+                logger.info(f"  ✓ Annonce {idx}: {normalized.get('title', 'N/A')[:60]} - {normalized.get('price')}€")
+
+            except Exception as e:
+                logger.error(f"  ✗ Erreur annonce {idx}: {e}")
+                import traceback
+                traceback.print_exc()
+
+        logger.info(f"📊 Page {page_num}: {len(page_items)} annonces valides ajoutées")
+        return page_items
 
     def _parse_ad_from_lbc(self, ad) -> Optional[Dict[str, Any]]:
         """
@@ -288,6 +571,7 @@ class LeBonCoinScraper(BaseScraper):
             # Extraire les données de base
             data = {
                 # DONNÉES DE BASE
+                'id': ad.id if hasattr(ad, 'id') else None,
                 'title': ad.subject if hasattr(ad, 'subject') else None,
                 'description': ad.body if hasattr(ad, 'body') else None,
                 'url': ad.url if hasattr(ad, 'url') else None,
@@ -568,35 +852,32 @@ class LeBonCoinScraper(BaseScraper):
         Args:
             data: Dictionnaire à enrichir (modifié in-place)
         """
-        text_sources = [
-            data.get('title', ''),
-            data.get('description', '')
-        ]
-        full_text = ' '.join([t for t in text_sources if t]).lower()
+        if data.get('year') and data.get('mileage') and data.get('fuel_type') and data.get('transmission'):
+            return
+
+        # Minuscules sans accents ("Électrique" -> "electrique")
+        full_text = fold(' '.join(t for t in (data.get('title'), data.get('description')) if t))
+        if not full_text:
+            return
 
         # Année: 1990-2030
         if not data.get('year'):
-            years = re.findall(r'\b(19[9]\d|20[0-3]\d)\b', full_text)
-            if years:
-                data['year'] = int(years[0])
+            year = YEAR_PATTERN.search(full_text)
+            if year:
+                data['year'] = int(year.group(1))
 
         # Kilométrage
         if not data.get('mileage'):
             # Formats: "150 000 km", "150000km", "150k km"
-            km_patterns = [
-                r'(\d+)\s*000\s*km',  # 150 000 km
-                r'(\d+)k\s*km',        # 150k km
-                r'(\d{3,6})\s*km'      # 150000 km
-            ]
-            for pattern in km_patterns:
-                matches = re.findall(pattern, full_text)
-                if matches:
+            for pattern in KM_PATTERNS:
+                match = pattern.search(full_text)
+                if match:
                     try:
-                        km = int(matches[0])
+                        km = int(match.group(1))
                         # Normaliser selon le format
-                        if 'k km' in full_text or 'k km' in pattern:
+                        if 'k km' in full_text or 'k km' in pattern.pattern:
                             km *= 1000
-                        elif '000 km' in pattern and km < 1000:
+                        elif '000 km' in pattern.pattern and km < 1000:
                             km *= 1000
                         data['mileage'] = km
                         break
@@ -605,23 +886,16 @@ class LeBonCoinScraper(BaseScraper):
 
         # Carburant
         if not data.get('fuel_type'):
-            fuel_keywords = {
-                'essence': ['essence', 'sp95', 'sp98', 'e85'],
-                'diesel': ['diesel', 'gazole', 'hdi', 'tdi', 'dci'],
-                'electrique': ['électrique', 'electrique', '100% électrique', 'ev'],
-                'hybride': ['hybride', 'hybrid', 'plug-in'],
-                'gpl': ['gpl', 'lpg'],
-            }
-            for fuel_type, keywords in fuel_keywords.items():
+            for fuel_type, keywords in FUEL_KEYWORDS.items():
                 if any(kw in full_text for kw in keywords):
                     data['fuel_type'] = fuel_type
                     break
 
         # Transmission
         if not data.get('transmission'):
-            if any(word in full_text for word in ['automatique', 'auto', 'bva', 'cvt', 'dsg']):
+            if any(word in full_text for word in AUTOMATIC_KEYWORDS):
                 data['transmission'] = 'automatique'
-            elif any(word in full_text for word in ['manuelle', 'manuel', 'bvm']):
+            elif any(word in full_text for word in MANUAL_KEYWORDS):
                 data['transmission'] = 'manuelle'
 
 
@@ -1,10 +1,14 @@
 # backend/scrapers/proxy_manager.py
 """
 Gestionnaire de rotation de proxies pour éviter les blocages
+(santé partagée dans Redis, sélection pondérée par succès et latence)
 """
+import asyncio
 import random
 import logging
-from typing import List, Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 import os
 
 logger = logging.getLogger(__name__)
@@ -18,6 +22,11 @@ except ImportError:
     HTTPX_AVAILABLE = False
     httpx = None
 
+try:
+    from .redis_client import get_redis
+except ImportError:
+    from scrapers.redis_client import get_redis
+
 try:
     from bs4 import BeautifulSoup
     BS4_AVAILABLE = True
@@ -27,104 +36,314 @@ except ImportError:
     BeautifulSoup = None
 
 
+# Moyennes mobiles exponentielles : poids de la dernière mesure
+EWMA_ALPHA = float(os.getenv("PROXY_EWMA_ALPHA", "0.3"))
+# Quarantaine après échec : QUARANTINE_BASE * 2^(échecs consécutifs - 1), plafonnée
+QUARANTINE_BASE = float(os.getenv("PROXY_QUARANTINE_BASE", "30"))
+QUARANTINE_MAX = float(os.getenv("PROXY_QUARANTINE_MAX", "3600"))
+HEALTH_CHECK_URL = os.getenv("PROXY_HEALTH_CHECK_URL", "https://httpbin.org/ip")
+HEALTH_CHECK_CONCURRENCY = 10
+# Durée pendant laquelle get_proxy réutilise les statistiques lues dans Redis
+STATS_REFRESH = 1.0
+# A priori d'un proxy jamais mesuré (latence en secondes)
+DEFAULT_LATENCY = 1.0
+
+KEY_PREFIX = "proxy:stats"
+STATE_TTL = 7 * 24 * 3600
+
+# KEYS[1] = stats du proxy ; ARGV = 'ok'|'failed', latence (s, -1 si inconnue),
+# alpha, quarantaine de base, quarantaine max, ttl
+RECORD_SCRIPT = """
+if redis.replicate_commands then pcall(redis.replicate_commands) end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local s = redis.call('HMGET', KEYS[1], 'success', 'latency', 'strikes')
+local alpha = tonumber(ARGV[3])
+local success = tonumber(s[1]) or 1
+local latency = tonumber(s[2])
+local strikes = tonumber(s[3]) or 0
+local sample = tonumber(ARGV[2])
+local ok = ARGV[1] == 'ok'
+success = (1 - alpha) * success + alpha * (ok and 1 or 0)
+if sample >= 0 then
+    if latency then latency = (1 - alpha) * latency + alpha * sample else latency = sample end
+    redis.call('HSET', KEYS[1], 'latency', tostring(latency))
+end
+local until_ts = 0
+if ok then
+    strikes = 0
+else
+    strikes = strikes + 1
+    until_ts = now + math.min(tonumber(ARGV[5]), tonumber(ARGV[4]) * 2 ^ (strikes - 1))
+end
+redis.call('HSET', KEYS[1], 'success', tostring(success), 'strikes', strikes,
+           'quarantine_until', tostring(until_ts), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return tostring(until_ts - now)
+"""
+
+
+class ProxyStats:
+    """Santé d'un proxy : taux de succès et latence (EWMA), quarantaine."""
+
+    __slots__ = ("success", "latency", "strikes", "quarantine_until")
+
+    def __init__(self, success: float = 1.0, latency: Optional[float] = None,
+                 strikes: int = 0, quarantine_until: float = 0.0):
+        self.success = success
+        self.latency = latency
+        self.strikes = strikes
+        self.quarantine_until = quarantine_until
+
+    @classmethod
+    def from_redis(cls, values) -> "ProxyStats":
+        success, latency, strikes, quarantine_until = (
+            v.decode() if isinstance(v, bytes) else v for v in values
+        )
+        return cls(
+            success=float(success) if success is not None else 1.0,
+            latency=float(latency) if latency is not None else None,
+            strikes=int(strikes or 0),
+            quarantine_until=float(quarantine_until or 0),
+        )
+
+    @property
+    def score(self) -> float:
+        """Débit utile attendu : succès par seconde de latence."""
+        return self.success / max(self.latency if self.latency is not None else DEFAULT_LATENCY, 0.05)
+
+    def record(self, ok: bool, latency: Optional[float], now: float) -> float:
+        """Même calcul que RECORD_SCRIPT ; renvoie la durée de quarantaine."""
+        self.success = (1 - EWMA_ALPHA) * self.success + EWMA_ALPHA * (1.0 if ok else 0.0)
+        if latency is not None:
+            self.latency = latency if self.latency is None else (1 - EWMA_ALPHA) * self.latency + EWMA_ALPHA * latency
+        if ok:
+            self.strikes = 0
+            self.quarantine_until = 0.0
+            return 0.0
+        self.strikes += 1
+        duration = min(QUARANTINE_MAX, QUARANTINE_BASE * 2 ** (self.strikes - 1))
+        self.quarantine_until = now + duration
+        return duration
+
+    def as_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "success": round(self.success, 3),
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "strikes": self.strikes,
+            "quarantined_for": max(0, round(self.quarantine_until - now)),
+        }
+
+
 class ProxyManager:
     """
-    Gère la rotation de proxies pour les scrapers
-    
+    Pool de proxies partagé par les scrapers, tous workers Celery confondus.
+
+    Chaque proxy a un taux de succès et une latence (moyennes mobiles
+    exponentielles) conservés dans Redis. get_proxy() tire deux proxies hors
+    quarantaine et garde le meilleur (succès / latence) : les proxies rapides
+    servent plus souvent sans que les autres soient abandonnés. Un échec met
+    le proxy en quarantaine, d'une durée doublée à chaque échec consécutif.
+    check_all() (tâche Celery check_proxies) mesure tous les proxies en
+    parallèle. Sans Redis, les statistiques restent propres au processus.
+
     Usage:
         pm = ProxyManager()
         proxy = pm.get_proxy()
         # Utiliser proxy dans votre scraper
-        pm.mark_proxy_working(proxy)  # Ou mark_proxy_failed(proxy)
+        pm.mark_proxy_working(proxy, latency=0.8)  # Ou mark_proxy_failed(proxy)
     """
     
-    def __init__(self, proxy_list: Optional[List[str]] = None):
+    def __init__(self, proxy_list: Optional[List[str]] = None, redis_client=None):
         """
         Initialise le gestionnaire de proxies
         
         Args:
             proxy_list: Liste de proxies au format "http://ip:port"
                        Si None, charge depuis variable d'environnement ou liste vide
+            redis_client: Client Redis (défaut : client partagé des scrapers)
         """
         if proxy_list is None:
             # Charger depuis env ou utiliser liste vide
             proxy_string = os.getenv("PROXY_LIST", "")
             proxy_list = [p.strip() for p in proxy_string.split(',') if p.strip()]
         
-        self.all_proxies = proxy_list
-        self.working_proxies = proxy_list.copy()
-        self.failed_proxies = []
+        self.all_proxies = list(dict.fromkeys(proxy_list))
+        self.redis = redis_client if redis_client is not None else (get_redis() if self.all_proxies else None)
+        self._record = self.redis.register_script(RECORD_SCRIPT) if self.redis is not None else None
+        self._stats: Dict[str, ProxyStats] = {proxy: ProxyStats() for proxy in self.all_proxies}
+        self._stats_loaded = 0.0
+        self._lock = threading.Lock()
         
         logger.info(f"✅ ProxyManager initialisé avec {len(self.all_proxies)} proxies")
-    
+
+    # ----- Statistiques -----
+
+    def _refresh_stats(self, force: bool = False):
+        """Relit les statistiques de tous les proxies (un pipeline Redis, au plus 1x/s)."""
+        now = time.monotonic()
+        if self.redis is None or (not force and now - self._stats_loaded < STATS_REFRESH):
+            return
+        self._stats_loaded = now
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for proxy in self.all_proxies:
+                pipe.hmget(f"{KEY_PREFIX}:{proxy}", "success", "latency", "strikes", "quarantine_until")
+            rows = pipe.execute()
+            # Les quarantaines Redis sont datées avec l'horloge du serveur
+            server_now = self._server_time()
+        except Exception as e:
+            logger.debug(f"Statistiques proxies Redis indisponibles: {e}")
+            return
+        with self._lock:
+            for proxy, values in zip(self.all_proxies, rows):
+                stats = ProxyStats.from_redis(values)
+                if stats.quarantine_until:
+                    stats.quarantine_until = time.time() + (stats.quarantine_until - server_now)
+                self._stats[proxy] = stats
+
+    def _server_time(self) -> float:
+        seconds, micros = self.redis.time()
+        return seconds + micros / 1_000_000
+
+    def _record_result(self, proxy: str, ok: bool, latency: Optional[float]) -> float:
+        """Enregistre un résultat ; renvoie la durée de quarantaine (0 si succès)."""
+        if proxy not in self._stats:
+            return 0.0
+        with self._lock:
+            duration = self._stats[proxy].record(ok, latency, time.time())
+        if self._record is not None:
+            try:
+                duration = float(self._record(
+                    keys=[f"{KEY_PREFIX}:{proxy}"],
+                    args=["ok" if ok else "failed", -1 if latency is None else latency,
+                          EWMA_ALPHA, QUARANTINE_BASE, QUARANTINE_MAX, STATE_TTL],
+                ))
+            except Exception as e:
+                logger.debug(f"Enregistrement statistiques proxy impossible: {e}")
+        return max(0.0, duration)
+
+    # ----- Sélection -----
+
     def get_proxy(self) -> Optional[str]:
         """
-        Récupère un proxy aléatoire parmi les proxies fonctionnels
+        Proxy hors quarantaine choisi par "power of two choices" : deux
+        candidats tirés au hasard, le meilleur score l'emporte.
+        Si tous sont en quarantaine, celui qui en sort le plus tôt.
         
         Returns:
-            Proxy au format "http://ip:port" ou None si aucun dispo
+            Proxy au format "http://ip:port" ou None si aucun proxy configuré
         """
-        if not self.working_proxies:
-            logger.warning("⚠️ Aucun proxy fonctionnel disponible")
-            
-            # Si tous ont échoué, réinitialiser (donner une 2ème chance)
-            if self.failed_proxies:
-                logger.info("🔄 Réinitialisation des proxies échoués")
-                self.working_proxies = self.failed_proxies.copy()
-                self.failed_proxies = []
+        if not self.all_proxies:
+            return None
+        self._refresh_stats()
+
+        now = time.time()
+        with self._lock:
+            available = [p for p in self.all_proxies if self._stats[p].quarantine_until <= now]
+            if not available:
+                proxy = min(self.all_proxies, key=lambda p: self._stats[p].quarantine_until)
+                logger.warning(f"⚠️ Tous les proxies sont en quarantaine, le premier libéré est utilisé: {proxy}")
+                return proxy
+            if len(available) == 1:
+                proxy = available[0]
             else:
-                return None
-        
-        proxy = random.choice(self.working_proxies)
+                first, second = random.sample(available, 2)
+                proxy = first if self._stats[first].score >= self._stats[second].score else second
+
         logger.debug(f"🎯 Proxy sélectionné: {proxy}")
         return proxy
     
-    def mark_proxy_working(self, proxy: str):
+    def mark_proxy_working(self, proxy: str, latency: Optional[float] = None):
         """
         Marque un proxy comme fonctionnel
         
         Args:
             proxy: Le proxy qui a fonctionné
+            latency: Durée de la requête en secondes (optionnelle)
         """
-        if proxy not in self.working_proxies:
-            self.working_proxies.append(proxy)
-            if proxy in self.failed_proxies:
-                self.failed_proxies.remove(proxy)
-        
+        self._record_result(proxy, True, latency)
         logger.debug(f"✅ Proxy {proxy} marqué comme fonctionnel")
     
     def mark_proxy_failed(self, proxy: str):
         """
-        Marque un proxy comme défaillant
+        Marque un proxy comme défaillant (mis en quarantaine)
         
         Args:
             proxy: Le proxy qui a échoué
         """
-        if proxy in self.working_proxies:
-            self.working_proxies.remove(proxy)
-        
-        if proxy not in self.failed_proxies:
-            self.failed_proxies.append(proxy)
-        
-        logger.warning(f"❌ Proxy {proxy} marqué comme défaillant")
+        duration = self._record_result(proxy, False, None)
+        logger.warning(f"❌ Proxy {proxy} marqué comme défaillant (quarantaine {duration:.0f}s)")
+
+    @property
+    def working_proxies(self) -> List[str]:
+        """Proxies hors quarantaine."""
+        self._refresh_stats()
+        now = time.time()
+        return [p for p in self.all_proxies if self._stats[p].quarantine_until <= now]
+
+    @property
+    def failed_proxies(self) -> List[str]:
+        """Proxies en quarantaine."""
+        working = set(self.working_proxies)
+        return [p for p in self.all_proxies if p not in working]
     
     def get_stats(self) -> dict:
         """
         Statistiques sur l'état des proxies
         
         Returns:
-            Dict avec compteurs de proxies
+            Dict avec compteurs de proxies et santé de chacun
         """
+        self._refresh_stats(force=True)
+        now = time.time()
+        working = self.working_proxies
         return {
             'total': len(self.all_proxies),
-            'working': len(self.working_proxies),
-            'failed': len(self.failed_proxies)
+            'working': len(working),
+            'failed': len(self.all_proxies) - len(working),
+            'proxies': {p: self._stats[p].as_dict(now) for p in self.all_proxies},
         }
+
+    # ----- Tests de santé -----
+
+    async def check_proxy(self, proxy: str, test_url: str = HEALTH_CHECK_URL, timeout: float = 10) -> bool:
+        """Teste un proxy et enregistre le résultat (latence comprise)."""
+        ok, latency = await _probe(proxy, test_url, timeout)
+        if ok:
+            self.mark_proxy_working(proxy, latency)
+        else:
+            self.mark_proxy_failed(proxy)
+        return ok
+
+    async def check_all(self, test_url: str = HEALTH_CHECK_URL, timeout: float = 10,
+                        include_quarantined: bool = False) -> Dict[str, bool]:
+        """
+        Teste les proxies en parallèle (HEALTH_CHECK_CONCURRENCY à la fois).
+        Les proxies en quarantaine ne sont testés qu'une fois leur quarantaine
+        écoulée (ou avec include_quarantined) : un succès les réintègre.
+        """
+        self._refresh_stats(force=True)
+        now = time.time()
+        proxies = [
+            p for p in self.all_proxies
+            if include_quarantined or self._stats[p].quarantine_until <= now
+        ]
+        semaphore = asyncio.Semaphore(HEALTH_CHECK_CONCURRENCY)
+
+        async def check(proxy: str) -> bool:
+            async with semaphore:
+                return await self.check_proxy(proxy, test_url, timeout)
+
+        results = await asyncio.gather(*(check(p) for p in proxies))
+        report = dict(zip(proxies, results))
+        logger.info(f"🩺 Proxies testés: {sum(report.values())}/{len(report)} fonctionnels")
+        return report
     
     @staticmethod
-    def test_proxy(proxy: str, test_url: str = "https://httpbin.org/ip", timeout: int = 10) -> bool:
+    def test_proxy(proxy: str, test_url: str = HEALTH_CHECK_URL, timeout: int = 10) -> bool:
         """
-        Test si un proxy fonctionne
+        Test si un proxy fonctionne (appel ponctuel ; préférer check_all)
         
         Args:
             proxy: Proxy à tester
@@ -134,18 +353,26 @@ class ProxyManager:
         Returns:
             True si le proxy fonctionne, False sinon
         """
-        if not HTTPX_AVAILABLE:
-            logger.error("❌ httpx non disponible pour tester les proxies")
-            return False
-        
-        try:
-            proxies = {"http://": proxy, "https://": proxy}
-            with httpx.Client(proxies=proxies, timeout=timeout) as client:
-                response = client.get(test_url)
-                return response.status_code == 200
-        except Exception as e:
-            logger.debug(f"❌ Proxy {proxy} échoué au test: {e}")
-            return False
+        ok, _ = asyncio.run(_probe(proxy, test_url, timeout))
+        return ok
+
+
+async def _probe(proxy: str, test_url: str, timeout: float) -> Tuple[bool, Optional[float]]:
+    """Requête de test via le proxy : (succès, latence en secondes)."""
+    if not HTTPX_AVAILABLE:
+        logger.error("❌ httpx non disponible pour tester les proxies")
+        return False, None
+
+    start = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(proxy=proxy, timeout=timeout) as client:
+            response = await client.get(test_url)
+        if response.status_code != 200:
+            return False, None
+        return True, time.perf_counter() - start
+    except Exception as e:
+        logger.debug(f"❌ Proxy {proxy} échoué au test: {e}")
+        return False, None
 
 
 # Exemple de liste de proxies gratuits (pour tests uniquement)
@@ -239,12 +466,13 @@ if __name__ == "__main__":
             pm2 = ProxyManager(free_proxies)
             print(f"Stats proxies gratuits: {pm2.get_stats()}")
             
-            # Tester les 3 premiers
-            print("\n🧪 Test des 3 premiers proxies...")
-            for proxy in free_proxies[:3]:
-                is_working = ProxyManager.test_proxy(proxy, timeout=5)
+            # Tester tous les proxies en parallèle
+            print("\n🧪 Test des proxies...")
+            report = asyncio.run(pm2.check_all(timeout=5))
+            for proxy, is_working in report.items():
                 status = "✅ fonctionne" if is_working else "❌ ne fonctionne pas"
                 print(f"  {proxy}: {status}")
+            print(f"Stats après test: {pm2.get_stats()}")
         else:
             print("❌ Aucun proxy gratuit récupéré")
     else:
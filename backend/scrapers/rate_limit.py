@@ -0,0 +1,299 @@
+# backend/scrapers/rate_limit.py
+"""
+Limiteur de débit par domaine partagé par tous les scrapers, tous workers
+Celery confondus (état dans Redis, scripts Lua atomiques).
+
+Pour chaque domaine (www. retiré) :
+- un seau à jetons : au plus `rate` requêtes par seconde, rafales de
+  SCRAPER_RATE_BURST. Chaque appelant réserve sa place et dort hors de Redis.
+- un débit adaptatif AIMD : `rate` part du plafond SCRAPER_MAX_RPS
+  (SCRAPER_MAX_RPS_BY_DOMAIN domaine par domaine, ex.
+  "autoscout24.fr=0.5,leboncoin.fr=0.3"), est multiplié par
+  SCRAPER_AIMD_DECREASE à chaque blocage (403, 429, DataDome) et remonte de
+  SCRAPER_AIMD_INCREASE à chaque succès, sans dépasser le plafond.
+  Tous les onglets / requêtes d'un scraper passant par le seau, le débit
+  adaptatif borne aussi leur concurrence effective.
+- un disjoncteur : après SCRAPER_BREAKER_THRESHOLD blocages consécutifs, le
+  domaine est fermé pendant SCRAPER_BREAKER_COOLDOWN secondes (wait() lève
+  CircuitOpenError), puis rouvert au débit minimum ; un blocage pendant cet
+  essai le referme aussitôt, un succès le referme pour de bon.
+
+Les scrapers appellent wait() (ou wait_async()) avant chaque requête, puis
+success() ou blocked(). Sans Redis (ou si Redis tombe), le même algorithme
+s'applique par processus.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    from .redis_client import get_redis
+except ImportError:
+    from scrapers.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RPS = float(os.getenv("SCRAPER_MAX_RPS", "0.5"))
+BURST = max(1, int(os.getenv("SCRAPER_RATE_BURST", "1")))
+MIN_RPS = float(os.getenv("SCRAPER_MIN_RPS", "0.05"))
+AIMD_INCREASE = float(os.getenv("SCRAPER_AIMD_INCREASE", "0.02"))
+AIMD_DECREASE = float(os.getenv("SCRAPER_AIMD_DECREASE", "0.5"))
+BREAKER_THRESHOLD = int(os.getenv("SCRAPER_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("SCRAPER_BREAKER_COOLDOWN", "900"))
+SHARED = os.getenv("SCRAPER_RATE_LIMIT_SHARED", "true").lower() in ("1", "true", "yes")
+
+KEY_PREFIX = "ratelimit"
+STATE_TTL = 24 * 3600
+
+# Statuts HTTP traités comme un blocage anti-bot
+BLOCK_STATUSES = (403, 429)
+
+# Horloge du serveur Redis : la même pour tous les workers
+_NOW = """
+if redis.replicate_commands then pcall(redis.replicate_commands) end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+"""
+
+# KEYS[1] = état du domaine ; ARGV = plafond, rafale, ttl
+# -> {'ok', attente} ou {'open', secondes avant réouverture}
+ACQUIRE_SCRIPT = _NOW + """
+local s = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate', 'open_until')
+local max_rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local open_until = tonumber(s[4]) or 0
+if now < open_until then
+    return {'open', tostring(open_until - now)}
+end
+local rate = math.min(tonumber(s[3]) or max_rate, max_rate)
+local tokens = tonumber(s[1]) or burst
+local ts = tonumber(s[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate) - 1
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now), 'rate', tostring(rate))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+local delay = 0
+if tokens < 0 then delay = -tokens / rate end
+return {'ok', tostring(delay)}
+"""
+
+# KEYS[1] = état du domaine ; ARGV = 'ok'|'blocked', plafond, plancher,
+# incrément, facteur, seuil, pause, ttl -> {état, débit ou pause}
+FEEDBACK_SCRIPT = _NOW + """
+local s = redis.call('HMGET', KEYS[1], 'rate', 'failures', 'half_open')
+local max_rate = tonumber(ARGV[2])
+local rate = math.min(tonumber(s[1]) or max_rate, max_rate)
+local failures = tonumber(s[2]) or 0
+redis.call('EXPIRE', KEYS[1], ARGV[8])
+if ARGV[1] == 'ok' then
+    rate = math.min(max_rate, rate + tonumber(ARGV[4]))
+    redis.call('HSET', KEYS[1], 'rate', tostring(rate), 'failures', 0, 'half_open', 0)
+    return {'ok', tostring(rate)}
+end
+failures = failures + 1
+if s[3] == '1' or failures >= tonumber(ARGV[6]) then
+    redis.call('HSET', KEYS[1], 'open_until', tostring(now + tonumber(ARGV[7])), 'failures', 0,
+               'half_open', 1, 'rate', ARGV[3], 'tokens', 0, 'ts', tostring(now + tonumber(ARGV[7])))
+    return {'open', ARGV[7]}
+end
+rate = math.max(tonumber(ARGV[3]), rate * tonumber(ARGV[5]))
+redis.call('HSET', KEYS[1], 'rate', tostring(rate), 'failures', failures)
+return {'slow', tostring(rate)}
+"""
+
+
+class CircuitOpenError(RuntimeError):
+    """Le domaine est en pause après des blocages répétés."""
+
+    def __init__(self, domain: str, retry_after: float):
+        super().__init__(f"Disjoncteur ouvert pour {domain} (réouverture dans {retry_after:.0f}s)")
+        self.domain = domain
+        self.retry_after = retry_after
+
+
+def _parse_overrides(raw: str) -> Dict[str, float]:
+    overrides = {}
+    for item in raw.split(","):
+        domain, _, rate = item.partition("=")
+        if domain.strip() and rate.strip():
+            try:
+                overrides[domain.strip().lower()] = float(rate)
+            except ValueError:
+                logger.warning(f"⚠️ SCRAPER_MAX_RPS_BY_DOMAIN invalide: {item}")
+    return overrides
+
+
+RPS_BY_DOMAIN = _parse_overrides(os.getenv("SCRAPER_MAX_RPS_BY_DOMAIN", ""))
+
+
+def domain_of(url: str) -> str:
+    """Domaine d'une URL sans le préfixe www. ("https://www.autoscout24.fr/lst" -> "autoscout24.fr")."""
+    host = (urlparse(url).hostname or url).lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class LocalDomainState:
+    """Même algorithme que les scripts Lua, pour un seul processus."""
+
+    def __init__(self, max_rate: float, burst: int):
+        self.tokens = float(burst)
+        self.ts = time.monotonic()
+        self.rate = max_rate
+        self.failures = 0
+        self.half_open = False
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, max_rate: float, burst: int) -> Tuple[str, float]:
+        with self._lock:
+            now = time.monotonic()
+            if now < self.open_until:
+                return "open", self.open_until - now
+            self.rate = min(self.rate, max_rate)
+            self.tokens = min(burst, self.tokens + (now - self.ts) * self.rate) - 1
+            self.ts = now
+            return "ok", (-self.tokens / self.rate if self.tokens < 0 else 0.0)
+
+    def feedback(self, ok: bool, max_rate: float) -> Tuple[str, float]:
+        with self._lock:
+            self.rate = min(self.rate, max_rate)
+            if ok:
+                self.rate = min(max_rate, self.rate + AIMD_INCREASE)
+                self.failures = 0
+                self.half_open = False
+                return "ok", self.rate
+            self.failures += 1
+            if self.half_open or self.failures >= BREAKER_THRESHOLD:
+                now = time.monotonic()
+                self.open_until = self.ts = now + BREAKER_COOLDOWN
+                self.failures, self.half_open, self.rate, self.tokens = 0, True, MIN_RPS, 0.0
+                return "open", BREAKER_COOLDOWN
+            self.rate = max(MIN_RPS, self.rate * AIMD_DECREASE)
+            return "slow", self.rate
+
+
+class DomainRateLimiter:
+    def __init__(self, default_rate: float = DEFAULT_RPS, burst: int = BURST,
+                 overrides: Optional[Dict[str, float]] = None, redis_client=None):
+        self.default_rate = default_rate
+        self.burst = burst
+        self.overrides = overrides if overrides is not None else RPS_BY_DOMAIN
+        self.redis = redis_client if redis_client is not None else (get_redis() if SHARED else None)
+        self._acquire = self.redis.register_script(ACQUIRE_SCRIPT) if self.redis is not None else None
+        self._feedback = self.redis.register_script(FEEDBACK_SCRIPT) if self.redis is not None else None
+        self._local: Dict[str, LocalDomainState] = {}
+        self._domains = set()  # domaines vus par ce processus (snapshot)
+        self._lock = threading.Lock()
+
+    def rate_for(self, domain: str) -> float:
+        return self.overrides.get(domain, self.default_rate)
+
+    def _local_state(self, domain: str) -> LocalDomainState:
+        with self._lock:
+            state = self._local.get(domain)
+            if state is None:
+                state = self._local[domain] = LocalDomainState(self.rate_for(domain), self.burst)
+            return state
+
+    def _reserve(self, url: str) -> float:
+        """Réserve une requête ; renvoie l'attente ou lève CircuitOpenError."""
+        domain = domain_of(url)
+        self._domains.add(domain)
+        max_rate = self.rate_for(domain)
+        if max_rate <= 0:
+            return 0.0  # 0 = pas de limite
+        try:
+            if self._acquire is None:
+                raise RuntimeError("Redis indisponible")
+            status, value = self._acquire(keys=[f"{KEY_PREFIX}:{domain}"], args=[max_rate, self.burst, STATE_TTL])
+            status, value = _text(status), float(_text(value))
+        except Exception as e:
+            if self._acquire is not None:
+                logger.debug(f"Limiteur Redis indisponible, repli local: {e}")
+            status, value = self._local_state(domain).acquire(max_rate, self.burst)
+        if status == "open":
+            raise CircuitOpenError(domain, value)
+        if value > 0:
+            logger.debug(f"⏱️ Limite {domain}: attente {value:.2f}s")
+        return value
+
+    def wait(self, url: str) -> float:
+        """Bloque jusqu'à ce qu'une requête vers ce domaine soit autorisée ; renvoie l'attente."""
+        delay = self._reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, url: str) -> float:
+        """Comme wait(), sans bloquer la boucle asyncio (le script Redis tourne dans un thread)."""
+        delay = await asyncio.to_thread(self._reserve, url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def _report(self, url: str, ok: bool, reason: str = ""):
+        domain = domain_of(url)
+        max_rate = self.rate_for(domain)
+        if max_rate <= 0:
+            return
+        try:
+            if self._feedback is None:
+                raise RuntimeError("Redis indisponible")
+            status, value = self._feedback(
+                keys=[f"{KEY_PREFIX}:{domain}"],
+                args=["ok" if ok else "blocked", max_rate, MIN_RPS, AIMD_INCREASE, AIMD_DECREASE,
+                      BREAKER_THRESHOLD, BREAKER_COOLDOWN, STATE_TTL],
+            )
+            status, value = _text(status), float(_text(value))
+        except Exception as e:
+            if self._feedback is not None:
+                logger.debug(f"Limiteur Redis indisponible, repli local: {e}")
+            status, value = self._local_state(domain).feedback(ok, max_rate)
+
+        if status == "open":
+            logger.error(f"🛑 {domain}: disjoncteur ouvert pour {value:.0f}s ({reason or 'blocages répétés'})")
+        elif status == "slow":
+            logger.warning(f"🐢 {domain}: blocage ({reason}), débit réduit à {value:.3f} req/s")
+
+    def success(self, url: str):
+        """Requête réussie : le débit du domaine remonte (+AIMD_INCREASE)."""
+        self._report(url, True)
+
+    def blocked(self, url: str, reason: str = ""):
+        """Blocage anti-bot : débit divisé, disjoncteur après plusieurs blocages."""
+        self._report(url, False, reason)
+
+    def report_status(self, url: str, status: Optional[int]):
+        """success() ou blocked() selon le statut HTTP d'une réponse."""
+        if status in BLOCK_STATUSES:
+            self.blocked(url, f"HTTP {status}")
+        elif status is not None and status < 400:
+            self.success(url)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """État des domaines connus (monitoring)."""
+        domains = self._domains | set(self.overrides)
+        states = {}
+        for domain in sorted(domains):
+            state: Dict[str, Any] = {"max_rps": self.rate_for(domain)}
+            if self.redis is not None:
+                try:
+                    raw = self.redis.hgetall(f"{KEY_PREFIX}:{domain}")
+                    state.update({_text(k): _text(v) for k, v in raw.items()})
+                except Exception:
+                    pass
+            local = self._local.get(domain)
+            if local is not None:
+                state["local_rps"] = round(local.rate, 4)
+            states[domain] = state
+        return states
+
+
+rate_limiter = DomainRateLimiter()
@@ -0,0 +1,21 @@
+# backend/scrapers/redis_client.py
+"""Client Redis partagé par les scrapers (état incrémental, limiteur de débit)."""
+import os
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
+
+_client = None
+
+
+def get_redis():
+    """Client Redis du processus (None si Redis n'est pas installé)."""
+    global _client
+    if _client is None and REDIS_AVAILABLE:
+        _client = redis.from_url(REDIS_URL, socket_timeout=2)
+    return _client
@@ -0,0 +1,107 @@
+# backend/scrapers/sessions.py
+"""
+Sessions "collantes" des scrapers Playwright.
+
+L'état de stockage d'un contexte (cookies, localStorage : bannière de cookies
+acceptée, jetons anti-bot) est conservé par couple (domaine, proxy), avec le
+user-agent qui l'a obtenu. Un nouveau contexte sur le même domaine et le même
+proxy reprend cette session au lieu de repartir de zéro : pas de bannière à
+accepter ni de délai de "chauffe".
+
+Une session n'est jamais partagée entre proxies (même IP, mêmes cookies, même
+user-agent) et elle est oubliée dès que le proxy est bloqué.
+
+Stockage : Redis (SCRAPER_SESSION_TTL), sinon mémoire du processus.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from .redis_client import get_redis
+except ImportError:
+    from scrapers.redis_client import get_redis
+
+ENABLED = os.getenv("SCRAPER_STICKY_SESSIONS", "true").lower() in ("1", "true", "yes")
+SESSION_TTL = int(os.getenv("SCRAPER_SESSION_TTL", str(24 * 3600)))
+
+KEY_PREFIX = "scraper:session"
+
+
+def session_key(domain: str, proxy: Optional[str]) -> str:
+    # Le proxy peut contenir des identifiants : seul son hash apparaît dans la clé
+    proxy_id = hashlib.sha1(proxy.encode("utf-8")).hexdigest()[:16] if proxy else "direct"
+    return f"{KEY_PREFIX}:{domain}:{proxy_id}"
+
+
+class SessionStore:
+    """États de stockage Playwright par (domaine, proxy)."""
+
+    def __init__(self, redis_client=None, ttl: int = SESSION_TTL):
+        self._redis = redis_client
+        self.ttl = ttl
+        self._local: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def load(self, domain: str, proxy: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Session enregistrée : {"storage_state": ..., "user_agent": ...} ou None."""
+        if not ENABLED:
+            return None
+        key = session_key(domain, proxy)
+        raw = None
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(key)
+            except Exception as e:
+                logger.debug(f"Session {domain} indisponible: {e}")
+        if raw is None:
+            with self._lock:
+                entry = self._local.get(key)
+            if entry and entry[0] > time.monotonic():
+                raw = entry[1]
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+
+    def save(self, domain: str, proxy: Optional[str], storage_state: Dict[str, Any], user_agent: str):
+        if not ENABLED or not storage_state:
+            return
+        key = session_key(domain, proxy)
+        raw = json.dumps({"storage_state": storage_state, "user_agent": user_agent})
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.ttl, raw)
+        if self.redis is not None:
+            try:
+                self.redis.set(key, raw, ex=self.ttl)
+            except Exception as e:
+                logger.debug(f"Session {domain} non enregistrée: {e}")
+        logger.debug(f"💾 Session {domain} enregistrée ({len(storage_state.get('cookies', []))} cookies)")
+
+    def discard(self, domain: str, proxy: Optional[str]):
+        """Oublie la session (proxy bloqué : ses cookies sont marqués côté site)."""
+        key = session_key(domain, proxy)
+        with self._lock:
+            self._local.pop(key, None)
+        if self.redis is not None:
+            try:
+                self.redis.delete(key)
+            except Exception as e:
+                logger.debug(f"Session {domain} non supprimée: {e}")
+
+
+session_store = SessionStore()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Benchmark du post-filtrage de la recherche avancée
+Usage:
+    python scripts/benchmark_filters.py                    # 200 000 annonces, 20 filtres actifs
+    python scripts/benchmark_filters.py --count 50000 --filters 8
+    python scripts/benchmark_filters.py --rounds 5
+
+Génère des annonces synthétiques (champs des scrapers LeBonCoin/AutoScout24)
+et compare l'ancien apply_post_filters (une liste par filtre) au prédicat
+compilé de app.services.listing_filters. Vérifie que les deux renvoient
+exactement les mêmes annonces.
+"""
+
+import argparse
+import random
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+# Ajouter le dossier backend au path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services.listing_filters import compile_filters, filter_listings
+
+MODELS = {
+    "Peugeot": ["208", "308", "2008", "3008"],
+    "Renault": ["Clio", "Mégane", "Captur"],
+    "Volkswagen": ["Golf", "Polo", "Tiguan"],
+    "Citroën": ["C3", "C4", "Berlingo"],
+}
+FUELS = ["Diesel", "Essence", "Électrique", "Hybride"]
+TRANSMISSIONS = ["Manuelle", "Automatique"]
+BODIES = ["Berline", "Citadine", "SUV", "Break"]
+SELLERS = ["Particulier", "Professionnel"]
+COLORS = ["Noir", "Blanc", "Gris métallisé", "Bleu nuit"]
+DRIVES = ["Traction avant", "Intégrale"]
+EQUIPMENT = ["gps", "bluetooth", "parking_sensors", "Régulateur de vitesse", "Caméra de recul"]
+FEATURES = ["Climatisation automatique", "Jantes alliage 17 pouces", "Sièges chauffants", "Apple CarPlay"]
+
+# 20 filtres actifs, dans l'ordre où --filters les retient
+FILTERS = [
+    ("make", "peugeot"),
+    ("price_max", 35000),
+    ("year_min", 2012),
+    ("fuel_type", "diesel"),
+    ("mileage_max", 220000),
+    ("transmission", "manuelle"),
+    ("price_min", 2000),
+    ("year_max", 2024),
+    ("body_type", "berline"),
+    ("horsepower_min", 70),
+    ("seller_type", "particulier"),
+    ("color", "noir"),
+    ("nb_doors", 5),
+    ("critair", "1"),
+    ("co2_max", 160),
+    ("drive_type", "traction"),
+    ("gps", True),
+    ("bluetooth", True),
+    ("parking_sensors", True),
+    ("model", "08"),
+]
+
+
+def synthetic_listings(count: int, seed: int = 42):
+    """Annonces normalisées ; les distributions laissent passer chaque filtre dans 60-95% des cas."""
+    rng = random.Random(seed)
+    listings = []
+    for i in range(count):
+        make = rng.choice(list(MODELS)) if rng.random() < 0.3 else "Peugeot"
+        model = rng.choice(MODELS[make])
+        year = rng.randint(2008, 2024)
+        listings.append({
+            "id": f"bench_{i}",
+            "title": f"{make} {model} {year} {rng.choice(['Active', 'Allure', 'GT Line', 'Business'])}",
+            "make": make,
+            "model": model,
+            "year": year,
+            "price": rng.randint(1500, 40000),
+            "mileage": rng.randint(0, 250000),
+            "fuel_type": FUELS[0] if rng.random() < 0.8 else rng.choice(FUELS),
+            "transmission": TRANSMISSIONS[0] if rng.random() < 0.8 else TRANSMISSIONS[1],
+            "body_type": BODIES[0] if rng.random() < 0.8 else rng.choice(BODIES),
+            "horsepower": rng.randint(60, 250),
+            "seller_type": SELLERS[0] if rng.random() < 0.8 else SELLERS[1],
+            "color": COLORS[0] if rng.random() < 0.8 else rng.choice(COLORS),
+            "doors": 5 if rng.random() < 0.85 else 3,
+            "critair": "1" if rng.random() < 0.85 else "2",
+            "co2": rng.randint(90, 180),
+            "drive_type": DRIVES[0] if rng.random() < 0.9 else DRIVES[1],
+            "equipment": [e for e in EQUIPMENT if rng.random() < 0.9],
+            "features": [f for f in FEATURES if rng.random() < 0.5],
+        })
+    return listings
+
+
+def normalize_text(text: str) -> str:
+    """Copie de routes/search_advanced.normalize_text (utilisée par l'ancienne implémentation)"""
+    if not text:
+        return ""
+    nfd = unicodedata.normalize('NFD', text)
+    without_accents = ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
+    return without_accents.lower()
+
+
+def legacy_apply_post_filters(results, filters):
+    """Ancienne implémentation : une compréhension de liste par filtre actif (sans les logs)."""
+    filtered = results
+
+    # Filtre sur la marque (STRICT)
+    if filters.get('make'):
+        make_lower = filters['make'].lower()
+        filtered = [r for r in filtered if r.get('make') and make_lower in r['make'].lower()]
+
+    # Filtre sur le modèle (FLEXIBLE - cherche dans model ET title, insensible aux accents)
+    if filters.get('model'):
+        model_normalized = normalize_text(filters['model'])
+        # Chercher dans le champ model OU dans le titre (insensible aux accents)
+        def matches_model(result):
+            # Chercher dans le champ model
+            if result.get('model'):
+                if model_normalized in normalize_text(result['model']):
+                    return True
+            # Chercher dans le titre comme fallback
+            if result.get('title'):
+                if model_normalized in normalize_text(result['title']):
+                    return True
+            return False
+
+        filtered = [r for r in filtered if matches_model(r)]
+
+    # Filtre sur l'année
+    if filters.get('year_min'):
+        filtered = [r for r in filtered if r.get('year') and r['year'] >= filters['year_min']]
+    if filters.get('year_max'):
+        filtered = [r for r in filtered if r.get('year') and r['year'] <= filters['year_max']]
+
+    # Filtre sur le prix
+    if filters.get('price_min'):
+        filtered = [r for r in filtered if r.get('price') and r['price'] >= filters['price_min']]
+    if filters.get('price_max'):
+        filtered = [r for r in filtered if r.get('price') and r['price'] <= filters['price_max']]
+
+    # Filtre sur le kilométrage
+    if filters.get('mileage_min'):
+        filtered = [r for r in filtered if r.get('mileage') and r['mileage'] >= filters['mileage_min']]
+    if filters.get('mileage_max'):
+        filtered = [r for r in filtered if r.get('mileage') and r['mileage'] <= filters['mileage_max']]
+
+    # Filtre sur le type de carburant
+    if filters.get('fuel_type'):
+        fuel_lower = filters['fuel_type'].lower()
+        filtered = [r for r in filtered if r.get('fuel_type') and fuel_lower in r['fuel_type'].lower()]
+
+    # Filtre sur la transmission
+    if filters.get('transmission'):
+        trans_lower = filters['transmission'].lower()
+        filtered = [r for r in filtered if r.get('transmission') and trans_lower in r['transmission'].lower()]
+
+    # Filtre sur le type de carrosserie
+    if filters.get('body_type'):
+        body_normalized = normalize_text(filters['body_type'])
+        filtered = [r for r in filtered if r.get('body_type') and body_normalized in normalize_text(r['body_type'])]
+
+    # Filtre sur la puissance (chevaux)
+    if filters.get('horsepower_min'):
+        filtered = [r for r in filtered if r.get('horsepower') and r['horsepower'] >= filters['horsepower_min']]
+    if filters.get('horsepower_max'):
+        filtered = [r for r in filtered if r.get('horsepower') and r['horsepower'] <= filters['horsepower_max']]
+
+    # Filtre sur la puissance fiscale (CV)
+    if filters.get('horsepower_fiscal_min'):
+        filtered = [r for r in filtered if r.get('horsepower_fiscal') and r['horsepower_fiscal'] >= filters['horsepower_fiscal_min']]
+    if filters.get('horsepower_fiscal_max'):
+        filtered = [r for r in filtered if r.get('horsepower_fiscal') and r['horsepower_fiscal'] <= filters['horsepower_fiscal_max']]
+
+    # Filtre sur le type de vendeur
+    if filters.get('seller_type'):
+        seller_normalized = normalize_text(filters['seller_type'])
+        filtered = [r for r in filtered if r.get('seller_type') and seller_normalized in normalize_text(r['seller_type'])]
+
+    # Filtre première main
+    if filters.get('first_registration') is True:
+        filtered = [r for r in filtered if r.get('first_registration') is True or r.get('owners') == 1]
+
+    # Filtre nombre de portes
+    if filters.get('nb_doors'):
+        filtered = [r for r in filtered if r.get('doors') == filters['nb_doors'] or r.get('nb_doors') == filters['nb_doors']]
+
+    # Filtre nombre de places
+    if filters.get('nb_seats'):
+        filtered = [r for r in filtered if r.get('seats') == filters['nb_seats'] or r.get('nb_seats') == filters['nb_seats']]
+
+    # Filtre couleur extérieure
+    if filters.get('color'):
+        color_normalized = normalize_text(filters['color'])
+        filtered = [r for r in filtered if r.get('color') and color_normalized in normalize_text(r['color'])]
+
+    # Filtre couleur intérieure
+    if filters.get('color_interior'):
+        color_int_normalized = normalize_text(filters['color_interior'])
+        filtered = [r for r in filtered if r.get('color_interior') and color_int_normalized in normalize_text(r['color_interior'])]
+
+    # Filtre couleur métallisée
+    if filters.get('metallic_color') is True:
+        filtered = [r for r in filtered if r.get('metallic_color') is True]
+
+    # Filtre classe d'émission
+    if filters.get('emission_class'):
+        emission_normalized = normalize_text(filters['emission_class'])
+        filtered = [r for r in filtered if r.get('emission_class') and emission_normalized in normalize_text(r['emission_class'])]
+
+    # Filtre Crit'Air
+    if filters.get('critair'):
+        filtered = [r for r in filtered if r.get('critair') and str(r['critair']) == str(filters['critair'])]
+
+    # Filtre CO2 maximum
+    if filters.get('co2_max'):
+        filtered = [r for r in filtered if r.get('co2') and r['co2'] <= filters['co2_max']]
+
+    # Filtre contrôle technique OK
+    if filters.get('technical_control_ok') is True:
+        filtered = [r for r in filtered if r.get('technical_control_ok') is True]
+
+    # Filtre non fumeur
+    if filters.get('non_smoker') is True:
+        filtered = [r for r in filtered if r.get('non_smoker') is True]
+
+    # Filtre jamais accidenté
+    if filters.get('no_accident') is True:
+        filtered = [r for r in filtered if r.get('no_accident') is True or r.get('accident_free') is True]
+
+    # Filtre carnet d'entretien
+    if filters.get('service_history') is True:
+        filtered = [r for r in filtered if r.get('service_history') is True or r.get('full_service_history') is True]
+
+    # Filtre garantie
+    if filters.get('warranty') is True:
+        filtered = [r for r in filtered if r.get('warranty') is True]
+
+    # Filtre garantie constructeur
+    if filters.get('manufacturer_warranty') is True:
+        filtered = [r for r in filtered if r.get('manufacturer_warranty') is True]
+
+    # Filtres équipements (recherche dans features ou equipment lists)
+    equipment_filters = {
+        'climate_control': filters.get('climate_control'),
+        'leather_interior': filters.get('leather_interior'),
+        'sunroof': filters.get('sunroof'),
+        'panoramic_roof': filters.get('panoramic_roof'),
+        'heated_seats': filters.get('heated_seats'),
+        'electric_seats': filters.get('electric_seats'),
+        'parking_sensors': filters.get('parking_sensors'),
+        'parking_camera': filters.get('parking_camera'),
+        'reversing_camera': filters.get('reversing_camera'),
+        'gps': filters.get('gps'),
+        'bluetooth': filters.get('bluetooth'),
+        'apple_carplay': filters.get('apple_carplay'),
+        'android_auto': filters.get('android_auto'),
+        'cruise_control': filters.get('cruise_control'),
+        'adaptive_cruise_control': filters.get('adaptive_cruise_control'),
+        'keyless_entry': filters.get('keyless_entry'),
+        'head_up_display': filters.get('head_up_display'),
+        'abs': filters.get('abs'),
+        'esp': filters.get('esp'),
+        'lane_assist': filters.get('lane_assist'),
+        'blind_spot': filters.get('blind_spot'),
+        'automatic_emergency_braking': filters.get('automatic_emergency_braking'),
+        'alloy_wheels': filters.get('alloy_wheels'),
+        'led_headlights': filters.get('led_headlights'),
+        'xenon_headlights': filters.get('xenon_headlights'),
+        'tow_bar': filters.get('tow_bar'),
+        'ski_rack': filters.get('ski_rack'),
+        'roof_rack': filters.get('roof_rack'),
+    }
+
+    for equipment_key, equipment_value in equipment_filters.items():
+        if equipment_value is True:
+            # Chercher dans les différents champs possibles
+            filtered = [r for r in filtered if (
+                r.get(equipment_key) is True or
+                (r.get('equipment') and isinstance(r['equipment'], list) and equipment_key in [normalize_text(e) for e in r['equipment']]) or
+                (r.get('features') and isinstance(r['features'], list) and any(normalize_text(equipment_key) in normalize_text(str(f)) for f in r['features']))
+            )]
+
+    # Filtre nombre d'airbags
+    if filters.get('airbags'):
+        filtered = [r for r in filtered if r.get('airbags') and r['airbags'] >= filters['airbags']]
+
+    # Filtre nombre de cylindres
+    if filters.get('cylinders'):
+        filtered = [r for r in filtered if r.get('cylinders') == filters['cylinders']]
+
+    # Filtre cylindrée
+    if filters.get('engine_size'):
+        # Tolérance de +/- 100 cm³ pour la cylindrée
+        tolerance = 100
+        filtered = [r for r in filtered if r.get('engine_size') and abs(r['engine_size'] - filters['engine_size']) <= tolerance]
+
+    # Filtre type de traction
+    if filters.get('drive_type'):
+        drive_normalized = normalize_text(filters['drive_type'])
+        filtered = [r for r in filtered if r.get('drive_type') and drive_normalized in normalize_text(r['drive_type'])]
+
+    return filtered
+
+
+def timed(func, rounds: int):
+    best, result = None, None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(count: int, active: int, rounds: int):
+    print(f"Génération de {count} annonces...")
+    listings = synthetic_listings(count)
+    filters = dict(FILTERS[:active])
+
+    t0 = time.perf_counter()
+    compile_filters(filters)
+    compile_time = time.perf_counter() - t0
+
+    legacy_time, legacy = timed(lambda: legacy_apply_post_filters(listings, filters), rounds)
+    compiled_time, compiled = timed(lambda: filter_listings(listings, filters), rounds)
+
+    if [r["id"] for r in legacy] != [r["id"] for r in compiled]:
+        print("❌ Résultats différents entre les deux implémentations")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"Annonces            : {count}")
+    print(f"Filtres actifs      : {len(filters)}")
+    print(f"Annonces retenues   : {len(compiled)}")
+    print(f"Compilation         : {compile_time * 1e6:.0f} µs")
+    print(f"Ancien (listes)     : {legacy_time * 1000:.1f} ms ({legacy_time / count * 1e9:.0f} ns/annonce)")
+    print(f"Prédicat compilé    : {compiled_time * 1000:.1f} ms ({compiled_time / count * 1e9:.0f} ns/annonce)")
+    print(f"Gain                : x{legacy_time / compiled_time:.1f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du post-filtrage")
+    parser.add_argument("--count", type=int, default=200_000, help="Nombre d'annonces synthétiques")
+    parser.add_argument("--filters", type=int, default=len(FILTERS), help=f"Nombre de filtres actifs (max {len(FILTERS)})")
+    parser.add_argument("--rounds", type=int, default=3, help="Meilleur temps sur N passes")
+    args = parser.parse_args()
+
+    run(args.count, min(args.filters, len(FILTERS)), args.rounds)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test de charge des routes de recherche
+Usage:
+    python scripts/load_test_search.py                          # 200 requêtes simultanées sur /api/search
+    python scripts/load_test_search.py --concurrency 200 --requests 5000 --url http://localhost:8000
+    python scripts/load_test_search.py --unique                 # requêtes toutes différentes (contourne le cache)
+
+Lance N requêtes GET /api/search avec `concurrency` requêtes en vol en
+permanence et affiche les latences p50/p95/p99. À exécuter avant/après une
+modification, contre la même instance uvicorn et le même index.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+QUERIES = [
+    "clio", "golf diesel", "308 gt line", "peugeot 208", "tesla model 3",
+    "bmw serie 1", "audi a3 sportback", "captur", "c3 aircross", "polo",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def worker(client, url, queue, latencies, errors, unique):
+    while True:
+        try:
+            idx = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        params = {"q": random.choice(QUERIES), "size": 20}
+        if unique:
+            params["price_max"] = 5000 + idx
+        t0 = time.perf_counter()
+        try:
+            resp = await client.get(f"{url}/api/search", params=params)
+            if resp.status_code != 200:
+                errors.append(resp.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+
+async def run(url: str, total: int, concurrency: int, unique: bool):
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, url, queue, latencies, errors, unique) for _ in range(concurrency)
+        ))
+        duration = time.perf_counter() - start
+
+    print("=" * 60)
+    print(f"Requêtes            : {total} ({concurrency} simultanées)")
+    print(f"Erreurs             : {len(errors)}")
+    print(f"Débit               : {total / duration:.0f} req/s")
+    print(f"Latence moyenne     : {statistics.mean(latencies):.1f} ms")
+    print(f"p50                 : {percentile(latencies, 50):.1f} ms")
+    print(f"p95                 : {percentile(latencies, 95):.1f} ms")
+    print(f"p99                 : {percentile(latencies, 99):.1f} ms")
+    print(f"max                 : {max(latencies):.1f} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test de charge de /api/search")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL de l'API")
+    parser.add_argument("--requests", type=int, default=2000, help="Nombre total de requêtes")
+    parser.add_argument("--concurrency", type=int, default=200, help="Requêtes simultanées")
+    parser.add_argument("--unique", action="store_true", help="Filtres uniques pour ne pas toucher le cache")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.requests, args.concurrency, args.unique))
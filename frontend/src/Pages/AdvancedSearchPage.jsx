@@ -17,7 +17,8 @@ export default function AdvancedSearchPage() {
     console.log('🔍 Recherche avec filtres:', filters)
 
     try {
-      const response = await fetch('http://localhost:8000/api/search-advanced/search', {
+      // Recherche en streaming : une ligne JSON par trame (start / results / progress / stats)
+      const response = await fetch('http://localhost:8000/api/search-advanced/search/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -32,17 +33,35 @@ export default function AdvancedSearchPage() {
         throw new Error(`Erreur HTTP: ${response.status}`)
       }
 
-      const data = await response.json()
-
-      console.log('✅ Résultats reçus:', data)
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+
+      const handleFrame = (frame) => {
+        if (frame.type === 'results') {
+          setResults(prev => [...prev, ...frame.results])
+        } else if (frame.type === 'stats') {
+          console.log('✅ Recherche terminée:', frame)
+          setSearchStats({
+            total: frame.total_results,
+            duration: frame.duration,
+            sources: frame.sources_stats,
+            filters: frame.filters_applied
+          })
+        }
+      }
 
-      setResults(data.results || [])
-      setSearchStats({
-        total: data.total_results,
-        duration: data.duration,
-        sources: data.sources_stats,
-        filters: data.filters_applied
-      })
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const lines = buffer.split('\n')
+        buffer = lines.pop()
+        for (const line of lines) {
+          if (line.trim()) handleFrame(JSON.parse(line))
+        }
+      }
+      if (buffer.trim()) handleFrame(JSON.parse(buffer))
 
     } catch (err) {
       console.error('❌ Erreur recherche:', err)
@@ -129,11 +148,11 @@ export default function AdvancedSearchPage() {
           </div>
         )}
 
-        {/* Résultats */}
-        {!loading && !error && (
+        {/* Résultats (affichés au fil de l'eau pendant le streaming) */}
+        {(!loading || results.length > 0) && !error && (
           <div style={styles.resultsSection}>
             <EnrichedResults
-              loading={loading}
+              loading={loading && results.length === 0}
               results={results}
               total={results.length}
             />